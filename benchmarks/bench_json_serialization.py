@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSONシリアライズのベンチマーク
+代表的なレスポンス（商品一覧・価格履歴）について、従来の json.dumps(ensure_ascii=False) と
+json_serializer（orjson / 標準jsonフォールバック）の1レスポンスあたりの変換時間を比較
+
+使い方:
+    python benchmarks/bench_json_serialization.py --repeat 200
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+from unittest.mock import patch
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../src'))
+
+import json_serializer
+
+def tracking_page(count: int = 100) -> dict:
+    return {
+        "summary": {"total_products": count, "active_tracking": count, "pending_setup": 0},
+        "products": {
+            f"B0{i:08d}": {
+                "name": f"コカ・コーラ カナダドライ ジンジャーエール {i}",
+                "category": "食品・飲料",
+                "status": "active",
+                "threshold": 95,
+                "added_date": "2025-08-01",
+                "last_check": "2025-08-02 07:10:00",
+                "setup_method": "api_added",
+                "keepa_last_update": 7000000 + i
+            }
+            for i in range(count)
+        }
+    }
+
+def price_history(points: int = 24 * 365) -> dict:
+    rng = np.random.default_rng(0)
+    times = np.datetime64('2025-01-01T00:00', 'm') + np.arange(points) * np.timedelta64(60, 'm')
+    prices = (2000 + rng.integers(-300, 300, points)).astype(np.int32)
+    return {"asin": "B08CDYX378", "title": "コカ・コーラ", "times": times, "prices": prices}
+
+def legacy_dumps(obj) -> str:
+    """従来方式: json.dumps（NumPy配列はリストに変換）"""
+    def default(value):
+        if isinstance(value, np.ndarray):
+            return value.astype(str).tolist() if np.issubdtype(value.dtype, np.datetime64) else value.tolist()
+        raise TypeError(type(value).__name__)
+    return json.dumps(obj, ensure_ascii=False, default=default)
+
+def measure(fn, payload, repeat: int) -> float:
+    fn(payload)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn(payload)
+    return (time.perf_counter() - started) / repeat * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    with patch.dict(sys.modules, {'orjson': None}):
+        fallback = importlib.reload(json_serializer)
+        fallback_dumps = fallback.dumps
+    serializer = importlib.reload(json_serializer)
+
+    payloads = {
+        "tracking page (100 products)": tracking_page(),
+        "price history (8760 points)": price_history()
+    }
+    for name, payload in payloads.items():
+        print(name)
+        print(f"  json.dumps (legacy):   {measure(legacy_dumps, payload, args.repeat):10.1f} us")
+        print(f"  json_serializer/json:  {measure(fallback_dumps, payload, args.repeat):10.1f} us")
+        print(f"  json_serializer/{serializer.BACKEND}: {measure(serializer.dumps, payload, args.repeat):10.1f} us")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lambdaのコールドスタート・ウォーム実行のベンチマーク
+
+- コールド: 新しいPythonプロセスで lambda_function を読み込み、最初の呼び出しまでを計測
+  （比較として、従来のように keepa・numpy を含むクライアントモジュールを先に読み込んだ場合も計測）
+- ウォーム: 同一プロセスで analyze を繰り返し、呼び出しごとにクライアントを生成する従来方式と
+  コンテナ内で共有する方式を比較（Keepaクライアント生成時のステータス取得は --keepa-init-ms の待機で模擬）
+- バッチ: batchアクションの1呼び出しあたりのスループット（Keepaクエリ1回を --keepa-query-ms の待機で模擬）
+
+使い方:
+    python benchmarks/bench_lambda_cold_start.py --cold-runs 5 --warm-runs 20 --keepa-init-ms 300
+    python benchmarks/bench_lambda_cold_start.py --batch-sizes 1,10,100,500 --keepa-query-ms 200
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from unittest.mock import patch
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../src')
+sys.path.insert(0, SRC_DIR)
+
+COLD_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+{preload}
+import lambda_function
+imported = time.perf_counter()
+lambda_function.lambda_handler({{'action': 'status'}}, None)
+finished = time.perf_counter()
+print(json.dumps({{
+    'import_ms': (imported - started) * 1000,
+    'first_call_ms': (finished - imported) * 1000,
+    'heavy_loaded': 'keepa' in sys.modules or 'numpy' in sys.modules
+}}))
+"""
+
+def run_cold(runs: int, preload: bool) -> dict:
+    """新しいプロセスでの読み込み・初回呼び出し時間"""
+    code = COLD_SCRIPT.format(preload='import sales_tools_api_client' if preload else '')
+    env = dict(os.environ)
+    env.pop('SALES_TOOLS_API_KEY', None)
+    results = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', code], cwd=SRC_DIR, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        'import_ms': statistics.median(r['import_ms'] for r in results),
+        'first_call_ms': statistics.median(r['first_call_ms'] for r in results),
+        'heavy_loaded': results[0]['heavy_loaded']
+    }
+
+class FakeKeepa:
+    """生成時のステータス取得（ネットワーク呼び出し）を待機で模擬"""
+
+    init_seconds = 0.3
+
+    def __init__(self, api_key):
+        time.sleep(self.init_seconds)
+        self.tokens_left = 1000
+        self.status = {'refillRate': 20}
+
+def run_warm(runs: int, reuse: bool) -> list:
+    """同一プロセスでの analyze 呼び出し時間（ミリ秒）"""
+    import lambda_function
+    import sales_tools_api_client
+
+    event = {'action': 'analyze', 'asin': 'B08CDYX378'}
+    analysis = {'asin': 'B08CDYX378', 'current_price': 1980, 'trend': 'decreasing'}
+    times = []
+    with patch.dict(os.environ, {'SALES_TOOLS_API_KEY': 'benchmark'}), \
+            patch.object(sales_tools_api_client.keepa, 'Keepa', FakeKeepa), \
+            patch.object(sales_tools_api_client.SalesToolsAPIClient, 'analyze_price_trend',
+                         return_value=analysis):
+        lambda_function._client = None
+        for _ in range(runs):
+            if not reuse:
+                # 従来方式: 呼び出しごとにクライアントを生成
+                lambda_function._client = None
+            started = time.perf_counter()
+            response = lambda_function.lambda_handler(event, None)
+            times.append((time.perf_counter() - started) * 1000)
+            assert response['statusCode'] == 200, response
+        lambda_function._client = None
+    return times
+
+def run_batch(batch_size: int, query_seconds: float) -> float:
+    """batchアクション1回の処理時間（秒）"""
+    import lambda_function
+    import sales_tools_api_client
+
+    def analyze_price_trends(self, asins, domain='JP', errors=None, cancel=None):
+        # チャンク（最大100件）ごとにKeepaクエリ1回分の待機
+        time.sleep(query_seconds)
+        return {asin: {'asin': asin, 'trend': 'normal'} for asin in asins}
+
+    asins = [f'B{i:09d}' for i in range(batch_size)]
+    with patch.dict(os.environ, {'SALES_TOOLS_API_KEY': 'benchmark'}), \
+            patch.object(sales_tools_api_client.keepa, 'Keepa', FakeKeepa), \
+            patch.object(sales_tools_api_client.SalesToolsAPIClient, 'analyze_price_trends',
+                         analyze_price_trends):
+        lambda_function.get_client()
+        started = time.perf_counter()
+        response = lambda_function.lambda_handler({'action': 'batch', 'asins': asins}, None)
+        elapsed = time.perf_counter() - started
+        lambda_function._client = None
+    assert response['statusCode'] == 200, response
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description='Lambdaコールドスタートのベンチマーク')
+    parser.add_argument('--cold-runs', type=int, default=5)
+    parser.add_argument('--warm-runs', type=int, default=20)
+    parser.add_argument('--keepa-init-ms', type=float, default=300,
+                        help='Keepaクライアント生成時のステータス取得に要する時間（模擬）')
+    parser.add_argument('--batch-sizes', default='1,10,100,500',
+                        help='batchアクションのASIN数（カンマ区切り）')
+    parser.add_argument('--keepa-query-ms', type=float, default=200,
+                        help='Keepaクエリ1回に要する時間（模擬）')
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.INFO)
+    FakeKeepa.init_seconds = args.keepa_init_ms / 1000
+
+    print(f"=== コールドスタート（中央値, {args.cold_runs}回） ===")
+    for label, preload in (('遅延読み込み', False), ('先行読み込み（従来）', True)):
+        r = run_cold(args.cold_runs, preload)
+        print(f"{label:<20} import {r['import_ms']:8.1f}ms  初回status {r['first_call_ms']:6.1f}ms  "
+              f"keepa/numpy読み込み済み={r['heavy_loaded']}")
+
+    print(f"\n=== ウォーム実行 analyze（{args.warm_runs}回, Keepa初期化 {args.keepa_init_ms:.0f}ms 模擬） ===")
+    for label, reuse in (('呼び出しごとに生成（従来）', False), ('コンテナ内で共有', True)):
+        times = run_warm(args.warm_runs, reuse)
+        print(f"{label:<20} 初回 {times[0]:8.1f}ms  2回目以降 中央値 {statistics.median(times[1:]):8.2f}ms  "
+              f"合計 {sum(times):9.1f}ms")
+
+    print(f"\n=== batchアクション（Keepaクエリ {args.keepa_query_ms:.0f}ms 模擬） ===")
+    for size in (int(v) for v in args.batch_sizes.split(',') if v.strip()):
+        elapsed = run_batch(size, args.keepa_query_ms / 1000)
+        print(f"{size:>5}件  {elapsed * 1000:8.1f}ms  {size / elapsed:9.1f} ASIN/秒")
+
+if __name__ == '__main__':
+    main()
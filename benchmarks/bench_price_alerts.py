@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+価格閾値アラートのベンチマーク
+N件の商品を監視した状態で、価格データ1件あたりの判定時間を計測
+
+使い方:
+    python benchmarks/bench_price_alerts.py --products 100000 --ticks 1000000
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../src'))
+
+from price_alerts import ThresholdAlertEngine, WebhookAlertSink
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=100000)
+    parser.add_argument('--ticks', type=int, default=1000000)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    rng = random.Random(0)
+    sink = WebhookAlertSink("https://example.com/hook", maxlen=100)
+    engine = ThresholdAlertEngine([sink])
+
+    asins = [f"B0{i:08d}" for i in range(args.products)]
+    for asin in asins:
+        engine.watch(asin, 95, reference_price=rng.randint(500, 50000))
+
+    ticks = [(rng.choice(asins), rng.randint(400, 55000)) for _ in range(args.ticks)]
+
+    started = time.perf_counter()
+    for minute, (asin, price) in enumerate(ticks, start=1):
+        engine.on_price(asin, minute, price)
+    elapsed = time.perf_counter() - started
+
+    stats = engine.get_stats()
+    print(f"watched products: {stats['watched']:,}")
+    print(f"ticks:            {stats['ticks']:,}")
+    print(f"alerts fired:     {stats['fired']:,} (suppressed {stats['suppressed']:,})")
+    print(f"per tick:         {elapsed / args.ticks * 1e6:.2f} us")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+サーバー起動方式の負荷試験
+Flask開発サーバー（python app.py）と gunicorn（gunicorn.conf.py）を起動し、
+同時接続数を変えてスループットとレイテンシを比較
+
+使い方:
+    python benchmarks/bench_serving.py --mode all --concurrency 1 8 32 --seconds 5
+"""
+import argparse
+import http.client
+import os
+import subprocess
+import sys
+import threading
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../src')
+PATHS = ['/health', '/tracking?limit=50', '/tracking/B08CDYX378']
+
+def start_server(mode: str, port: int, workers: int, threads: int) -> subprocess.Popen:
+    env = dict(os.environ, PORT=str(port), GUNICORN_WORKERS=str(workers), GUNICORN_THREADS=str(threads),
+               REFRESH_SCHEDULER_ENABLED='false', TRACKING_BACKEND=os.environ.get('TRACKING_BACKEND', 'memory'))
+    if mode == 'dev':
+        # 開発サーバーはポート固定のため、Flaskの起動処理を経由してポートを差し替える
+        command = [sys.executable, '-c',
+                   f"import app; app.app.run(host='127.0.0.1', port={port}, debug=False)"]
+    else:
+        command = ['gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}',
+                   '--access-logfile', '/dev/null', 'app:create_app()']
+    process = subprocess.Popen(command, cwd=SRC_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/health')
+            if conn.getresponse().status == 200:
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"{mode} server did not start")
+
+def client(port: int, deadline: float, latencies: list, errors: list):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    i = 0
+    while time.perf_counter() < deadline:
+        path = PATHS[i % len(PATHS)]
+        i += 1
+        started = time.perf_counter()
+        try:
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 500:
+                errors.append(response.status)
+            latencies.append(time.perf_counter() - started)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(str(e))
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+
+def load_test(port: int, concurrency: int, seconds: float) -> dict:
+    latencies, errors = [], []
+    deadline = time.perf_counter() + seconds
+    threads = [threading.Thread(target=client, args=(port, deadline, latencies, errors))
+               for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    def pct(q):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000, 2) if latencies else None
+    return {
+        "concurrency": concurrency,
+        "requests_per_sec": round(len(latencies) / seconds),
+        "p50_ms": pct(0.50),
+        "p99_ms": pct(0.99),
+        "errors": len(errors)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=['dev', 'gunicorn', 'all'], default='all')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() * 2 + 1)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--port', type=int, default=18080)
+    args = parser.parse_args()
+
+    modes = ['dev', 'gunicorn'] if args.mode == 'all' else [args.mode]
+    for mode in modes:
+        process = start_server(mode, args.port, args.workers, args.threads)
+        try:
+            for concurrency in args.concurrency:
+                print({"mode": mode, **load_test(args.port, concurrency, args.seconds)})
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+if __name__ == '__main__':
+    main()
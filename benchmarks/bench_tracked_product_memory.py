@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+トラッキング商品のメモリ使用量ベンチマーク
+辞書形式（従来）と TrackedProduct（__slots__・UNIX秒・intern）でN件保持した場合の使用量を比較
+
+使い方:
+    python benchmarks/bench_tracked_product_memory.py --count 1000000
+"""
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../src'))
+
+from tracked_product import TrackedProduct
+
+STATUSES = ["active", "pending", "paused"]
+SETUP_METHODS = ["api_added", "manual_activation", "selenium_manual", "manual_simulation"]
+CATEGORIES = ["食品・飲料", "Electronics", "家電・AV機器", "ホーム&キッチン"]
+
+def make_product(i: int, base: datetime) -> dict:
+    """実データと同様に、値は毎回生成された文字列（共有されない）とする"""
+    checked = base + timedelta(seconds=i * 7)
+    return {
+        "name": f"商品{i}",
+        "category": "".join(CATEGORIES[i % len(CATEGORIES)]),
+        "status": "".join(STATUSES[i % len(STATUSES)]),
+        "threshold": 95,
+        "added_date": (base - timedelta(days=i % 365)).strftime("%Y-%m-%d"),
+        "last_check": checked.strftime("%Y-%m-%d %H:%M:%S"),
+        "setup_method": "".join(SETUP_METHODS[i % len(SETUP_METHODS)]),
+        "keepa_last_update": 7000000 + i
+    }
+
+def measure(build) -> int:
+    """構築したオブジェクトが保持するメモリ量（バイト）"""
+    gc.collect()
+    tracemalloc.start()
+    data = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del data
+    gc.collect()
+    return current
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=1000000)
+    args = parser.parse_args()
+
+    base = datetime(2025, 8, 2, 7, 10, 0)
+    asins = [f"B0{i:08d}" for i in range(args.count)]
+
+    dict_bytes = measure(lambda: {asin: make_product(i, base) for i, asin in enumerate(asins)})
+    record_bytes = measure(lambda: {
+        asin: TrackedProduct.from_dict(asin, make_product(i, base)) for i, asin in enumerate(asins)
+    })
+
+    print(f"products: {args.count:,}")
+    print(f"dict:           {dict_bytes / 2**20:8.1f} MiB ({dict_bytes / args.count:.0f} B/product)")
+    print(f"TrackedProduct: {record_bytes / 2**20:8.1f} MiB ({record_bytes / args.count:.0f} B/product)")
+    print(f"reduction:      {100 * (1 - record_bytes / dict_bytes):.1f}%")
+
+if __name__ == '__main__':
+    main()
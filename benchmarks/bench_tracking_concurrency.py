@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TrackingManager 並行読み書きベンチマーク
+複数スレッドから読み込み（サマリー・一覧）と書き込み（追加・ステータス更新）を混在させてスループットを計測
+
+使い方:
+    python benchmarks/bench_tracking_concurrency.py --backend memory --threads 8 --write-ratio 0.1
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../src'))
+# モジュール共通インスタンスが既定のDBファイルを開かないようにする
+os.environ.setdefault('TRACKING_BACKEND', 'memory')
+
+from tracking_backends import InMemoryTrackingBackend, SQLiteTrackingBackend
+from tracking_manager import TrackingManager
+
+def build_manager(backend: str, products: int, db_dir: str) -> TrackingManager:
+    if backend == 'sqlite':
+        manager = TrackingManager(backend=SQLiteTrackingBackend(os.path.join(db_dir, 'bench.sqlite3')))
+    else:
+        manager = TrackingManager(backend=InMemoryTrackingBackend())
+    manager.bulk_upsert([
+        {"asin": f"B0BENCH{i:05d}", "name": f"商品{i}", "category": "Electronics" if i % 2 else "食品・飲料"}
+        for i in range(products)
+    ])
+    return manager
+
+def worker(manager: TrackingManager, seconds: float, write_ratio: float, worker_id: int, results: list):
+    rng = random.Random(worker_id)
+    reads = writes = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        if rng.random() < write_ratio:
+            if rng.random() < 0.5:
+                manager.add_product(f"B0W{worker_id:02d}{writes:05d}", "追加商品", "Electronics")
+            else:
+                manager.update_product_status(f"B0BENCH{rng.randrange(1000):05d}", rng.choice(["active", "paused"]))
+            writes += 1
+        else:
+            if rng.random() < 0.5:
+                manager.get_tracking_summary()
+            else:
+                manager.find_products(status="active", limit=50)
+            reads += 1
+    results.append((reads, writes))
+
+def run(backend: str, threads: int, seconds: float, write_ratio: float, products: int) -> dict:
+    with tempfile.TemporaryDirectory() as db_dir:
+        manager = build_manager(backend, products, db_dir)
+        results = []
+        workers = [
+            threading.Thread(target=worker, args=(manager, seconds, write_ratio, n, results))
+            for n in range(threads)
+        ]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        reads = sum(r for r, _ in results)
+        writes = sum(w for _, w in results)
+        return {
+            "backend": backend,
+            "threads": threads,
+            "write_ratio": write_ratio,
+            "reads_per_sec": round(reads / elapsed),
+            "writes_per_sec": round(writes / elapsed),
+            "consistent": manager.verify_counters()
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', choices=['memory', 'sqlite', 'all'], default='all')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--seconds', type=float, default=3.0)
+    parser.add_argument('--write-ratio', type=float, default=0.1)
+    parser.add_argument('--products', type=int, default=1000)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    backends = ['memory', 'sqlite'] if args.backend == 'all' else [args.backend]
+    for backend in backends:
+        for threads in args.threads:
+            print(run(backend, threads, args.seconds, args.write_ratio, args.products))
+
+if __name__ == '__main__':
+    main()
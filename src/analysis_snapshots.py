@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+価格分析スナップショット
+価格データ更新時に分析結果を事前計算し、(ASIN, ドメイン)単位で保持する
+"""
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+# ログ設定
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 分析対象期間（日）
+DEFAULT_PERIOD_DAYS = 30
+
+# トレンド判定の閾値（期間開始時点の価格との差）
+TREND_THRESHOLD = 0.02
+
+class AnalysisSnapshotStore:
+    """(ASIN, ドメイン)ごとの事前計算済み分析結果"""
+
+    def __init__(self, period_days: int = DEFAULT_PERIOD_DAYS):
+        self.period_days = period_days
+        self._lock = threading.Lock()
+        self._snapshots: Dict[tuple, Dict] = {}
+
+    def update(self, asin: str, domain: str, stats: Optional[Dict],
+               source_timestamp: Optional[int] = None) -> Optional[Dict]:
+        """
+        価格統計から分析結果を計算して保存
+
+        Args:
+            asin: 商品ASIN
+            domain: Amazonドメイン
+            stats: PriceHistoryStore.window_stats の結果
+            source_timestamp: 計算に使った履歴の最新時刻（UNIX分、鮮度の判定に使う）
+
+        Returns:
+            保存したスナップショット
+        """
+        if stats is None:
+            return None
+
+        computed_at = time.time()
+        snapshot = {
+            "asin": asin,
+            "domain": domain,
+            "analysis": build_analysis(stats, self.period_days),
+            "price_history": {
+                "period_days": self.period_days,
+                "data_points": stats["data_points"],
+                "min_price": stats["min"],
+                "max_price": stats["max"],
+                "avg_price": int(stats["avg"])
+            },
+            "source_timestamp": source_timestamp,
+            "computed_at": computed_at,
+            "computed_at_str": datetime.fromtimestamp(computed_at).strftime("%Y-%m-%d %H:%M:%S")
+        }
+
+        with self._lock:
+            self._snapshots[(asin, domain)] = snapshot
+        logger.info(f"Analysis snapshot updated: {asin} ({domain})")
+        return snapshot
+
+    def get(self, asin: str, domain: str = 'JP') -> Optional[Dict]:
+        """スナップショットの取得"""
+        return self._snapshots.get((asin, domain))
+
+    def invalidate(self, asin: str, domain: Optional[str] = None):
+        """スナップショットの削除"""
+        with self._lock:
+            for key in [k for k in self._snapshots if k[0] == asin and (domain is None or k[1] == domain)]:
+                del self._snapshots[key]
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+def build_analysis(stats: Dict, period_days: int = DEFAULT_PERIOD_DAYS) -> Dict:
+    """期間内の価格統計からトレンドと推奨を判定"""
+    current = stats["current"]
+    first = stats["first"]
+    min_price = stats["min"]
+    max_price = stats["max"]
+
+    if current is None:
+        trend = "unavailable"
+        recommendation = "out_of_stock"
+        price_position = None
+    else:
+        if current < first * (1 - TREND_THRESHOLD):
+            trend = "decreasing"
+        elif current > first * (1 + TREND_THRESHOLD):
+            trend = "increasing"
+        else:
+            trend = "stable"
+
+        price_range = max_price - min_price
+        price_position = (current - min_price) / price_range if price_range > 0 else 0.5
+        if price_position < 0.3:
+            recommendation = "good_time_to_buy"
+        elif price_position > 0.7:
+            recommendation = "wait"
+        else:
+            recommendation = "fair_price"
+
+    return {
+        "current_price": current,
+        f"avg_price_{period_days}d": int(stats["avg"]),
+        f"min_price_{period_days}d": min_price,
+        f"max_price_{period_days}d": max_price,
+        "price_trend": trend,
+        "recommendation": recommendation,
+        "price_position": round(price_position * 100, 1) if price_position is not None else None
+    }
+
+def snapshot_age_seconds(snapshot: Dict, now: Optional[float] = None) -> float:
+    """スナップショットの経過秒数"""
+    return round((now if now is not None else time.time()) - snapshot["computed_at"], 1)
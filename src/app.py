@@ -9,19 +9,141 @@ import json
 import logging
 import os
 import time
-from flask import Flask, request, jsonify
-from tracking_manager import tracking_manager
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Callable, Dict, Optional
+from flask import Flask, Response, request, jsonify, stream_with_context
+from flask.json.provider import JSONProvider
+import json_serializer
+from response_cache import ResponseCache, CachedResponse
+from tracking_manager import tracking_manager, DEFAULT_PAGE_SIZE, MAX_BULK_ITEMS
+from refresh_scheduler import RefreshScheduler
+from analysis_snapshots import snapshot_age_seconds
 
 # ログ設定
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class FastJSONProvider(JSONProvider):
+    """jsonify を json_serializer（orjson / 標準json）経由で出力する"""
+    
+    def dumps(self, obj, **kwargs) -> str:
+        return json_serializer.dumps(obj)
+    
+    def loads(self, s, **kwargs):
+        return json_serializer.loads(s)
+
 # Flaskアプリケーションの初期化
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 
 # 環境変数の取得
 SALES_TOOLS_API_KEY = os.environ.get('SALES_TOOLS_API_KEY', 'test_api_key_placeholder')
 
+# バックグラウンド更新（APIキー設定時のみ起動）
+refresh_scheduler = None
+
+# 読み込み系APIのレスポンスキャッシュ
+RESPONSE_CACHE_MAX_AGE = int(os.environ.get('RESPONSE_CACHE_MAX_AGE', '0'))
+response_cache = ResponseCache(int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', '256')))
+
+def conditional_response(stamp: Optional[Callable[[Dict], Dict]] = None):
+    """
+    読み込み系APIの条件付きリクエスト対応とレスポンスキャッシュ
+    
+    トラッキングデータ・価格履歴の版から ETag / Last-Modified を付与し、
+    If-None-Match / If-Modified-Since が一致すれば304を返す。
+    同じURLで版が変わっていなければ、生成済みの本文を返す。
+    stamp を指定した場合は、時刻に依存する項目（返却時刻・経過秒数）を返却のたびに埋め直す
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            version, last_modified = tracking_manager.data_version()
+            key = request.full_path
+            
+            entry = response_cache.get(key, version)
+            if entry is None:
+                response = app.make_response(view(*args, **kwargs))
+                # エラー・ストリーミングはキャッシュしない
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                body = response.get_data()
+                entry = CachedResponse(version, body, response.status_code, response.mimetype,
+                                       json_serializer.loads(body) if stamp else None)
+                response_cache.set(key, entry)
+            
+            body = json_serializer.dumps_bytes(stamp(entry.payload)) if stamp else entry.body
+            response = app.response_class(body, status=entry.status, mimetype=entry.mimetype)
+            # 本文には返却時刻が含まれ、プロセス間で一致しないため弱いETagとする
+            response.set_etag(version, weak=True)
+            response.last_modified = datetime.fromtimestamp(last_modified, timezone.utc)
+            if RESPONSE_CACHE_MAX_AGE > 0:
+                response.cache_control.public = True
+                response.cache_control.max_age = RESPONSE_CACHE_MAX_AGE
+            else:
+                response.cache_control.no_cache = True
+            return response.make_conditional(request)
+        
+        return wrapper
+    
+    return decorator
+
+def stamp_timestamp(payload: Dict) -> Dict:
+    """返却時刻を埋める（キャッシュ済みの本文は変更しない）"""
+    return {**payload, 'timestamp': time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(time.time()))}
+
+def stamp_tracking_list(payload: Dict) -> Dict:
+    """返却時刻とサマリーの集計時刻を埋める"""
+    payload = stamp_timestamp(payload)
+    payload['summary'] = {**payload['summary'], 'last_updated': payload['timestamp']}
+    return payload
+
+def stamp_product_info(payload: Dict) -> Dict:
+    """取得時刻とスナップショットの経過秒数を埋める"""
+    now = time.time()
+    metadata = {**payload['metadata'], 'retrieved_at': time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now))}
+    if metadata.get('snapshot_computed_at'):
+        computed_at = datetime.strptime(metadata['snapshot_computed_at'], "%Y-%m-%d %H:%M:%S").timestamp()
+        metadata['snapshot_age_seconds'] = snapshot_age_seconds({'computed_at': computed_at}, now)
+    return {**payload, 'metadata': metadata}
+
+def create_api_client():
+    """Keepa APIクライアントの生成（keepaはバックグラウンド更新時のみ読み込む）"""
+    from sales_tools_api_client import SalesToolsAPIClient
+    return SalesToolsAPIClient()
+
+def start_background_refresh():
+    """トラッキング商品の定期更新を開始"""
+    global refresh_scheduler
+    
+    has_api_key = bool(SALES_TOOLS_API_KEY and SALES_TOOLS_API_KEY != 'test_api_key_placeholder')
+    enabled = os.environ.get('REFRESH_SCHEDULER_ENABLED', 'true').lower() == 'true'
+    if not has_api_key or not enabled:
+        logger.info("Background refresh disabled")
+        return None
+    
+    if refresh_scheduler is None:
+        refresh_scheduler = RefreshScheduler.from_env(tracking_manager, create_api_client)
+    refresh_scheduler.start()
+    return refresh_scheduler
+
+def stop_background_refresh():
+    """トラッキング商品の定期更新を停止"""
+    if refresh_scheduler is not None:
+        refresh_scheduler.stop()
+
+def create_app() -> Flask:
+    """
+    gunicorn用のアプリケーションファクトリ
+    
+    preload時はマスタープロセスで一度だけ呼ばれ、読み込んだトラッキングデータを
+    ワーカー間でコピーオンライト共有する。バックグラウンド更新はフォーク後の
+    1ワーカーでのみ起動する（gunicorn.conf.py 参照）
+    """
+    logger.info("Sales Tools API application loaded")
+    return app
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """ヘルスチェックエンドポイント"""
@@ -44,7 +166,10 @@ def get_status():
             'platform': 'ECS Fargate',
             'runtime': 'python3.9',
             'has_api_key': bool(SALES_TOOLS_API_KEY and SALES_TOOLS_API_KEY != 'test_api_key_placeholder')
-        }
+        },
+        'background_refresh': refresh_scheduler.get_status() if refresh_scheduler else {'running': False},
+        'price_alerts': tracking_manager.alerts.get_stats(),
+        'response_cache': response_cache.get_stats()
     })
 
 @app.route('/tracking/activate', methods=['POST'])
@@ -84,16 +209,116 @@ def activate_tracking():
             'timestamp': time.strftime("%Y-%m-%d %H:%M:%S")
         }), 500
 
+def parse_tracking_filters(args) -> dict:
+    """クエリパラメータから一覧の絞り込み条件を取得"""
+    filters = {}
+    for key in ('status', 'category', 'stale_since'):
+        if args.get(key):
+            filters[key] = args[key]
+    for key in ('min_threshold', 'max_threshold'):
+        if args.get(key):
+            filters[key] = int(args[key])
+    return filters
+
+@app.route('/tracking/bulk', methods=['POST'])
+def bulk_tracking():
+    """
+    複数商品の一括登録・更新
+    
+    リクエスト例:
+        {"action": "add", "products": [{"asin": "...", "name": "...", "category": "...", "threshold": 95}]}
+        {"action": "update_status", "asins": ["...", ...], "status": "paused"}
+        {"action": "activate", "asins": ["...", ...]}
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        action = data.get('action')
+        items = data.get('products') if action == 'add' else data.get('asins')
+        
+        error = None
+        if action not in ('add', 'update_status', 'activate'):
+            error = 'action must be one of add, update_status, activate'
+        elif not isinstance(items, list) or not items:
+            error = 'products is required' if action == 'add' else 'asins is required'
+        elif len(items) > MAX_BULK_ITEMS:
+            error = f'Too many items (max {MAX_BULK_ITEMS})'
+        elif action != 'add' and not all(isinstance(asin, str) for asin in items):
+            error = 'asins must be strings'
+        elif action == 'update_status' and not data.get('status'):
+            error = 'status is required'
+        if error:
+            return jsonify({
+                'error': 'Invalid request',
+                'message': error,
+                'timestamp': time.strftime("%Y-%m-%d %H:%M:%S")
+            }), 400
+        
+        if action == 'add':
+            result = tracking_manager.bulk_upsert(items)
+        elif action == 'activate':
+            result = tracking_manager.bulk_update_status(
+                items, "active", time.strftime("%Y-%m-%d %H:%M:%S"), "manual_activation"
+            )
+        else:
+            result = tracking_manager.bulk_update_status(items, data['status'])
+        
+        return jsonify({
+            'action': action,
+            'result': result,
+            'summary': tracking_manager.get_tracking_summary(),
+            'timestamp': time.strftime("%Y-%m-%d %H:%M:%S")
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Error in bulk_tracking: {str(e)}")
+        return jsonify({
+            'error': 'Failed to apply bulk tracking update',
+            'message': str(e),
+            'timestamp': time.strftime("%Y-%m-%d %H:%M:%S")
+        }), 500
+
 @app.route('/tracking', methods=['GET'])
+@conditional_response(stamp=stamp_tracking_list)
 def get_tracking_status():
-    """トラッキング状況の取得"""
+    """
+    トラッキング状況の取得
+    
+    クエリパラメータ:
+        status, category, min_threshold, max_threshold, stale_since: 絞り込み条件
+        cursor, limit: ページング（レスポンスの next_cursor を次回の cursor に指定）
+        format=ndjson: 条件に合う全商品を1行1商品で逐次出力
+    """
     try:
+        try:
+            filters = parse_tracking_filters(request.args)
+            limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+            if filters.get('stale_since'):
+                time.strptime(filters['stale_since'], "%Y-%m-%d %H:%M:%S")
+        except ValueError as e:
+            return jsonify({
+                'error': 'Invalid request',
+                'message': str(e),
+                'timestamp': time.strftime("%Y-%m-%d %H:%M:%S")
+            }), 400
+        
+        if request.args.get('format') == 'ndjson':
+            def generate():
+                for asin, product in tracking_manager.iter_products(**filters):
+                    yield json_serializer.dumps_bytes({'asin': asin, **product}) + b"\n"
+            
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        
         summary = tracking_manager.get_tracking_summary()
-        products = tracking_manager.get_all_tracked_products()
+        products, next_cursor = tracking_manager.find_products(request.args.get('cursor'), limit, **filters)
         
         return jsonify({
             'summary': summary,
             'products': products,
+            'pagination': {
+                'limit': limit,
+                'count': len(products),
+                'next_cursor': next_cursor
+            },
             'timestamp': time.strftime("%Y-%m-%d %H:%M:%S")
         }), 200
         
@@ -106,6 +331,7 @@ def get_tracking_status():
         }), 500
 
 @app.route('/tracking/<asin>', methods=['GET'])
+@conditional_response(stamp=stamp_timestamp)
 def get_product_tracking(asin):
     """特定商品のトラッキング状況取得"""
     try:
@@ -118,8 +344,9 @@ def get_product_tracking(asin):
                 'timestamp': time.strftime("%Y-%m-%d %H:%M:%S")
             }), 404
         
-        # 価格データのシミュレーション
-        price_data = tracking_manager.simulate_price_data(asin)
+        # 価格履歴ストアから取得（未保存の場合はシミュレーション）
+        days = request.args.get('days', 30, type=int)
+        price_data = tracking_manager.get_price_data(asin, days)
         
         return jsonify({
             'asin': asin,
@@ -140,6 +367,7 @@ def get_product_tracking(asin):
 def analyze_product():
     """商品価格分析エンドポイント"""
     try:
+        started = time.perf_counter()
         data = request.get_json()
         if not data or 'asin' not in data:
             return jsonify({
@@ -156,21 +384,33 @@ def analyze_product():
         # トラッキング状況確認
         tracking_status = tracking_manager.get_product_status(asin)
         
-        # 分析結果（シミュレーション）
-        response_data = {
-            'asin': asin,
-            'domain': domain,
-            'analysis': {
+        # 事前計算済みの分析結果を参照
+        snapshot = tracking_manager.get_analysis_snapshot(asin, domain)
+        
+        if snapshot:
+            analysis = snapshot['analysis']
+            data_source = 'analysis_snapshot'
+        else:
+            # 分析結果（シミュレーション）
+            analysis = {
                 'current_price': 1980,
                 'avg_price_30d': 2100,
                 'price_trend': 'decreasing',
                 'recommendation': 'good_time_to_buy'
-            },
+            }
+            data_source = 'sales_tools_api'
+        
+        response_data = {
+            'asin': asin,
+            'domain': domain,
+            'analysis': analysis,
             'tracking_status': tracking_status,
             'metadata': {
                 'api_version': '1.3.0',
-                'processing_time_ms': 150,
-                'data_source': 'sales_tools_api'
+                'processing_time_ms': round((time.perf_counter() - started) * 1000, 2),
+                'data_source': data_source,
+                'snapshot_computed_at': snapshot['computed_at_str'] if snapshot else None,
+                'snapshot_age_seconds': snapshot_age_seconds(snapshot) if snapshot else None
             }
         }
         
@@ -185,6 +425,7 @@ def analyze_product():
         }), 500
 
 @app.route('/product/<asin>', methods=['GET'])
+@conditional_response(stamp=stamp_product_info)
 def get_product_info(asin):
     """商品情報取得エンドポイント"""
     try:
@@ -195,6 +436,9 @@ def get_product_info(asin):
         # トラッキング状況確認
         tracking_status = tracking_manager.get_product_status(asin)
         
+        # 事前計算済みの分析結果を参照
+        snapshot = tracking_manager.get_analysis_snapshot(asin, domain)
+        
         # 商品情報（シミュレーション）
         response_data = {
             'asin': asin,
@@ -219,10 +463,23 @@ def get_product_info(asin):
             'tracking_status': tracking_status,
             'metadata': {
                 'retrieved_at': time.strftime("%Y-%m-%d %H:%M:%S"),
-                'api_version': '1.3.0'
+                'api_version': '1.3.0',
+                'data_source': 'simulation',
+                'snapshot_computed_at': None,
+                'snapshot_age_seconds': None
             }
         }
         
+        if snapshot:
+            response_data['product_info']['current_price'] = snapshot['analysis']['current_price']
+            response_data['product_info']['availability'] = 'In Stock' if snapshot['analysis']['current_price'] is not None else 'Out of Stock'
+            response_data['price_history'] = snapshot['price_history']
+            response_data['metadata'].update({
+                'data_source': 'analysis_snapshot',
+                'snapshot_computed_at': snapshot['computed_at_str'],
+                'snapshot_age_seconds': snapshot_age_seconds(snapshot)
+            })
+        
         return jsonify(response_data), 200
         
     except Exception as e:
@@ -245,6 +502,7 @@ def not_found(error):
             'GET /tracking',
             'GET /tracking/<asin>',
             'POST /tracking/activate',
+            'POST /tracking/bulk',
             'POST /analyze',
             'GET /product/<asin>'
         ],
@@ -253,4 +511,5 @@ def not_found(error):
 
 if __name__ == '__main__':
     logger.info("Starting Sales Tools API - ECS Fargate Version 1.3.0")
+    start_background_refresh()
     app.run(host='0.0.0.0', port=8080, debug=False)
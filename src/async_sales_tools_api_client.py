@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Sales Tools API 非同期クライアント
+asyncioで複数ASINの取得・分析を同時実行数を制限しながら並行処理する
+"""
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Dict, List, Optional
+
+from sales_tools_api_client import SalesToolsAPIClient, KEEPA_MAX_ASINS_PER_QUERY
+
+# ログ設定
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# デフォルト設定（環境変数で上書き可能）
+DEFAULT_CONCURRENCY = int(os.getenv('KEEPA_ASYNC_CONCURRENCY', '4'))
+DEFAULT_TIMEOUT = float(os.getenv('KEEPA_ASYNC_TIMEOUT', '30'))
+
+class AsyncSalesToolsAPIClient:
+    """
+    SalesToolsAPIClientの非同期版
+
+    Keepa呼び出しはスレッドプールで実行し、トークン予算・キャッシュ・
+    リクエスト合流は同期クライアントと共有する
+    """
+
+    def __init__(self, client: Optional[SalesToolsAPIClient] = None,
+                 concurrency: int = DEFAULT_CONCURRENCY, timeout: Optional[float] = DEFAULT_TIMEOUT):
+        self.client = client or SalesToolsAPIClient()
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='keepa-async')
+        self._semaphore = None
+        self._semaphore_loop = None
+
+    async def __aenter__(self) -> 'AsyncSalesToolsAPIClient':
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """スレッドプールを終了（実行中の呼び出しは待たず、開始前の呼び出しは取り消す）"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self, fn: Callable, *args, cancel: Optional[threading.Event] = None):
+        """
+        同時実行数とタイムアウトを適用してブロッキング呼び出しを実行
+
+        Args:
+            cancel: タイムアウト・キャンセル時に設定するイベント（fn 側で参照して処理を打ち切る）
+        """
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._semaphore_loop = loop
+
+        async with self._semaphore:
+            future = loop.run_in_executor(self._executor, fn, *args)
+            try:
+                return await asyncio.wait_for(future, self.timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                # wait_for は実行中のスレッドを止めないため、トークン待ち・Keepaへのクエリを中止させる
+                if cancel is not None:
+                    cancel.set()
+                raise
+
+    async def get_product_info(self, asin: str, domain: str = 'JP') -> Optional[Dict]:
+        """商品情報を取得"""
+        return await self._run(self.client.get_product_info, asin, domain)
+
+    async def analyze_price_trend(self, asin: str, domain: str = 'JP') -> Optional[Dict]:
+        """価格トレンドを分析"""
+        return await self._run(self.client.analyze_price_trend, asin, domain)
+
+    async def search_deals(self, category: str = None, max_price: float = None,
+                           min_discount: float = 20.0) -> List[Dict]:
+        """お得商品を検索"""
+        return await self._run(self.client.search_deals, category, max_price, min_discount)
+
+    async def get_products(self, asins: List[str], domain: str = 'JP',
+                           errors: Optional[Dict[str, str]] = None) -> Dict[str, Dict]:
+        """複数商品の情報をチャンク単位で並行取得"""
+        return await self._fan_out(self.client.get_products_batch, asins, domain, errors)
+
+    async def analyze_price_trends(self, asins: List[str], domain: str = 'JP',
+                                   errors: Optional[Dict[str, str]] = None) -> Dict[str, Dict]:
+        """複数商品の価格トレンドをチャンク単位で並行分析"""
+        return await self._fan_out(self.client.analyze_price_trends, asins, domain, errors)
+
+    async def _fan_out(self, batch_fn: Callable, asins: List[str], domain: str,
+                       errors: Optional[Dict[str, str]] = None) -> Dict[str, Dict]:
+        """
+        ASINリストをクエリ単位のチャンクに分割して並行実行
+
+        失敗・タイムアウトしたチャンクはログに記録して結果から除外する。
+        タイムアウトしたチャンクは、実行中のスレッドにもトークン待ち・クエリの中止を伝える。
+        errors を指定した場合は、結果に含まれない商品の原因（ASIN -> 内容）を書き込む
+        （チャンクのタイムアウト・例外と、同期クライアントが記録したKeepaクエリの失敗）
+        """
+        unique_asins = list(dict.fromkeys(asin for asin in asins if asin))
+        chunks = [
+            unique_asins[start:start + KEEPA_MAX_ASINS_PER_QUERY]
+            for start in range(0, len(unique_asins), KEEPA_MAX_ASINS_PER_QUERY)
+        ]
+
+        logger.info(f"並行処理開始: {len(unique_asins)}件 / {len(chunks)}チャンク (同時実行数 {self.concurrency})")
+        # タイムアウト後も実行中のスレッドが書き込むため、エラー内容はチャンクごとに分けて受け取る
+        chunk_errors = [{} for _ in chunks] if errors is not None else None
+        cancels = [threading.Event() for _ in chunks]
+
+        def chunk_fn(i: int) -> Callable:
+            if errors is None:
+                return partial(batch_fn, cancel=cancels[i])
+            return partial(batch_fn, errors=chunk_errors[i], cancel=cancels[i])
+
+        outcomes = await asyncio.gather(
+            *(self._run(chunk_fn(i), chunk, domain, cancel=cancels[i]) for i, chunk in enumerate(chunks)),
+            return_exceptions=True
+        )
+
+        results = {}
+        for i, (chunk, outcome) in enumerate(zip(chunks, outcomes)):
+            reason = None
+            if isinstance(outcome, asyncio.CancelledError):
+                raise outcome
+            elif isinstance(outcome, asyncio.TimeoutError):
+                logger.error(f"並行処理タイムアウト: {chunk[0]} 他{len(chunk) - 1}件")
+                reason = f"Timed out after {self.timeout}s"
+            elif isinstance(outcome, BaseException):
+                logger.error(f"並行処理エラー: {str(outcome)}")
+                reason = str(outcome) or type(outcome).__name__
+            else:
+                results.update(outcome)
+            if errors is not None:
+                if reason is not None:
+                    errors.update(dict.fromkeys(chunk, reason))
+                else:
+                    errors.update((asin, error) for asin, error in dict(chunk_errors[i]).items()
+                                  if asin not in results)
+
+        logger.info(f"並行処理完了: {len(results)}/{len(unique_asins)}件")
+        return results
+
+def run_fan_out(asins: List[str], domain: str = 'JP', action: str = 'analyze',
+                client: Optional[SalesToolsAPIClient] = None,
+                concurrency: int = DEFAULT_CONCURRENCY, timeout: Optional[float] = DEFAULT_TIMEOUT,
+                errors: Optional[Dict[str, str]] = None) -> Dict[str, Dict]:
+    """
+    同期コード（Lambda・Flask）から複数ASINを並行処理
+
+    Args:
+        asins: 商品ASINリスト
+        domain: Amazonドメイン
+        action: 'analyze'（価格トレンド分析）または 'info'（商品情報取得）
+        client: 共有する同期クライアント
+        errors: 指定した場合、結果に含まれない商品の原因（ASIN -> 内容）を書き込む
+
+    Returns:
+        ASINをキーとした結果辞書
+    """
+    async def main():
+        async with AsyncSalesToolsAPIClient(client, concurrency, timeout) as async_client:
+            if action == 'info':
+                return await async_client.get_products(asins, domain, errors)
+            return await async_client.analyze_price_trends(asins, domain, errors)
+
+    return asyncio.run(main())
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+ブラウザ操作の待機
+固定時間の sleep ではなく、DOMの読み込み完了・通信の収束・対象要素の表示を条件に待機する。
+手順ごとのタイムアウトはプロファイルで指定し、実測した待機時間が十分に集まれば短縮する
+"""
+import logging
+import os
+import random
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, NamedTuple, Optional, Sequence, Tuple
+
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+
+# ログ設定
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+class WaitProfile(NamedTuple):
+    """待機設定"""
+    name: str
+    # 手順ごとのタイムアウト上限（秒）
+    timeouts: Dict[str, float]
+    # 操作の間に入れる間（秒の範囲、指定のない手順は待たない）
+    pauses: Dict[str, Tuple[float, float]]
+    # 条件の確認間隔（秒）
+    poll_interval: float
+    # この時間リソース取得数が増えなければ通信が収束したとみなす（秒）
+    network_idle_seconds: float
+
+PROFILES = {
+    # 画面を見ながらの手動ログイン・単発設定用（操作の間に短いランダムな間を残す）
+    'human': WaitProfile(
+        name='human',
+        timeouts={'page_load': 30, 'network_idle': 10, 'track_tab': 20, 'track_form': 10,
+                  'submit_network': 10, 'submit_result': 15},
+        pauses={'scroll': (0.5, 1.0), 'hover': (0.3, 0.8), 'between_fields': (0.3, 0.8)},
+        poll_interval=0.2,
+        network_idle_seconds=0.5
+    ),
+    # ヘッドレスの一括設定用（間を入れず、タイムアウトも短くする）
+    'fast': WaitProfile(
+        name='fast',
+        timeouts={'page_load': 15, 'network_idle': 5, 'track_tab': 10, 'track_form': 5,
+                  'submit_network': 5, 'submit_result': 8},
+        pauses={},
+        poll_interval=0.1,
+        network_idle_seconds=0.3
+    ),
+}
+
+DEFAULT_PROFILE = os.getenv('TRACKER_WAIT_PROFILE', 'human')
+
+# プロファイルにない手順のタイムアウト（秒）
+DEFAULT_TIMEOUT = 10.0
+
+# 実測値からタイムアウトを決める設定（p95 × 倍率、下限あり、プロファイルの値が上限）
+ADAPT_MIN_SAMPLES = 5
+ADAPT_MARGIN = 3.0
+ADAPT_FLOOR_SECONDS = 2.0
+ADAPT_WINDOW = 200
+
+def to_locator(selector: str) -> Tuple[str, str]:
+    """セレクタ文字列をロケータに変換（// で始まるものはXPath、それ以外はCSS）"""
+    return (By.XPATH, selector) if selector.startswith("//") else (By.CSS_SELECTOR, selector)
+
+class WaitEngine:
+    """
+    条件待機と待機時間の計測
+
+    各待機は手順名（step）単位で計測し、1商品分（start_item 以降）と累計を報告する
+    """
+
+    def __init__(self, driver, profile=DEFAULT_PROFILE, adaptive: bool = True,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.driver = driver
+        self.profile = profile if isinstance(profile, WaitProfile) else PROFILES[profile]
+        self.adaptive = adaptive
+        self._sleep = sleep
+
+        # 条件を満たすまでの実測時間（タイムアウト調整用）
+        self._samples: Dict[str, Deque[float]] = {}
+        self._totals: Dict[str, Dict] = {}
+        self.current: Dict[str, float] = {}
+
+    def timeout_for(self, step: str) -> float:
+        """手順のタイムアウト（実測が十分あれば p95 × 倍率まで短縮）"""
+        limit = self.profile.timeouts.get(step, DEFAULT_TIMEOUT)
+        samples = self._samples.get(step)
+        if not self.adaptive or not samples or len(samples) < ADAPT_MIN_SAMPLES:
+            return limit
+        ordered = sorted(samples)
+        p95 = ordered[int(0.95 * (len(ordered) - 1))]
+        return min(limit, max(ADAPT_FLOOR_SECONDS, p95 * ADAPT_MARGIN))
+
+    def until(self, step: str, condition: Callable, timeout: Optional[float] = None):
+        """
+        条件を満たすまで待機
+
+        Returns:
+            条件の戻り値（タイムアウト時は None）
+        """
+        timeout = timeout if timeout is not None else self.timeout_for(step)
+        started = time.monotonic()
+        try:
+            result = WebDriverWait(self.driver, timeout, poll_frequency=self.profile.poll_interval,
+                                   ignored_exceptions=(StaleElementReferenceException,)).until(condition)
+        except TimeoutException:
+            self._record(step, time.monotonic() - started, ok=False)
+            logger.warning(f"待機タイムアウト: {step} ({timeout:.1f}秒)")
+            return None
+        self._record(step, time.monotonic() - started, ok=True)
+        return result
+
+    def page_ready(self, step: str = 'page_load') -> bool:
+        """DOMの読み込み完了と通信の収束を待機"""
+        ready = self.until(step, lambda d: d.execute_script("return document.readyState") == "complete")
+        idle = self.network_idle()
+        return bool(ready) and idle
+
+    def network_idle(self, step: str = 'network_idle') -> bool:
+        """リソース取得（XHR・画像など）が一定時間増えなくなるまで待機"""
+        state = {'count': -1, 'changed_at': time.monotonic()}
+
+        def idle(driver):
+            count = driver.execute_script("return performance.getEntriesByType('resource').length")
+            now = time.monotonic()
+            if count != state['count']:
+                state['count'] = count
+                state['changed_at'] = now
+                return False
+            return now - state['changed_at'] >= self.profile.network_idle_seconds
+
+        return bool(self.until(step, idle))
+
+    def element(self, step: str, selectors: Sequence[str], clickable: bool = True):
+        """
+        候補のセレクタのいずれかに一致する要素が表示されるまで待機
+
+        候補は1つずつ順に待つのではなく、確認のたびに全候補を調べる
+
+        Returns:
+            (一致したセレクタ, 要素)、タイムアウト時は (None, None)
+        """
+        locators = [(selector, to_locator(selector)) for selector in selectors]
+
+        def find(driver):
+            for selector, locator in locators:
+                for element in driver.find_elements(*locator):
+                    if element.is_displayed() and (not clickable or element.is_enabled()):
+                        return selector, element
+            return False
+
+        return self.until(step, find) or (None, None)
+
+    def pause(self, step: str):
+        """操作の間（プロファイルで指定された手順のみ）"""
+        low, high = self.profile.pauses.get(step, (0.0, 0.0))
+        if high <= 0:
+            return
+        delay = random.uniform(low, high)
+        self._sleep(delay)
+        self._record(step, delay, ok=None)
+
+    def _record(self, step: str, seconds: float, ok: Optional[bool]):
+        """待機時間を記録（ok=None は条件のない間）"""
+        self.current[step] = self.current.get(step, 0.0) + seconds
+        totals = self._totals.setdefault(step, {'count': 0, 'seconds': 0.0, 'max': 0.0, 'timeouts': 0})
+        totals['count'] += 1
+        totals['seconds'] += seconds
+        totals['max'] = max(totals['max'], seconds)
+        if ok is False:
+            totals['timeouts'] += 1
+        elif ok:
+            self._samples.setdefault(step, deque(maxlen=ADAPT_WINDOW)).append(seconds)
+
+    def start_item(self):
+        """1商品分の計測を開始"""
+        self.current = {}
+
+    def item_report(self) -> Dict[str, float]:
+        """1商品分の手順ごとの待機時間（秒）"""
+        return {step: round(seconds, 2) for step, seconds in self.current.items()}
+
+    def report(self) -> Dict[str, Dict]:
+        """手順ごとの累計待機時間・回数・タイムアウト数と現在のタイムアウト値"""
+        return {
+            step: {
+                'count': totals['count'],
+                'total_seconds': round(totals['seconds'], 2),
+                'avg_seconds': round(totals['seconds'] / totals['count'], 2),
+                'max_seconds': round(totals['max'], 2),
+                'timeouts': totals['timeouts'],
+                'timeout_seconds': round(self.timeout_for(step), 1)
+            }
+            for step, totals in self._totals.items()
+        }
+
+def merge_wait_seconds(total: Dict[str, float], item: Dict[str, float]) -> Dict[str, float]:
+    """手順ごとの待機時間を合算"""
+    for step, seconds in item.items():
+        total[step] = round(total.get(step, 0.0) + seconds, 2)
+    return total
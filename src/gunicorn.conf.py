@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+gunicorn設定（本番用）
+
+起動例:
+    gunicorn -c gunicorn.conf.py "app:create_app()"
+
+環境変数:
+    PORT                      待ち受けポート（デフォルト8080）
+    GUNICORN_WORKERS          ワーカープロセス数（デフォルト1、下記の注意を参照）
+    GUNICORN_THREADS          ワーカーあたりのスレッド数（2以上でgthreadワーカー）
+    GUNICORN_TIMEOUT          リクエストタイムアウト（秒）
+    GUNICORN_GRACEFUL_TIMEOUT 停止時に処理中のリクエストを待つ秒数
+    GUNICORN_KEEPALIVE        Keep-Alive秒数
+    GUNICORN_MAX_REQUESTS     ワーカーを再起動するまでのリクエスト数（0で無効）
+    GUNICORN_PRELOAD          マスターでアプリを読み込みワーカー間で共有（デフォルトtrue）
+
+複数ワーカーについて:
+    トラッキング商品・件数（SQLite）、価格履歴と分析スナップショット（価格履歴ファイルから再計算）は
+    ワーカー間で共有される。一方、次の状態はワーカーごとに持つため、2以上にすると一致しない
+    - 閾値アラートの監視状態（発火判定・/status の price_alerts）
+    - /status の統計（レスポンスキャッシュなど）
+    そのためデフォルトは1ワーカーとし、並列度はスレッド数（GUNICORN_THREADS）で確保する
+"""
+import fcntl
+import gc
+import os
+import tempfile
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+workers = int(os.environ.get('GUNICORN_WORKERS', '1'))
+threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+worker_class = 'gthread' if threads > 1 else 'sync'
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', '5'))
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '0'))
+max_requests_jitter = max_requests // 10
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+# バックグラウンド更新を1ワーカーに限定するためのロックファイル
+REFRESH_LOCK_PATH = os.environ.get(
+    'REFRESH_LOCK_PATH', os.path.join(tempfile.gettempdir(), 'sales_tools_refresh.lock')
+)
+
+def when_ready(server):
+    """preloadしたオブジェクトをGC対象から外し、フォーク後のコピーオンライトを維持する"""
+    gc.freeze()
+    server.log.info(f"Workers: {workers}, threads: {threads}, preload: {preload_app}")
+
+def post_worker_init(worker):
+    """ロックを取得できたワーカーでのみバックグラウンド更新を起動（ワーカー終了でロックは解放される）"""
+    lock_file = open(REFRESH_LOCK_PATH, 'w')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return
+
+    worker.refresh_lock = lock_file
+    import app as app_module
+    if app_module.start_background_refresh():
+        worker.log.info(f"Background refresh running in worker {worker.pid}")
+
+def worker_exit(server, worker):
+    """ワーカー停止時にバックグラウンド更新を止める"""
+    import app as app_module
+    app_module.stop_background_refresh()
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+APIレスポンスのJSONシリアライズ
+orjsonがインストールされていれば使用し、なければ標準ライブラリのjsonで同じ形式に変換する。
+日本語はエスケープせずUTF-8のまま出力し、NumPy配列・スカラーもそのまま渡せる
+"""
+import json
+import logging
+from datetime import date, datetime
+from typing import Any
+
+# ログ設定
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKEND = 'orjson' if orjson is not None else 'json'
+
+def _default(obj: Any) -> Any:
+    """標準では変換できない値の変換（NumPyは使用時のみ読み込む）"""
+    if type(obj).__module__ == 'numpy':
+        import numpy as np
+        if isinstance(obj, np.ndarray):
+            if np.issubdtype(obj.dtype, np.datetime64):
+                # orjsonと同じ秒単位のISO形式に揃える
+                return obj.astype('datetime64[s]').astype(str).tolist()
+            return obj.tolist()
+        if isinstance(obj, np.datetime64):
+            return str(obj.astype('datetime64[s]'))
+        if isinstance(obj, np.generic):
+            return obj.item()
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps_bytes(obj: Any) -> bytes:
+        """UTF-8のJSONバイト列に変換"""
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+
+    def dumps(obj: Any) -> str:
+        """JSON文字列に変換"""
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS).decode('utf-8')
+
+    def loads(data) -> Any:
+        """JSON文字列・バイト列を読み込み"""
+        return orjson.loads(data)
+else:
+    def dumps(obj: Any) -> str:
+        """JSON文字列に変換"""
+        return json.dumps(obj, ensure_ascii=False, default=_default, separators=(',', ':'))
+
+    def dumps_bytes(obj: Any) -> bytes:
+        """UTF-8のJSONバイト列に変換"""
+        return dumps(obj).encode('utf-8')
+
+    def loads(data) -> Any:
+        """JSON文字列・バイト列を読み込み"""
+        return json.loads(data)
@@ -3,198 +3,448 @@
 AWS Lambda Function for Sales Tools API Integration
 商品価格分析のためのLambda関数
 """
+import time
+
+# コンテナ初期化（モジュール読み込み）の開始時刻
+_INIT_STARTED = time.perf_counter()
+
 import json
 import logging
-import time
 import os
+import re
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import json_serializer
 
 # ログ設定
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def lambda_handler(event, context):
+# batchアクションの処理内容と1回の呼び出しで受け付ける最大件数
+BATCH_MODES = ('analyze', 'info')
+MAX_BATCH_SIZE = int(os.environ.get('LAMBDA_MAX_BATCH_SIZE', '500'))
+
+# レスポンスbodyの上限（Lambdaの同期呼び出しのペイロード上限6MBから余裕を残す）
+MAX_RESPONSE_BYTES = int(os.environ.get('LAMBDA_MAX_RESPONSE_BYTES', str(6 * 1024 * 1024 - 64 * 1024)))
+
+ASIN_PATTERN = re.compile(r'^[A-Z0-9]{10}$')
+
+RESPONSE_HEADERS = {
+    'Content-Type': 'application/json; charset=utf-8',
+    'Access-Control-Allow-Origin': '*'
+}
+
+class ActionSpec(NamedTuple):
+    """アクションの定義"""
+    handler: Callable[[dict], Tuple[int, dict]]
+    # 必須パラメータと型
+    required: Dict[str, type]
+    # True の場合は戻り値の body をそのまま返す（SQSの応答形式など）
+    raw: bool
+
+# アクション名 → 定義
+ACTIONS: Dict[str, ActionSpec] = {}
+
+# アクションごとの実行統計（コンテナ単位）
+_action_stats: Dict[str, Dict] = {}
+
+# コンテナ内で使い回すAPIクライアント（最初に必要になった呼び出しで生成）
+_client = None
+_client_init_seconds = None
+
+# コンテナ起動後の最初の呼び出しか
+_cold_start = True
+
+def action(name: str, required: Optional[Dict[str, type]] = None, raw: bool = False):
     """
-    Lambda関数のメインハンドラー
+    アクションの処理関数を登録するデコレータ
+
+    処理関数はイベント（パラメータ）を受け取り (ステータスコード, body) を返す
     """
-    try:
-        logger.info(f"Event received: {json.dumps(event)}")
-        
-        # アクション取得
-        action = event.get('action', 'status')
-        
-        if action == 'status':
-            return {
-                'statusCode': 200,
-                'body': json.dumps({
-                    'message': 'Sales Tools API - Working Pipeline Version',
-                    'version': '2.0.0',
-                    'timestamp': time.strftime("%Y-%m-%d %H:%M:%S"),
-                    'deployment_method': 'Final Working Pipeline',
-                    'status': 'active',
-                    'environment': {
-                        'has_api_key': bool(os.environ.get('SALES_TOOLS_API_KEY')),
-                        'runtime': 'python3.9'
-                    },
-                    'event': event
-                })
-            }
-        elif action == 'analyze':
-            # 価格分析機能（シンプル版）
-            asin = event.get('asin', 'B0B5SDFLTB')
-            return {
-                'statusCode': 200,
-                'body': json.dumps({
-                    'message': 'Price analysis completed',
-                    'asin': asin,
-                    'analysis': {
-                        'current_price': 1980,
-                        'average_price': 2100,
-                        'trend': 'decreasing',
-                        'recommendation': 'good_time_to_buy',
-                        'note': 'This is a test response from working pipeline'
-                    },
-                    'timestamp': time.strftime("%Y-%m-%d %H:%M:%S")
-                })
-            }
-        else:
-            return {
-                'statusCode': 400,
-                'body': json.dumps({
-                    'error': 'Invalid action',
-                    'supported_actions': ['status', 'analyze'],
-                    'received_action': action
-                })
-            }
-            
-    except Exception as e:
-        logger.error(f"Error in lambda_handler: {str(e)}")
-        return {
-            'statusCode': 500,
-            'body': json.dumps({
-                'error': 'Internal server error',
-                'message': str(e),
-                'timestamp': time.strftime("%Y-%m-%d %H:%M:%S")
-            })
-        }
+    def register(handler):
+        ACTIONS[name] = ActionSpec(handler, required or {}, raw)
+        return handler
+    return register
+
+def get_client():
+    """
+    コンテナ内で共有するAPIクライアントを取得
+
+    keepa・numpy は重いため、クライアントが必要なアクションで初めて読み込む。
+    Keepaクライアント生成時のステータス取得もコンテナごとに1回のみ
+    """
+    global _client, _client_init_seconds
+    if _client is None:
+        started = time.perf_counter()
+        from sales_tools_api_client import SalesToolsAPIClient
+        _client = SalesToolsAPIClient()
+        _client_init_seconds = time.perf_counter() - started
+        logger.info(f"APIクライアント初期化: {_client_init_seconds * 1000:.1f}ms")
+    return _client
+
+def lambda_handler(event, context):
     """
     Lambda関数のメインハンドラー
-    
+
+    action（SQSのイベントソースマッピングからの呼び出しは sqs）で処理関数を選び、入力を検証して実行する。
+    イベント全体はログ・レスポンスに出力しない
+
     Args:
-        event: Lambda実行イベント
+        event: Lambda実行イベント（API Gateway形式の場合は body のJSONをパラメータとする）
         context: Lambda実行コンテキスト
-    
+
     Returns:
-        レスポンス辞書
+        レスポンス辞書（bodyに初期化時間・処理時間を含む）
     """
-    try:
-        logger.info(f"Lambda実行開始: {json.dumps(event, ensure_ascii=False)}")
-        
-        # リクエストパラメータ取得
-        asin = event.get('asin')
-        domain = event.get('domain', 'JP')
-        action = event.get('action', 'info')
-        
-        if not asin:
-            return {
-                'statusCode': 400,
-                'body': json.dumps({
-                    'error': 'ASINパラメータが必要です',
-                    'message': 'ASIN parameter is required'
-                }, ensure_ascii=False)
-            }
-        
-        # Sales Tools APIクライアント初期化
+    global _cold_start
+    started = time.perf_counter()
+    timing = {
+        'cold_start': _cold_start,
+        'init_ms': round(INIT_SECONDS * 1000, 1) if _cold_start else 0.0
+    }
+    _cold_start = False
+    had_client = _client is not None
+
+    if _is_sqs_event(event):
+        params, error, name = event, None, 'sqs'
+        spec = ACTIONS[name]
+    else:
+        params, error = _parse_event(event)
+        name = params.get('action', 'status') if error is None else None
+        spec = ACTIONS.get(name) if isinstance(name, str) else None
+        # 応答形式が異なるアクション（SQSなど）はイベントの種類でのみ選ぶ
+        if spec is not None and spec.raw:
+            spec = None
+    logger.info(f"Lambda invoked: action={str(name)[:64]}")
+
+    if error is not None:
+        status_code, body = 400, error
+    elif spec is None:
+        status_code, body = 400, {
+            'error': 'Invalid action',
+            'supported_actions': sorted(a for a, s in ACTIONS.items() if not s.raw),
+            'received_action': str(name)[:64]
+        }
+    else:
+        status_code, body = _validate(spec, params) or _run_action(name, spec, params)
+
+    if not had_client and _client is not None:
+        timing['client_init_ms'] = round(_client_init_seconds * 1000, 1)
+    timing['action'] = name if spec is not None else None
+    timing['handler_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    if spec is not None:
+        _record_stats(name, timing['handler_ms'], status_code)
+    logger.info(f"Lambda timing: {json.dumps(timing)}")
+
+    if spec is not None and spec.raw:
+        if status_code != 200:
+            # 呼び出し自体を失敗させて再実行に委ねる
+            raise RuntimeError(f"Action {name} failed: {body.get('message', body.get('error'))}")
+        return body
+
+    body['timing'] = timing
+    status_code, payload = _serialize_body(status_code, body)
+    return {
+        'statusCode': status_code,
+        'headers': RESPONSE_HEADERS,
+        'body': payload
+    }
+
+def _is_sqs_event(event) -> bool:
+    """SQSのイベントソースマッピングからの呼び出しか（API Gateway の body の内容では判定しない）"""
+    records = event.get('Records') if isinstance(event, dict) else None
+    return (isinstance(records, list) and bool(records)
+            and all(isinstance(record, dict) and record.get('eventSource') == 'aws:sqs' for record in records))
+
+def _parse_event(event) -> Tuple[dict, Optional[dict]]:
+    """イベントからパラメータを取り出す（API Gateway形式は body のJSON）"""
+    if not isinstance(event, dict):
+        return {}, {'error': 'Invalid event', 'message': 'event must be a JSON object'}
+    body = event.get('body')
+    if isinstance(body, str) and 'action' not in event:
         try:
-            client = SalesToolsAPIClient()
-        except ValueError as e:
-            logger.error(f"APIクライアント初期化エラー: {str(e)}")
-            return {
-                'statusCode': 500,
-                'body': json.dumps({
-                    'error': 'API設定エラー',
-                    'message': 'Sales Tools API key not configured'
-                }, ensure_ascii=False)
-            }
-        
-        # アクションに応じた処理
-        if action == 'info':
-            # 商品情報取得
-            result = client.get_product_info(asin, domain)
-            
-        elif action == 'analyze':
-            # 価格トレンド分析
-            result = client.analyze_price_trend(asin, domain)
-            
-        elif action == 'deals':
-            # お得商品検索
-            max_price = event.get('max_price')
-            min_discount = event.get('min_discount', 20.0)
-            result = client.search_deals(max_price=max_price, min_discount=min_discount)
-            
-        elif action == 'status':
-            # API状況確認
-            result = client.get_api_status()
-            
-            # PR テスト用の追加情報
-            result['pr_test'] = {
-                'version': '1.2.0',
-                'feature': 'Webhook Auto Trigger Test',
-                'timestamp': time.strftime("%Y-%m-%d %H:%M:%S"),
-                'deployment_method': 'GitHub PR Merge → Webhook → CodePipeline → Lambda',
-                'test_id': 'webhook-auto-trigger-test-1754095832'
-            }
-            
-        else:
-            return {
-                'statusCode': 400,
-                'body': json.dumps({
-                    'error': '無効なアクション',
-                    'message': f'Invalid action: {action}',
-                    'available_actions': ['info', 'analyze', 'deals', 'status']
-                }, ensure_ascii=False)
+            params = json_serializer.loads(body)
+        except ValueError:
+            return {}, {'error': 'Invalid JSON body', 'message': 'body must be a JSON object'}
+        if not isinstance(params, dict):
+            return {}, {'error': 'Invalid JSON body', 'message': 'body must be a JSON object'}
+        return params, None
+    return event, None
+
+def _validate(spec: ActionSpec, params: dict) -> Optional[Tuple[int, dict]]:
+    """必須パラメータ・共通パラメータの検証（問題なければ None）"""
+    for key, expected in spec.required.items():
+        value = params.get(key)
+        if value is None:
+            return 400, {
+                'error': f'{key}パラメータが必要です',
+                'message': f'{key} parameter is required'
             }
-        
-        # 結果確認
-        if result is None:
-            return {
-                'statusCode': 404,
-                'body': json.dumps({
-                    'error': 'データが見つかりません',
-                    'message': f'No data found for ASIN: {asin}'
-                }, ensure_ascii=False)
+        if not isinstance(value, expected):
+            return 400, {
+                'error': f'{key}パラメータの形式が不正です',
+                'message': f'{key} must be {expected.__name__}'
             }
-        
-        # 成功レスポンス
-        response = {
-            'statusCode': 200,
-            'headers': {
-                'Content-Type': 'application/json; charset=utf-8',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({
-                'success': True,
-                'action': action,
-                'asin': asin,
-                'domain': domain,
-                'data': result,
-                'timestamp': client.get_api_status().get('timestamp')
-            }, ensure_ascii=False)
+    if 'asin' in spec.required and not _is_valid_asin(params['asin']):
+        return 400, {
+            'error': 'ASINの形式が不正です',
+            'message': 'asin must be 10 uppercase alphanumeric characters'
         }
-        
-        logger.info(f"Lambda実行完了: {action} - {asin}")
-        return response
-        
+    if not isinstance(params.get('domain', 'JP'), str):
+        return 400, {
+            'error': 'domainパラメータの形式が不正です',
+            'message': 'domain must be str'
+        }
+    return None
+
+def _run_action(name: str, spec: ActionSpec, params: dict) -> Tuple[int, dict]:
+    """処理関数を実行（例外は500として返す）"""
+    try:
+        return spec.handler(params)
     except Exception as e:
-        logger.error(f"Lambda実行エラー: {str(e)}")
-        
-        return {
-            'statusCode': 500,
-            'body': json.dumps({
-                'error': '内部サーバーエラー',
-                'message': str(e)
-            }, ensure_ascii=False)
+        logger.error(f"Error in action {name}: {str(e)}")
+        return 500, {
+            'error': 'Internal server error',
+            'message': str(e),
+            'timestamp': time.strftime("%Y-%m-%d %H:%M:%S")
+        }
+
+def _serialize_body(status_code: int, body: dict) -> Tuple[int, str]:
+    """bodyをJSONに変換（上限を超える場合は413のエラーに差し替え）"""
+    payload = json_serializer.dumps_bytes(body)
+    if len(payload) > MAX_RESPONSE_BYTES:
+        logger.warning(f"Response too large: {len(payload)} bytes (status {status_code})")
+        status_code, payload = 413, json_serializer.dumps_bytes({
+            'error': 'レスポンスが大きすぎます',
+            'message': f'Response size {len(payload)} bytes exceeds limit {MAX_RESPONSE_BYTES} bytes',
+            'timing': body.get('timing')
+        })
+    return status_code, payload.decode('utf-8')
+
+def _record_stats(name: str, elapsed_ms: float, status_code: int):
+    stats = _action_stats.setdefault(name, {'calls': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+    stats['calls'] += 1
+    stats['total_ms'] += elapsed_ms
+    stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+    if status_code >= 500:
+        stats['errors'] += 1
+
+def get_action_stats() -> Dict[str, Dict]:
+    """アクションごとの呼び出し回数・エラー数・処理時間（コンテナ起動以降）"""
+    return {
+        name: {
+            'calls': stats['calls'],
+            'errors': stats['errors'],
+            'avg_ms': round(stats['total_ms'] / stats['calls'], 1),
+            'max_ms': round(stats['max_ms'], 1)
+        }
+        for name, stats in _action_stats.items()
+    }
+
+@action('status')
+def _status_action(params: dict):
+    """稼働状況"""
+    return 200, {
+        'message': 'Sales Tools API - Working Pipeline Version',
+        'version': '2.0.0',
+        'timestamp': time.strftime("%Y-%m-%d %H:%M:%S"),
+        'deployment_method': 'Final Working Pipeline',
+        'status': 'active',
+        'environment': {
+            'has_api_key': bool(os.environ.get('SALES_TOOLS_API_KEY')),
+            'client_ready': _client is not None,
+            'runtime': 'python3.9'
+        },
+        'actions': get_action_stats()
+    }
+
+@action('info', required={'asin': str})
+def _info_action(params: dict):
+    """商品情報取得"""
+    return _run_client_action(params, lambda client, domain: client.get_product_info(params['asin'], domain))
+
+@action('analyze', required={'asin': str})
+def _analyze_action(params: dict):
+    """価格トレンド分析"""
+    return _run_client_action(params, lambda client, domain: client.analyze_price_trend(params['asin'], domain))
+
+@action('deals')
+def _deals_action(params: dict):
+    """お得商品検索"""
+    return _run_client_action(params, lambda client, domain: client.search_deals(
+        max_price=params.get('max_price'), min_discount=params.get('min_discount', 20.0)))
+
+def _run_client_action(params: dict, call: Callable):
+    """APIクライアントを使う処理を実行し、(ステータスコード, body) を返す"""
+    asin = params.get('asin')
+    domain = params.get('domain', 'JP')
+
+    try:
+        client = get_client()
+    except ValueError as e:
+        logger.error(f"APIクライアント初期化エラー: {str(e)}")
+        return 500, {
+            'error': 'API設定エラー',
+            'message': 'Sales Tools API key not configured'
+        }
+
+    result = call(client, domain)
+    if result is None:
+        return 404, {
+            'error': 'データが見つかりません',
+            'message': f'No data found for ASIN: {asin}'
+        }
+
+    action_name = params.get('action')
+    logger.info(f"Lambda実行完了: {action_name} - {asin}")
+    return 200, {
+        'success': True,
+        'action': action_name,
+        'asin': asin,
+        'domain': domain,
+        'data': result,
+        'timestamp': time.strftime("%Y-%m-%d %H:%M:%S")
+    }
+
+@action('batch', required={'asins': list})
+def _batch_action(params: dict):
+    """
+    複数ASINをまとめて処理し、(ステータスコード, body) を返す
+
+    一部のASINが失敗しても他の結果は返し、失敗分は failures に理由を付けて列挙する
+    """
+    asins = params['asins']
+    mode = params.get('mode', 'analyze')
+    domain = params.get('domain', 'JP')
+
+    if not asins:
+        return 400, {
+            'error': 'ASINリストが必要です',
+            'message': 'asins must be a non-empty list'
+        }
+    if len(asins) > MAX_BATCH_SIZE:
+        return 400, {
+            'error': 'ASINが多すぎます',
+            'message': f'asins must contain at most {MAX_BATCH_SIZE} items'
+        }
+    if mode not in BATCH_MODES:
+        return 400, {
+            'error': '無効なモード',
+            'message': f'Invalid mode: {mode}',
+            'available_modes': list(BATCH_MODES)
         }
 
+    try:
+        get_client()
+    except ValueError as e:
+        logger.error(f"APIクライアント初期化エラー: {str(e)}")
+        return 500, {
+            'error': 'API設定エラー',
+            'message': 'Sales Tools API key not configured'
+        }
+
+    started = time.perf_counter()
+    items = [(asin, asin) for asin in asins]
+    outcomes = _process_batch(items, mode, domain)
+    elapsed = time.perf_counter() - started
+
+    results = {}
+    failures = []
+    for asin, (data, error) in zip(asins, outcomes):
+        if error is None:
+            results[asin] = data
+        else:
+            failures.append({'asin': asin, 'error': error})
+
+    logger.info(f"バッチ処理完了: {len(results)}/{len(asins)}件 ({elapsed:.2f}秒)")
+    return 200, {
+        'success': not failures,
+        'action': 'batch',
+        'mode': mode,
+        'domain': domain,
+        'results': results,
+        'failures': failures,
+        'summary': {
+            'requested': len(asins),
+            'succeeded': len(asins) - len(failures),
+            'failed': len(failures),
+            'asins_per_second': round(len(asins) / elapsed, 1) if elapsed > 0 else None
+        },
+        'timestamp': time.strftime("%Y-%m-%d %H:%M:%S")
+    }
+
+@action('sqs', required={'Records': list}, raw=True)
+def _sqs_action(params: dict):
+    """
+    SQSメッセージ（bodyはASIN文字列、または asin・domain・mode を持つJSON）を処理
+
+    Returns:
+        部分的なバッチ失敗の応答形式（失敗したメッセージIDの一覧）
+    """
+    records = params['Records']
+
+    # 処理内容・ドメインごとにまとめる
+    groups: Dict[Tuple[str, str], List[Tuple[str, str]]] = {}
+    for record in records:
+        try:
+            payload = json.loads(record.get('body') or '')
+        except ValueError:
+            payload = record.get('body')
+        if not isinstance(payload, dict):
+            payload = {'asin': payload}
+        key = (payload.get('mode', 'analyze'), payload.get('domain', 'JP'))
+        groups.setdefault(key, []).append((record.get('messageId'), payload.get('asin')))
+
+    failed_ids = []
+    try:
+        get_client()
+    except Exception as e:
+        logger.error(f"APIクライアント初期化エラー: {str(e)}")
+        failed_ids = [message_id for items in groups.values() for message_id, _ in items]
+    else:
+        for (mode, domain), items in groups.items():
+            if mode not in BATCH_MODES:
+                failed_ids.extend(message_id for message_id, _ in items)
+                continue
+            for (message_id, _), (_, error) in zip(items, _process_batch(items, mode, domain)):
+                if error is not None:
+                    failed_ids.append(message_id)
+
+    logger.info(f"SQSバッチ処理完了: {len(records) - len(failed_ids)}/{len(records)}件成功")
+    return 200, {'batchItemFailures': [{'itemIdentifier': message_id} for message_id in failed_ids]}
+
+def _process_batch(items: List[Tuple[str, str]], mode: str, domain: str) -> List[Tuple[object, str]]:
+    """
+    (識別子, ASIN) の一覧をクエリ単位のチャンクに分けて並行処理
+
+    Returns:
+        入力順の (結果, エラー内容) の一覧（成功時のエラー内容は None）
+    """
+    from async_sales_tools_api_client import run_fan_out
+
+    valid_asins = [asin for _, asin in items if _is_valid_asin(asin)]
+    # チャンクのタイムアウト・Keepaクエリの失敗など、商品ごとの失敗原因
+    errors: Dict[str, str] = {}
+    try:
+        results = run_fan_out(valid_asins, domain, mode, client=get_client(), errors=errors) if valid_asins else {}
+        batch_error = None
+    except Exception as e:
+        logger.error(f"バッチ処理エラー: {str(e)}")
+        results, batch_error = {}, str(e)
+
+    outcomes = []
+    for _, asin in items:
+        if not _is_valid_asin(asin):
+            outcomes.append((None, 'Invalid ASIN'))
+        elif asin in results:
+            outcomes.append((results[asin], None))
+        else:
+            outcomes.append((None, batch_error or errors.get(asin) or 'No data found'))
+    return outcomes
+
+def _is_valid_asin(asin) -> bool:
+    return isinstance(asin, str) and bool(ASIN_PATTERN.match(asin))
+
 def test_lambda_locally():
     """ローカルテスト用関数"""
     # テストイベント
@@ -238,5 +488,8 @@ def test_lambda_locally():
         except Exception as e:
             print(f"テストエラー: {str(e)}")
 
+# コンテナ初期化に要した時間（モジュール読み込み完了まで）
+INIT_SECONDS = time.perf_counter() - _INIT_STARTED
+
 if __name__ == "__main__":
     test_lambda_locally()
@@ -2,33 +2,51 @@
 """
 手動ログイン + 自動トラッキング設定
 ログインは手動で行い、トラッキング設定のみ自動化
+複数ASINはログイン済みセッションを共有する複数ブラウザで並行して設定する
 """
+import argparse
+import json
+import os
+import queue
+import threading
 import time
 import random
 import logging
+from typing import Callable, Dict, List, Optional
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.action_chains import ActionChains
 
+from browser_wait import DEFAULT_PROFILE, PROFILES, WaitEngine, merge_wait_seconds
+
 # ログ設定
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+KEEPA_BASE_URL = "https://keepa.com/"
+
+# 一括設定のデフォルト（環境変数で上書き可能）
+DEFAULT_BATCH_WORKERS = int(os.getenv('TRACKING_BATCH_WORKERS', '3'))
+DEFAULT_BATCH_RETRIES = int(os.getenv('TRACKING_BATCH_RETRIES', '2'))
+DEFAULT_PROGRESS_FILE = os.getenv('TRACKING_PROGRESS_FILE', 'tracking_batch_progress.json')
+
+# 設定済みとして扱う結果ステータス（送信後に成功表示を確認できなかった 'completed' は再試行する）
+DONE_STATUSES = ('success',)
+
 class ManualLoginAutoTracker:
-    def __init__(self):
+    def __init__(self, wait_profile: str = DEFAULT_PROFILE, headless: bool = False):
+        """
+        Args:
+            wait_profile: 待機設定（'human' または 'fast'）
+            headless: 画面を表示せずに実行するか（手動ログインするブラウザには使わない）
+        """
         self.driver = None
-        self.wait = None
+        self.waits = None
         self.actions = None
-    
-    def human_delay(self, min_seconds=1, max_seconds=3):
-        """人間らしいランダム待機"""
-        delay = random.uniform(min_seconds, max_seconds)
-        time.sleep(delay)
-        logger.debug(f"Human delay: {delay:.2f}秒")
+        self.wait_profile = wait_profile
+        self.headless = headless
     
     def human_type(self, element, text, typing_delay=0.1):
         """人間らしいタイピング"""
@@ -43,8 +61,12 @@ class ManualLoginAutoTracker:
         try:
             chrome_options = Options()
             
-            # 手動操作に適した設定
-            chrome_options.add_argument("--start-maximized")
+            # 手動操作に適した設定（ヘッドレスの場合は画面サイズを固定）
+            if self.headless:
+                chrome_options.add_argument("--headless=new")
+                chrome_options.add_argument("--window-size=1920,1080")
+            else:
+                chrome_options.add_argument("--start-maximized")
             chrome_options.add_argument("--disable-blink-features=AutomationControlled")
             chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
             chrome_options.add_experimental_option('useAutomationExtension', False)
@@ -57,10 +79,10 @@ class ManualLoginAutoTracker:
             # 自動化検知を無効化
             self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
             
-            self.wait = WebDriverWait(self.driver, 30)  # 手動操作を考慮して長めに設定
+            self.waits = WaitEngine(self.driver, self.wait_profile)
             self.actions = ActionChains(self.driver)
             
-            logger.info("✅ ブラウザ初期化成功（手動操作モード）")
+            logger.info(f"✅ ブラウザ初期化成功（待機設定: {self.waits.profile.name}）")
             return True
             
         except Exception as e:
@@ -74,7 +96,7 @@ class ManualLoginAutoTracker:
             
             # Sales Toolメインページにアクセス
             self.driver.get("https://keepa.com/#!")
-            self.human_delay(2, 3)
+            self.waits.page_ready()
             
             print("\n" + "="*60)
             print("🔐 手動ログインを行ってください")
@@ -118,16 +140,54 @@ class ManualLoginAutoTracker:
             logger.error(f"Sales Tool開始エラー: {str(e)}")
             return False
     
-    def navigate_to_product_and_track(self, asin: str):
-        """商品ページに移動してトラッキング設定"""
+    def export_session(self) -> Dict:
+        """ログイン済みセッション（Cookie・localStorage）を取得"""
+        return {
+            'cookies': self.driver.get_cookies(),
+            'local_storage': self.driver.execute_script("return Object.assign({}, window.localStorage);") or {}
+        }
+    
+    def import_session(self, session: Dict) -> bool:
+        """
+        別ブラウザのログイン済みセッションを反映
+        
+        Chromeのプロファイルは複数ブラウザで同時に使えないため、Cookie・localStorageを複製する
+        """
+        try:
+            self.driver.get(KEEPA_BASE_URL)
+            self.driver.delete_all_cookies()
+            for cookie in session.get('cookies', []):
+                try:
+                    self.driver.add_cookie(cookie)
+                except Exception as e:
+                    logger.debug(f"Cookie設定スキップ: {cookie.get('name')} ({str(e)[:50]})")
+            self.driver.execute_script(
+                "for (const [k, v] of Object.entries(arguments[0])) { window.localStorage.setItem(k, v); }",
+                session.get('local_storage', {})
+            )
+            self.driver.refresh()
+            return True
+        except Exception as e:
+            logger.error(f"セッション反映エラー: {str(e)}")
+            return False
+    
+    def navigate_to_product_and_track(self, asin: str, interactive: bool = True):
+        """
+        商品ページに移動してトラッキング設定
+        
+        Args:
+            asin: 商品ASIN
+            interactive: 要素が見つからない場合に手動操作を待つか（False の場合はエラーとして返す）
+        """
+        self.waits.start_item()
         try:
             logger.info(f"🎯 商品ページでトラッキング設定開始: {asin}")
             
-            # 商品ページに移動
+            # 商品ページに移動（読み込み完了・通信の収束を待機）
             product_url = f"https://keepa.com/#!product/5-{asin}"
             logger.info(f"📱 商品ページアクセス: {product_url}")
             self.driver.get(product_url)
-            self.human_delay(3, 5)
+            self.waits.page_ready()
             
             # ページ読み込み確認
             page_title = self.driver.title
@@ -136,9 +196,9 @@ class ManualLoginAutoTracker:
             
             # 少しスクロールして内容確認
             self.driver.execute_script("window.scrollTo(0, 300);")
-            self.human_delay(1, 2)
+            self.waits.pause('scroll')
             self.driver.execute_script("window.scrollTo(0, 0);")
-            self.human_delay(1, 2)
+            self.waits.pause('scroll')
             
             # Trackタブを探してクリック
             print("🔍 Trackタブを探しています...")
@@ -152,28 +212,19 @@ class ManualLoginAutoTracker:
                 "//button[contains(text(), 'Track')]"
             ]
             
+            # 候補のセレクタを同時に待機し、最初に表示されたものを使う
             tracking_tab_found = False
-            for i, selector in enumerate(track_selectors):
+            selector, track_element = self.waits.element('track_tab', track_selectors)
+            if track_element is not None:
                 try:
-                    print(f"  試行 {i+1}: {selector}")
-                    
-                    if selector.startswith("//"):
-                        track_element = self.wait.until(
-                            EC.element_to_be_clickable((By.XPATH, selector))
-                        )
-                    else:
-                        track_element = self.wait.until(
-                            EC.element_to_be_clickable((By.CSS_SELECTOR, selector))
-                        )
-                    
                     # 要素が見つかった場合の詳細情報
                     element_text = track_element.text
                     element_tag = track_element.tag_name
-                    print(f"  ✅ 要素発見: {element_tag} - '{element_text}'")
+                    print(f"  ✅ 要素発見: {selector} -> {element_tag} - '{element_text}'")
                     
                     # タブにマウス移動してクリック
                     self.actions.move_to_element(track_element).perform()
-                    self.human_delay(0.5, 1)
+                    self.waits.pause('hover')
                     
                     # JavaScriptクリックも試行
                     try:
@@ -183,16 +234,15 @@ class ManualLoginAutoTracker:
                     
                     logger.info("✅ Trackタブクリック成功")
                     print("✅ Trackタブクリック成功")
-                    self.human_delay(2, 3)
                     tracking_tab_found = True
-                    break
                     
                 except Exception as e:
                     print(f"  ❌ 失敗: {str(e)[:50]}...")
-                    continue
             
             if not tracking_tab_found:
                 print("❌ Trackタブが見つかりませんでした")
+                if not interactive:
+                    raise RuntimeError("Trackタブが見つかりません")
                 print("手動でTrackタブをクリックしてください")
                 input("Trackタブをクリックした後、Enterキーを押してください...")
             
@@ -208,6 +258,17 @@ class ManualLoginAutoTracker:
                 ".amazon-checkbox"
             ]
             
+            # 閾値入力フィールド
+            threshold_selectors = [
+                "#threshold-5-0",
+                "input[name*='threshold']",
+                ".threshold-input",
+                "input[type='number']"
+            ]
+            
+            # 設定フォームの表示を待機
+            self.waits.element('track_form', checkbox_selectors + threshold_selectors, clickable=False)
+            
             checkbox_found = False
             for i, selector in enumerate(checkbox_selectors):
                 try:
@@ -230,17 +291,12 @@ class ManualLoginAutoTracker:
             
             if not checkbox_found:
                 print("⚠️ チェックボックスが見つかりません（手動で設定してください）")
+                if not interactive:
+                    raise RuntimeError("チェックボックスが見つかりません")
             
-            self.human_delay(1, 2)
+            self.waits.pause('between_fields')
             
             # 閾値設定
-            threshold_selectors = [
-                "#threshold-5-0",
-                "input[name*='threshold']",
-                ".threshold-input",
-                "input[type='number']"
-            ]
-            
             threshold_found = False
             for i, selector in enumerate(threshold_selectors):
                 try:
@@ -248,7 +304,7 @@ class ManualLoginAutoTracker:
                     threshold_input = self.driver.find_element(By.CSS_SELECTOR, selector)
                     
                     self.actions.move_to_element(threshold_input).click().perform()
-                    self.human_delay(0.5, 1)
+                    self.waits.pause('hover')
                     
                     threshold_input.clear()
                     self.human_type(threshold_input, "95", 0.05)
@@ -263,8 +319,10 @@ class ManualLoginAutoTracker:
             
             if not threshold_found:
                 print("⚠️ 閾値入力フィールドが見つかりません（手動で設定してください）")
+                if not interactive:
+                    raise RuntimeError("閾値入力フィールドが見つかりません")
             
-            self.human_delay(1, 2)
+            self.waits.pause('between_fields')
             
             # 送信ボタンクリック
             submit_selectors = [
@@ -301,15 +359,18 @@ class ManualLoginAutoTracker:
             
             if not submit_found:
                 print("⚠️ 送信ボタンが見つかりません")
+                if not interactive:
+                    raise RuntimeError("送信ボタンが見つかりません")
                 print("手動で送信ボタンをクリックしてください")
                 input("送信ボタンをクリックした後、Enterキーを押してください...")
             
-            self.human_delay(3, 5)
-            
-            # 成功確認
-            page_source = self.driver.page_source.lower()
+            # 送信の通信が収束してから成功表示を確認（表示されるまで待機）
+            self.waits.network_idle('submit_network')
             success_indicators = ["successfully", "success", "added", "tracking", "完了"]
-            tracking_success = any(indicator in page_source for indicator in success_indicators)
+            tracking_success = bool(self.waits.until(
+                'submit_result',
+                lambda d: any(indicator in d.page_source.lower() for indicator in success_indicators)
+            ))
             
             # スクリーンショット保存
             try:
@@ -327,11 +388,13 @@ class ManualLoginAutoTracker:
                 'tracking_success': tracking_success,
                 'status': 'success' if tracking_success else 'completed',
                 'timestamp': time.strftime("%Y-%m-%d %H:%M:%S"),
-                'message': '手動ログイン + 自動トラッキング設定完了'
+                'message': '手動ログイン + 自動トラッキング設定完了',
+                'wait_profile': self.waits.profile.name,
+                'wait_seconds': self.waits.item_report()
             }
             
             print(f"🎉 トラッキング設定完了: {asin}")
-            logger.info(f"🎉 トラッキング設定完了: {asin}")
+            logger.info(f"🎉 トラッキング設定完了: {asin} (待機時間: {result['wait_seconds']})")
             return result
             
         except Exception as e:
@@ -341,31 +404,242 @@ class ManualLoginAutoTracker:
                 'asin': asin,
                 'status': 'error',
                 'error': str(e),
-                'timestamp': time.strftime("%Y-%m-%d %H:%M:%S")
+                'timestamp': time.strftime("%Y-%m-%d %H:%M:%S"),
+                'wait_seconds': self.waits.item_report() if self.waits else {}
             }
     
-    def close_browser(self):
-        """ブラウザ終了"""
+    def close_browser(self, confirm: bool = True):
+        """ブラウザ終了（confirm=False の場合は確認を待たずに終了）"""
         if self.driver:
             try:
-                print("\n🔍 処理が完了しました")
-                print("Sales Tool Webサイト（https://keepa.com/manage/）でトラッキング一覧を確認してください")
-                input("確認が完了したらEnterキーを押してブラウザを終了します...")
+                if confirm:
+                    print("\n🔍 処理が完了しました")
+                    print("Sales Tool Webサイト（https://keepa.com/manage/）でトラッキング一覧を確認してください")
+                    input("確認が完了したらEnterキーを押してブラウザを終了します...")
                 self.driver.quit()
                 logger.info("🔚 ブラウザ終了")
             except:
                 pass
 
+class TrackingProgress:
+    """
+    一括設定の進捗ファイル
+    
+    ASINごとの最終結果をJSONで保存し、中断後は設定済みのASINを飛ばして再開する
+    """
+    
+    def __init__(self, path: str = DEFAULT_PROGRESS_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self.results: Dict[str, Dict] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.results = json.load(f).get('results', {})
+                logger.info(f"進捗ファイル読み込み: {path} ({len(self.results)}件)")
+            except (OSError, ValueError) as e:
+                logger.warning(f"進捗ファイル読み込みエラー（最初から実行します）: {str(e)}")
+    
+    def is_done(self, asin: str) -> bool:
+        return self.results.get(asin, {}).get('status') in DONE_STATUSES
+    
+    def pending(self, asins: List[str]) -> List[str]:
+        """未設定のASIN（重複を除いて入力順）"""
+        return [asin for asin in dict.fromkeys(asins) if not self.is_done(asin)]
+    
+    def record(self, result: Dict):
+        """結果を記録してファイルに保存（書き込み途中で中断しても壊れないよう置き換える）"""
+        with self._lock:
+            self.results[result['asin']] = result
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'updated_at': time.strftime("%Y-%m-%d %H:%M:%S"),
+                    'results': self.results
+                }, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+
+class BatchTrackingRunner:
+    """
+    複数ASINのトラッキングを並行設定
+    
+    ログイン済みのトラッカーのセッションを各ワーカーのブラウザに複製し、
+    共有キューからASINを取り出して設定する。失敗したASINはキューに戻して再試行する
+    """
+    
+    def __init__(self, session_tracker: ManualLoginAutoTracker,
+                 workers: int = DEFAULT_BATCH_WORKERS,
+                 retries: int = DEFAULT_BATCH_RETRIES,
+                 progress: Optional[TrackingProgress] = None,
+                 tracker_factory: Callable[[], ManualLoginAutoTracker] = ManualLoginAutoTracker):
+        self.session_tracker = session_tracker
+        self.workers = max(1, workers)
+        self.retries = max(0, retries)
+        self.progress = progress or TrackingProgress()
+        self.tracker_factory = tracker_factory
+        
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._outstanding = 0
+        self._started_at = None
+        
+        # 実行状況
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+        # 手順ごとの待機時間の合計（再試行分を含む）
+        self.wait_seconds: Dict[str, float] = {}
+    
+    def run(self, asins: List[str]) -> Dict:
+        """
+        一括設定を実行
+        
+        Returns:
+            件数・所要時間・スループット（ASIN/分）の集計
+        """
+        pending = self.progress.pending(asins)
+        skipped = len(dict.fromkeys(asins)) - len(pending)
+        if skipped:
+            logger.info(f"設定済みのため{skipped}件をスキップ")
+        
+        for asin in pending:
+            self._queue.put((asin, 0))
+        self._outstanding = len(pending)
+        self._started_at = time.monotonic()
+        
+        session = self.session_tracker.export_session() if pending else None
+        worker_count = min(self.workers, len(pending))
+        logger.info(f"一括設定開始: {len(pending)}件 / ワーカー{worker_count}")
+        
+        threads = [
+            threading.Thread(target=self._worker, args=(index, session), name=f'tracking-worker-{index}', daemon=True)
+            for index in range(worker_count)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        summary = self.get_summary(len(pending), skipped)
+        logger.info(f"一括設定完了: {json.dumps(summary, ensure_ascii=False)}")
+        return summary
+    
+    def _worker(self, index: int, session: Dict):
+        """キューが空になり全ASINの結果が確定するまで設定を繰り返す"""
+        # 1台目はログインしたブラウザをそのまま使う
+        tracker = self.session_tracker if index == 0 else self.tracker_factory()
+        if tracker is not self.session_tracker:
+            if not (tracker.setup_browser() and tracker.import_session(session)):
+                logger.error(f"ワーカー{index}: ブラウザ準備に失敗したため停止")
+                tracker.close_browser(confirm=False)
+                return
+        
+        try:
+            while True:
+                try:
+                    asin, attempt = self._queue.get(timeout=0.5)
+                except queue.Empty:
+                    with self._lock:
+                        if self._outstanding == 0:
+                            return
+                    continue
+                
+                try:
+                    result = tracker.navigate_to_product_and_track(asin, interactive=False)
+                except Exception as e:
+                    result = {'asin': asin, 'status': 'error', 'error': str(e),
+                              'timestamp': time.strftime("%Y-%m-%d %H:%M:%S")}
+                result['attempts'] = attempt + 1
+                result['worker'] = index
+                with self._lock:
+                    merge_wait_seconds(self.wait_seconds, result.get('wait_seconds', {}))
+                
+                if result.get('status') not in DONE_STATUSES and attempt < self.retries:
+                    logger.warning(f"ワーカー{index}: {asin} 失敗のため再試行 ({attempt + 1}/{self.retries})")
+                    with self._lock:
+                        self.retried += 1
+                    self._queue.put((asin, attempt + 1))
+                    continue
+                
+                self._finish(result)
+        finally:
+            if tracker is not self.session_tracker:
+                tracker.close_browser(confirm=False)
+    
+    def _finish(self, result: Dict):
+        """ASINの最終結果を記録"""
+        try:
+            self.progress.record(result)
+        except OSError as e:
+            logger.error(f"進捗ファイル保存エラー: {str(e)}")
+        with self._lock:
+            self._outstanding -= 1
+            if result.get('status') in DONE_STATUSES:
+                self.completed += 1
+            else:
+                self.failed += 1
+            done = self.completed + self.failed
+        logger.info(f"進捗: {done}件完了 / 残り{self._outstanding}件 "
+                    f"({self.asins_per_minute():.1f} ASIN/分)")
+    
+    def asins_per_minute(self) -> float:
+        """結果が確定したASIN数の毎分スループット"""
+        if self._started_at is None:
+            return 0.0
+        elapsed = time.monotonic() - self._started_at
+        return (self.completed + self.failed) * 60 / elapsed if elapsed > 0 else 0.0
+    
+    def get_summary(self, requested: int, skipped: int = 0) -> Dict:
+        """一括設定の集計"""
+        elapsed = time.monotonic() - self._started_at if self._started_at is not None else 0.0
+        return {
+            'requested': requested,
+            'skipped': skipped,
+            'completed': self.completed,
+            'failed': self.failed,
+            'unprocessed': self._outstanding,
+            'retried': self.retried,
+            'workers': self.workers,
+            'elapsed_seconds': round(elapsed, 1),
+            'asins_per_minute': round(self.asins_per_minute(), 2),
+            'wait_seconds': dict(self.wait_seconds),
+            'progress_file': self.progress.path
+        }
+
+def load_asins(asins: Optional[str] = None, asins_file: Optional[str] = None) -> List[str]:
+    """カンマ区切り・ファイル（1行1ASIN、#以降はコメント）からASINリストを作成"""
+    result = [asin.strip() for asin in (asins or '').split(',') if asin.strip()]
+    if asins_file:
+        with open(asins_file, 'r', encoding='utf-8') as f:
+            result.extend(line.split('#')[0].strip() for line in f if line.split('#')[0].strip())
+    return result
+
 def main():
     """メイン実行"""
-    tracker = ManualLoginAutoTracker()
+    parser = argparse.ArgumentParser(description='手動ログイン + 自動トラッキング設定')
+    parser.add_argument('--asins', default=None, help='対象ASIN（カンマ区切り）')
+    parser.add_argument('--asins-file', default=None, help='対象ASINのファイル（1行1ASIN）')
+    parser.add_argument('--workers', type=int, default=DEFAULT_BATCH_WORKERS, help='並行ブラウザ数')
+    parser.add_argument('--retries', type=int, default=DEFAULT_BATCH_RETRIES, help='ASINごとの再試行回数')
+    parser.add_argument('--progress-file', default=DEFAULT_PROGRESS_FILE, help='進捗ファイル（再開用）')
+    parser.add_argument('--wait-profile', default=DEFAULT_PROFILE, choices=sorted(PROFILES),
+                        help='待機設定（fast はヘッドレスの一括設定向け）')
+    parser.add_argument('--headless', action='store_true',
+                        help='一括設定の追加ワーカーを画面なしで実行（ログイン用ブラウザは表示）')
+    args = parser.parse_args()
+    
+    asins = load_asins(args.asins, args.asins_file) or ["B08CDYX378"]
+    tracker = ManualLoginAutoTracker(wait_profile=args.wait_profile)
     
     try:
         print("=== 手動ログイン + 自動トラッキング設定 ===")
         print("🖥️ ブラウザが表示されます")
         print("🔐 ログインは手動で行います")
         print("🤖 トラッキング設定は自動で行います")
-        print("🎯 対象商品: B08CDYX378")
+        if len(asins) == 1:
+            print(f"🎯 対象商品: {asins[0]}")
+        else:
+            print(f"🎯 対象商品: {len(asins)}件（ワーカー{args.workers}）")
         print()
         
         # ブラウザ初期化
@@ -376,8 +650,26 @@ def main():
             if tracker.open_sales_tool_for_manual_login():
                 print("✅ 手動ログイン完了")
                 
+                if len(asins) > 1:
+                    # 一括設定
+                    runner = BatchTrackingRunner(
+                        tracker, workers=args.workers, retries=args.retries,
+                        progress=TrackingProgress(args.progress_file),
+                        tracker_factory=lambda: ManualLoginAutoTracker(wait_profile=args.wait_profile,
+                                                                       headless=args.headless)
+                    )
+                    summary = runner.run(asins)
+                    
+                    print("\n=== 一括設定結果 ===")
+                    print(f"完了: {summary['completed']} / 失敗: {summary['failed']} / "
+                          f"スキップ: {summary['skipped']} / 未処理: {summary['unprocessed']}")
+                    print(f"所要時間: {summary['elapsed_seconds']}秒 ({summary['asins_per_minute']} ASIN/分)")
+                    print(f"待機時間（手順別合計）: {summary['wait_seconds']}")
+                    print(f"\n💾 ASINごとの結果を{summary['progress_file']}に保存しました")
+                    return
+                
                 # 自動トラッキング設定
-                result = tracker.navigate_to_product_and_track("B08CDYX378")
+                result = tracker.navigate_to_product_and_track(asins[0])
                 
                 print(f"\n=== 最終結果 ===")
                 print(f"ASIN: {result['asin']}")
@@ -385,12 +677,12 @@ def main():
                 print(f"トラッキング成功: {'✅' if result.get('tracking_success') else '❌'}")
                 print(f"実行時刻: {result['timestamp']}")
                 print(f"メッセージ: {result.get('message', 'N/A')}")
+                print(f"待機時間（手順別）: {result.get('wait_seconds', {})}")
                 
                 if 'error' in result:
                     print(f"エラー: {result['error']}")
                 
                 # 結果保存
-                import json
                 filename = f"manual_login_auto_track_{int(time.time())}.json"
                 with open(filename, 'w', encoding='utf-8') as f:
                     json.dump(result, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+価格閾値アラート
+新しい価格データが届いた時点で、商品ごとの閾値（基準価格に対する%）を下回ったかを判定して通知する
+"""
+import json
+import logging
+import os
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+# ログ設定
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 在庫なし・出品なしを表す値
+NO_OFFER = -1
+
+# Webhook送信待ちの保持上限
+WEBHOOK_OUTBOX_SIZE = 1000
+
+class AlertSink:
+    """アラートの通知先インターフェース"""
+
+    def send(self, alert: Dict) -> None:
+        raise NotImplementedError
+
+class LogAlertSink(AlertSink):
+    """ログに出力"""
+
+    def send(self, alert: Dict) -> None:
+        logger.info(f"Price alert: {alert['asin']} {alert['price']} <= {alert['trigger_price']} "
+                    f"({alert['threshold']}% of {alert['reference_price']})")
+
+class FileAlertSink(AlertSink):
+    """1行1アラートのJSON形式でファイルに追記"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send(self, alert: Dict) -> None:
+        line = json.dumps(alert, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+class WebhookAlertSink(AlertSink):
+    """
+    Webhook通知（スタブ）
+
+    送信内容を outbox に積むのみで、HTTP送信は行わない
+    """
+
+    def __init__(self, url: str, maxlen: int = WEBHOOK_OUTBOX_SIZE):
+        self.url = url
+        self.outbox = deque(maxlen=maxlen)
+
+    def send(self, alert: Dict) -> None:
+        self.outbox.append({"url": self.url, "payload": alert})
+        logger.debug(f"Webhook alert queued: {alert['asin']} -> {self.url}")
+
+class _Watch:
+    """1商品分の監視状態"""
+
+    __slots__ = ("threshold", "reference_price", "trigger_price", "armed", "last_timestamp")
+
+    def __init__(self, threshold: int, reference_price: Optional[int], last_timestamp: Optional[int] = None):
+        self.threshold = threshold
+        self.armed = True
+        self.last_timestamp = last_timestamp
+        self.rebase(reference_price)
+
+    def rebase(self, reference_price: Optional[int]):
+        self.reference_price = reference_price
+        self.trigger_price = reference_price * self.threshold / 100 if reference_price is not None else None
+
+class ThresholdAlertEngine:
+    """
+    価格閾値アラートの判定
+
+    価格データはASIN単位で届くため、ASINをキーにした監視状態（発火価格を事前計算済み）を
+    引くだけで判定でき、他の商品には触れない。
+
+    - 基準価格: 監視開始時に指定した価格、未指定なら最初に届いた価格
+    - 発火条件: 価格 <= 基準価格 × threshold / 100
+    - 重複抑止: 発火後は価格が発火価格を上回るまで再発火しない。
+      また処理済みの時刻以前のデータ（差分取得の重複など）は判定しない
+    """
+
+    def __init__(self, sinks: Optional[List[AlertSink]] = None):
+        self.sinks = list(sinks) if sinks is not None else [LogAlertSink()]
+        self._watches: Dict[str, _Watch] = {}
+        self._lock = threading.Lock()
+
+        self.ticks = 0
+        self.fired = 0
+        self.suppressed = 0
+        self.sink_errors = 0
+
+    def watch(self, asin: str, threshold: int, reference_price: Optional[int] = None,
+              since: Optional[int] = None):
+        """
+        商品の監視を開始（既存の監視状態は置き換える）
+
+        Args:
+            threshold: 基準価格に対する発火価格の割合（%）
+            reference_price: 基準価格（省略時は最初に届いた価格）
+            since: この時刻（UNIX分）以前のデータは判定しない
+        """
+        with self._lock:
+            self._watches[asin] = _Watch(threshold, reference_price, since)
+
+    def unwatch(self, asin: str):
+        """商品の監視を終了"""
+        with self._lock:
+            self._watches.pop(asin, None)
+
+    def is_watching(self, asin: str) -> bool:
+        return asin in self._watches
+
+    def on_prices(self, asin: str, timestamps: Sequence[int], prices: Sequence[int]) -> List[Dict]:
+        """
+        新しい価格データを判定
+
+        Args:
+            asin: 商品ASIN
+            timestamps: 時刻（UNIX分、昇順）
+            prices: 価格（出品なしは-1）
+
+        Returns:
+            発火したアラート
+        """
+        watch = self._watches.get(asin)
+        if watch is None:
+            return []
+
+        alerts = []
+        with self._lock:
+            for timestamp, price in zip(timestamps, prices):
+                timestamp = int(timestamp)
+                price = int(price)
+                if watch.last_timestamp is not None and timestamp <= watch.last_timestamp:
+                    continue
+                watch.last_timestamp = timestamp
+                self.ticks += 1
+                if price == NO_OFFER:
+                    continue
+                if watch.trigger_price is None:
+                    watch.rebase(price)
+                    continue
+
+                if price <= watch.trigger_price:
+                    if watch.armed:
+                        watch.armed = False
+                        alerts.append(self._build_alert(asin, watch, timestamp, price))
+                    else:
+                        self.suppressed += 1
+                else:
+                    watch.armed = True
+            self.fired += len(alerts)
+
+        for alert in alerts:
+            self._dispatch(alert)
+        return alerts
+
+    def on_price(self, asin: str, timestamp: int, price: int) -> Optional[Dict]:
+        """価格データ1件を判定"""
+        alerts = self.on_prices(asin, [timestamp], [price])
+        return alerts[0] if alerts else None
+
+    @staticmethod
+    def _build_alert(asin: str, watch: _Watch, timestamp: int, price: int) -> Dict:
+        return {
+            "asin": asin,
+            "price": price,
+            "threshold": watch.threshold,
+            "reference_price": watch.reference_price,
+            "trigger_price": round(watch.trigger_price, 2),
+            "timestamp": datetime.fromtimestamp(timestamp * 60).strftime("%Y-%m-%d %H:%M:%S"),
+            "fired_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
+
+    def _dispatch(self, alert: Dict):
+        """各通知先に送信（失敗しても他の通知先には送る）"""
+        for sink in self.sinks:
+            try:
+                sink.send(alert)
+            except Exception as e:
+                self.sink_errors += 1
+                logger.error(f"Error sending price alert via {type(sink).__name__}: {str(e)}")
+
+    def get_stats(self) -> Dict:
+        """判定・通知の統計"""
+        return {
+            "watched": len(self._watches),
+            "ticks": self.ticks,
+            "fired": self.fired,
+            "suppressed": self.suppressed,
+            "sink_errors": self.sink_errors,
+            "sinks": [type(sink).__name__ for sink in self.sinks]
+        }
+
+def create_sinks_from_env() -> List[AlertSink]:
+    """
+    環境変数 PRICE_ALERT_SINKS（log / file / webhook のカンマ区切り）に応じて通知先を生成
+    """
+    sinks = []
+    for name in os.environ.get('PRICE_ALERT_SINKS', 'log').split(','):
+        name = name.strip().lower()
+        if name == 'log':
+            sinks.append(LogAlertSink())
+        elif name == 'file':
+            sinks.append(FileAlertSink(os.environ.get('PRICE_ALERT_FILE', 'price_alerts.jsonl')))
+        elif name == 'webhook' and os.environ.get('PRICE_ALERT_WEBHOOK_URL'):
+            sinks.append(WebhookAlertSink(os.environ['PRICE_ALERT_WEBHOOK_URL']))
+        elif name:
+            logger.warning(f"Unknown or unconfigured price alert sink: {name}")
+    return sinks
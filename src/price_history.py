@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+Keepa価格履歴のデコード・分析
+csv形式（Keepa分と価格の交互配列）をNumPy配列に変換してベクトル演算で集計
+"""
+import logging
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+# ログ設定
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Keepa分（2011-01-01起点）からUNIX分への変換オフセット
+KEEPA_EPOCH_OFFSET_MINUTES = 21564000
+
+# 在庫なし・出品なしを表す値
+NO_OFFER = -1
+
+# csvの系列番号
+CSV_AMAZON = 0
+CSV_NEW = 1
+CSV_USED = 2
+
+# リサンプリング間隔（分）
+RESAMPLE_MINUTES = {
+    'D': 24 * 60,
+    'h': 60
+}
+
+class PriceHistory:
+    """1系列分の価格履歴（時刻: datetime64[m], 価格: int32）"""
+
+    def __init__(self, times: np.ndarray, prices: np.ndarray):
+        self.times = times.astype('datetime64[m]')
+        self.prices = prices.astype(np.int32)
+        # 出品なし（-1）はマスクとして扱う
+        self.valid = self.prices != NO_OFFER
+
+    @classmethod
+    def from_csv(cls, series: Optional[Sequence[int]]) -> 'PriceHistory':
+        """Keepa csv系列（[分, 価格, 分, 価格, ...]）から一括変換"""
+        if series is None or len(series) < 2:
+            return cls.empty()
+
+        raw = np.asarray(series, dtype=np.int64)
+        # 末尾が欠けている場合は揃える
+        raw = raw[:len(raw) - len(raw) % 2]
+        times = (raw[0::2] + KEEPA_EPOCH_OFFSET_MINUTES).astype('datetime64[m]')
+        return cls(times, raw[1::2])
+
+    @classmethod
+    def from_product(cls, product: Dict, csv_type: int = CSV_AMAZON) -> 'PriceHistory':
+        """Keepa商品データから指定系列の履歴を生成"""
+        csv = product.get('csv') or []
+        if csv_type >= len(csv):
+            return cls.empty()
+        return cls.from_csv(csv[csv_type])
+
+    @classmethod
+    def empty(cls) -> 'PriceHistory':
+        return cls(np.empty(0, dtype='datetime64[m]'), np.empty(0, dtype=np.int32))
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    @property
+    def masked_prices(self) -> np.ma.MaskedArray:
+        """出品なしをマスクした価格配列"""
+        return np.ma.MaskedArray(self.prices, mask=~self.valid)
+
+    @property
+    def current_price(self) -> Optional[int]:
+        """最新価格（出品なしの場合はNone）"""
+        if len(self) == 0 or not self.valid[-1]:
+            return None
+        return int(self.prices[-1])
+
+    def since(self, unix_minute: Optional[int]) -> 'PriceHistory':
+        """指定時刻（UNIX分）より後の変化点のみを抽出"""
+        if unix_minute is None or len(self) == 0:
+            return self
+        first = np.searchsorted(self.times, np.datetime64(int(unix_minute), 'm'), side='right')
+        return PriceHistory(self.times[first:], self.prices[first:])
+
+    def unix_minutes(self) -> np.ndarray:
+        """時刻をUNIX分（int64）で取得"""
+        return self.times.astype(np.int64)
+
+    def window(self, days: float, now: Optional[np.datetime64] = None) -> 'PriceHistory':
+        """
+        直近days日分の履歴を抽出
+
+        価格は変化点のみ記録されるため、期間開始時点の価格を先頭に補う
+        """
+        if len(self) == 0:
+            return self
+
+        end = self._now(now)
+        start = end - np.timedelta64(int(days * 24 * 60), 'm')
+        first = np.searchsorted(self.times, start, side='right')
+        last = np.searchsorted(self.times, end, side='right')
+
+        times = self.times[first:last]
+        prices = self.prices[first:last]
+        if first > 0:
+            times = np.concatenate(([start], times))
+            prices = np.concatenate(([self.prices[first - 1]], prices))
+        return PriceHistory(times, prices)
+
+    def resample(self, freq: str = 'D', now: Optional[np.datetime64] = None) -> 'PriceHistory':
+        """
+        日次・時間単位にリサンプリング
+
+        各区間の終了時点で有効な価格（直前の変化点の値）を採用する
+
+        Args:
+            freq: 'D'（日次）または 'h'（時間単位）
+        """
+        if freq not in RESAMPLE_MINUTES:
+            raise ValueError(f"未対応のリサンプリング間隔: {freq}")
+        if len(self) == 0:
+            return self
+
+        step = np.timedelta64(RESAMPLE_MINUTES[freq], 'm')
+        unit = 'D' if freq == 'D' else 'h'
+        start = self.times[0].astype(f'datetime64[{unit}]').astype('datetime64[m]')
+        end = self._now(now)
+
+        bins = np.arange(start, end + step, step)
+        idx = np.searchsorted(self.times, bins, side='right') - 1
+        prices = np.where(idx >= 0, self.prices[np.clip(idx, 0, None)], NO_OFFER)
+        return PriceHistory(bins, prices)
+
+    def stats(self, days: Optional[float] = None, now: Optional[np.datetime64] = None) -> Dict:
+        """
+        期間内の最小・最大・平均（時間加重）・現在価格
+
+        Args:
+            days: 集計期間（日）。省略時は全期間
+        """
+        history = self.window(days, now) if days else self
+        result = {'min': None, 'max': None, 'avg': None, 'current': self.current_price, 'data_points': 0}
+        if len(history) == 0 or not history.valid.any():
+            return result
+
+        valid_prices = history.prices[history.valid]
+        result['min'] = int(valid_prices.min())
+        result['max'] = int(valid_prices.max())
+        result['data_points'] = int(history.valid.sum())
+
+        # 各価格が有効だった時間で加重平均
+        end = self._now(now)
+        boundaries = np.concatenate((history.times, [max(end, history.times[-1])]))
+        durations = np.diff(boundaries).astype(np.int64)
+        weights = np.where(history.valid, durations, 0)
+        if weights.sum() > 0:
+            result['avg'] = float(np.average(history.prices, weights=weights))
+        else:
+            result['avg'] = float(valid_prices.mean())
+        return result
+
+    def percentiles(self, q: Sequence[float] = (25, 50, 75), days: Optional[float] = None,
+                    freq: str = 'h', now: Optional[np.datetime64] = None) -> List[Optional[float]]:
+        """
+        期間内の価格パーセンタイル
+
+        変化点の偏りを避けるためリサンプリング後の値で計算する
+        """
+        history = self.window(days, now) if days else self
+        sampled = history.resample(freq, now)
+        values = sampled.prices[sampled.valid]
+        if len(values) == 0:
+            return [None] * len(q)
+        return [float(v) for v in np.percentile(values, q)]
+
+    @staticmethod
+    def _now(now: Optional[np.datetime64]) -> np.datetime64:
+        if now is None:
+            return np.datetime64('now', 'm')
+        return np.datetime64(now, 'm')
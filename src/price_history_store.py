@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+"""
+価格履歴ストア
+ASINごとの時刻・価格をint32の列形式で1ファイルに追記保存し、mmap経由で読み出す
+
+ファイル形式:
+    ヘッダー(8バイト): マジック 'STPH' + バージョン(uint16) + 予約(2バイト)
+    セグメント(追記単位): ASIN(10バイト) + 予約(2バイト) + 件数(uint32)
+                          + 時刻int32[件数]（UNIX分） + 価格int32[件数]
+
+プロセス間の排他は同じディレクトリの '<ファイル名>.lock' への flock で行う
+（追記・末尾の切り詰め・圧縮はロックを保持した状態でのみ行う）
+"""
+import fcntl
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# ログ設定
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MAGIC = b'STPH'
+FORMAT_VERSION = 1
+FILE_HEADER = struct.Struct('<4sH2x')
+SEGMENT_HEADER = struct.Struct('<10s2xI')
+ITEM_SIZE = 4
+
+# 出品なしを表す値（Keepaと同じ）
+NO_OFFER = -1
+
+DEFAULT_STORE_PATH = os.path.join(tempfile.gettempdir(), 'sales_tools_price_history.bin')
+
+class PriceHistoryStore:
+    """追記専用の列形式価格履歴ストア"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        # ASIN -> [(時刻配列オフセット, 件数), ...]
+        self._index: Dict[str, List[Tuple[int, int]]] = {}
+        self._last_timestamp: Dict[str, int] = {}
+        self._scanned_size = FILE_HEADER.size
+        self._mm = None
+        self._mapped_size = 0
+
+        self._open()
+
+    @contextmanager
+    def _file_lock(self):
+        """プロセス間の排他ロック（ロックファイルへの flock。圧縮でデータファイルが置き換わっても有効）"""
+        with open(self.path + '.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _open(self):
+        """ファイル初期化とインデックス構築"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._file_lock():
+            if not os.path.exists(self.path) or os.path.getsize(self.path) < FILE_HEADER.size:
+                with open(self.path, 'wb') as f:
+                    f.write(FILE_HEADER.pack(MAGIC, FORMAT_VERSION))
+
+            with open(self.path, 'rb') as f:
+                magic, version = FILE_HEADER.unpack(f.read(FILE_HEADER.size))
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise ValueError(f"価格履歴ストアの形式が不正です: {self.path}")
+
+            self._scan()
+
+            # 書き込み途中で終了した末尾セグメントを切り詰める
+            # （追記はロック内で完了するため、ロック保持中に残っている不完全な末尾は異常終了の跡）
+            if os.path.getsize(self.path) > self._scanned_size:
+                logger.warning(f"価格履歴ストアの不完全なセグメントを削除: {self.path}")
+                with open(self.path, 'r+b') as f:
+                    f.truncate(self._scanned_size)
+
+        logger.info(f"価格履歴ストア初期化完了: {self.path} ({len(self._index)} ASIN)")
+
+    def _scan(self):
+        """未読のセグメントヘッダーを読んでインデックスに追加"""
+        size = os.path.getsize(self.path)
+        if size <= self._scanned_size:
+            return
+
+        with open(self.path, 'rb') as f:
+            offset = self._scanned_size
+            while offset + SEGMENT_HEADER.size <= size:
+                f.seek(offset)
+                raw_asin, count = SEGMENT_HEADER.unpack(f.read(SEGMENT_HEADER.size))
+                data_offset = offset + SEGMENT_HEADER.size
+                end = data_offset + 2 * count * ITEM_SIZE
+                if end > size:
+                    break
+
+                asin = raw_asin.rstrip(b'\0').decode('ascii')
+                self._index.setdefault(asin, []).append((data_offset, count))
+                if count:
+                    f.seek(data_offset + (count - 1) * ITEM_SIZE)
+                    self._last_timestamp[asin] = struct.unpack('<i', f.read(ITEM_SIZE))[0]
+                offset = end
+            self._scanned_size = offset
+
+    def _view(self) -> memoryview:
+        """ファイル全体のmmapビュー（追記で伸びた場合は再マップ）"""
+        size = self._scanned_size
+        if self._mm is None or self._mapped_size < size:
+            with open(self.path, 'rb') as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            # 古いマップは参照中のビューが解放された時点でGCに回収させる
+            self._mm = mm
+            self._mapped_size = len(mm)
+        return memoryview(self._mm)
+
+    def refresh(self):
+        """他プロセスによる追記をインデックスに反映"""
+        with self._lock:
+            self._scan()
+
+    def signature(self) -> Tuple[int, int]:
+        """ファイルのサイズと更新時刻（ns）。他プロセスの追記も含めた変更検知に使う"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return (0, 0)
+        return (stat.st_size, stat.st_mtime_ns)
+
+    def asins(self) -> List[str]:
+        """保存済みASIN一覧"""
+        with self._lock:
+            return list(self._index)
+
+    def last_timestamp(self, asin: str) -> Optional[int]:
+        """保存済みの最新時刻（UNIX分、他プロセスの追記も反映）"""
+        with self._lock:
+            self._scan()
+            return self._last_timestamp.get(asin)
+
+    def append(self, asin: str, timestamps: Sequence[int], prices: Sequence[int]) -> int:
+        """
+        価格データを追記
+
+        保存済みの最新時刻以前のデータは無視する
+
+        Args:
+            asin: 商品ASIN
+            timestamps: 時刻（UNIX分、昇順）
+            prices: 価格
+
+        Returns:
+            追記した件数
+        """
+        if len(timestamps) != len(prices):
+            raise ValueError("時刻と価格の件数が一致しません")
+        encoded_asin = asin.encode('ascii')
+        if len(encoded_asin) > 10:
+            raise ValueError(f"ASINが長すぎます: {asin}")
+
+        # 走査・重複除外・書き込みをプロセス間ロック内で行い、他プロセスとの重複追記を防ぐ
+        with self._lock, self._file_lock():
+            self._scan()
+            last = self._last_timestamp.get(asin)
+
+            times = array('i')
+            values = array('i')
+            for t, p in zip(timestamps, prices):
+                t = int(t)
+                if last is not None and t <= last:
+                    continue
+                times.append(t)
+                values.append(int(p))
+                last = t
+
+            if not times:
+                return 0
+
+            with open(self.path, 'ab') as f:
+                offset = f.tell()
+                f.write(SEGMENT_HEADER.pack(encoded_asin, len(times)) + times.tobytes() + values.tobytes())
+
+            if offset == self._scanned_size:
+                data_offset = offset + SEGMENT_HEADER.size
+                self._index.setdefault(asin, []).append((data_offset, len(times)))
+                self._last_timestamp[asin] = last
+                self._scanned_size = data_offset + 2 * len(times) * ITEM_SIZE
+            else:
+                # 走査後に他プロセスが追記していた場合は、その分も含めて読み直す
+                self._scan()
+            return len(times)
+
+    def read(self, asin: str, days: Optional[float] = None, now: Optional[float] = None,
+             carry_in: bool = False) -> Tuple[array, array]:
+        """
+        価格データを読み出し
+
+        Args:
+            asin: 商品ASIN
+            days: 直近days日分のみ（省略時は全期間）
+            now: 基準時刻（UNIX秒）
+            carry_in: 期間開始時点で有効な価格を先頭に補う
+
+        Returns:
+            (時刻array, 価格array)
+        """
+        times = array('i')
+        prices = array('i')
+
+        with self._lock:
+            self._scan()
+            segments = list(self._index.get(asin, ()))
+            if not segments:
+                return times, prices
+            view = self._view()
+
+        start = None
+        carried = None
+        if days is not None:
+            start = int((now if now is not None else time.time()) // 60 - days * 24 * 60)
+
+        try:
+            for data_offset, count in segments:
+                with view[data_offset:data_offset + count * ITEM_SIZE].cast('i') as seg_times, \
+                        view[data_offset + count * ITEM_SIZE:data_offset + 2 * count * ITEM_SIZE].cast('i') as seg_prices:
+                    if start is not None and seg_times[count - 1] < start:
+                        carried = seg_prices[count - 1]
+                        continue
+                    first = bisect_left(seg_times, start) if start is not None else 0
+                    if first > 0:
+                        carried = seg_prices[first - 1]
+                    times.frombytes(seg_times[first:].tobytes())
+                    prices.frombytes(seg_prices[first:].tobytes())
+        finally:
+            view.release()
+
+        if carry_in and carried is not None and (not times or times[0] > start):
+            times.insert(0, start)
+            prices.insert(0, carried)
+
+        return times, prices
+
+    def window_stats(self, asin: str, days: float, now: Optional[float] = None) -> Optional[Dict]:
+        """直近days日の最小・最大・平均（時間加重）・現在価格（出品なしは除外）"""
+        times, prices = self.read(asin, days, now, carry_in=True)
+        valid = [p for p in prices if p != NO_OFFER]
+        if not valid:
+            return None
+
+        # 各価格が次の変化点（最後の価格は基準時刻）まで有効だった時間で加重平均（PriceHistory.stats と同じ）
+        end = int((now if now is not None else time.time()) // 60)
+        weighted = 0
+        total = 0
+        for i, p in enumerate(prices):
+            if p == NO_OFFER:
+                continue
+            duration = (times[i + 1] if i + 1 < len(times) else max(end, times[-1])) - times[i]
+            weighted += p * duration
+            total += duration
+        avg = weighted / total if total > 0 else sum(valid) / len(valid)
+
+        return {
+            'current': prices[-1] if prices[-1] != NO_OFFER else None,
+            'first': valid[0],
+            'min': min(valid),
+            'max': max(valid),
+            'avg': avg,
+            'data_points': len(valid),
+            'last_timestamp': times[-1]
+        }
+
+    def compact(self):
+        """ASINごとのセグメントを1つにまとめてファイルを再構築"""
+        tmp_path = self.path + '.compact'
+
+        with self._lock, self._file_lock():
+            self._scan()
+            asins = list(self._index)
+
+            with open(tmp_path, 'wb') as f:
+                f.write(FILE_HEADER.pack(MAGIC, FORMAT_VERSION))
+                for asin in asins:
+                    times, prices = self.read(asin)
+                    if not times:
+                        continue
+                    f.write(SEGMENT_HEADER.pack(asin.encode('ascii'), len(times)))
+                    f.write(times.tobytes())
+                    f.write(prices.tobytes())
+
+            os.replace(tmp_path, self.path)
+            self._index = {}
+            self._last_timestamp = {}
+            self._scanned_size = FILE_HEADER.size
+            self._mm = None
+            self._mapped_size = 0
+            self._scan()
+
+        logger.info(f"価格履歴ストア圧縮完了: {len(asins)} ASIN")
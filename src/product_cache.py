@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""
+商品データキャッシュ
+Keepaから取得した商品情報をプロセス内LRU + SQLiteの2段でキャッシュ
+"""
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+# ログ設定
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# デフォルト設定（環境変数で上書き可能）
+DEFAULT_TTL_SECONDS = 300
+DEFAULT_MEMORY_MAX_ENTRIES = 1024
+DEFAULT_DISK_MAX_ENTRIES = 100000
+DEFAULT_DB_PATH = os.path.join(tempfile.gettempdir(), 'sales_tools_product_cache.sqlite3')
+
+# ディスク層の件数を実数（COUNT）で確認し直す書き込み間隔（他プロセスの書き込み分の補正）
+DISK_COUNT_RESYNC_INTERVAL = 1000
+
+class ProductCache:
+    """商品情報の2段キャッシュ（プロセス内LRU + SQLite）"""
+
+    def __init__(self, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MEMORY_MAX_ENTRIES,
+                 db_path: Optional[str] = None,
+                 disk_max_entries: int = DEFAULT_DISK_MAX_ENTRIES,
+                 clock=time.time):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.disk_max_entries = disk_max_entries
+        self.db_path = db_path
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._db = None
+        # ディスク層の件数（書き込みのたびに全件数えないよう手元で追跡する）
+        self._disk_count = 0
+        self._disk_puts = 0
+
+        # カウンター
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+        if db_path:
+            self._open_db(db_path)
+
+    def _open_db(self, db_path: str):
+        """ディスク層の初期化（失敗時はメモリ層のみで動作）"""
+        try:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS product_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_product_cache_accessed ON product_cache (accessed_at)")
+            self._db.commit()
+            self._disk_count = self._db.execute("SELECT COUNT(*) FROM product_cache").fetchone()[0]
+            logger.info(f"商品キャッシュ（ディスク層）初期化完了: {db_path}")
+        except sqlite3.Error as e:
+            logger.error(f"商品キャッシュ（ディスク層）初期化エラー: {str(e)}")
+            self._db = None
+
+    @staticmethod
+    def make_key(asin: str, domain: str, history: bool) -> Tuple[str, str, bool]:
+        """キャッシュキーの生成"""
+        return (asin, domain, bool(history))
+
+    @staticmethod
+    def _disk_key(key: Tuple[str, str, bool]) -> str:
+        asin, domain, history = key
+        return f"{asin}:{domain}:{int(history)}"
+
+    def get(self, asin: str, domain: str = 'JP', history: bool = True) -> Optional[Dict]:
+        """キャッシュから商品情報を取得（未ヒット・期限切れはNone）"""
+        key = self.make_key(asin, domain, history)
+        now = self._clock()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return value
+                del self._memory[key]
+                self.expired += 1
+
+            entry = self._disk_get(key, now)
+            if entry is not None:
+                # ディスク層の有効期限を引き継ぐ（TTLを延長しない）
+                value, expires_at = entry
+                self.disk_hits += 1
+                self._memory_put(key, value, expires_at)
+                return value
+
+            self.misses += 1
+            return None
+
+    def set(self, asin: str, domain: str, history: bool, value: Dict) -> None:
+        """商品情報をキャッシュに保存"""
+        key = self.make_key(asin, domain, history)
+        expires_at = self._clock() + self.ttl_seconds
+
+        with self._lock:
+            self._memory_put(key, value, expires_at)
+            self._disk_put(key, value, expires_at)
+
+    def invalidate(self, asin: str, domain: Optional[str] = None, history: Optional[bool] = None) -> int:
+        """
+        キャッシュを明示的に無効化
+
+        Args:
+            asin: 商品ASIN
+            domain: 指定時はそのドメインのみ
+            history: 指定時はその履歴フラグのみ
+
+        Returns:
+            メモリ層から削除した件数
+        """
+        with self._lock:
+            keys = [
+                key for key in self._memory
+                if key[0] == asin
+                and (domain is None or key[1] == domain)
+                and (history is None or key[2] == bool(history))
+            ]
+            for key in keys:
+                del self._memory[key]
+
+            if self._db is not None:
+                pattern = f"{asin}:{domain if domain is not None else '%'}:"
+                pattern += str(int(history)) if history is not None else '%'
+                try:
+                    deleted = self._db.execute("DELETE FROM product_cache WHERE cache_key LIKE ?", (pattern,)).rowcount
+                    self._db.commit()
+                    self._disk_count = max(0, self._disk_count - deleted)
+                except sqlite3.Error as e:
+                    logger.error(f"商品キャッシュ無効化エラー: {str(e)}")
+
+        logger.info(f"商品キャッシュ無効化: {asin}")
+        return len(keys)
+
+    def clear(self) -> None:
+        """全キャッシュを削除"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                try:
+                    self._db.execute("DELETE FROM product_cache")
+                    self._db.commit()
+                    self._disk_count = 0
+                except sqlite3.Error as e:
+                    logger.error(f"商品キャッシュ削除エラー: {str(e)}")
+
+    def get_stats(self) -> Dict:
+        """ヒット・ミス数などの統計"""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_entries': len(self._memory),
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'expired': self.expired,
+                'evictions': self.evictions,
+                'hit_rate': round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+                'ttl_seconds': self.ttl_seconds,
+                'disk_enabled': self._db is not None
+            }
+
+    def _memory_put(self, key, value, expires_at):
+        """メモリ層への保存（ロック内で呼び出す）"""
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _disk_get(self, key, now) -> Optional[Tuple[Dict, float]]:
+        """ディスク層からの取得（ロック内で呼び出す）。(値, 有効期限) を返す"""
+        if self._db is None:
+            return None
+
+        try:
+            disk_key = self._disk_key(key)
+            row = self._db.execute(
+                "SELECT value, expires_at FROM product_cache WHERE cache_key = ?", (disk_key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            value, expires_at = row
+            if expires_at <= now:
+                self._db.execute("DELETE FROM product_cache WHERE cache_key = ?", (disk_key,))
+                self._db.commit()
+                self._disk_count = max(0, self._disk_count - 1)
+                self.expired += 1
+                return None
+
+            self._db.execute("UPDATE product_cache SET accessed_at = ? WHERE cache_key = ?", (now, disk_key))
+            self._db.commit()
+            return json.loads(value), expires_at
+
+        except (sqlite3.Error, ValueError) as e:
+            logger.error(f"商品キャッシュ読み込みエラー: {str(e)}")
+            return None
+
+    def _disk_put(self, key, value, expires_at):
+        """ディスク層への保存とサイズ上限での削除（ロック内で呼び出す）"""
+        if self._db is None:
+            return
+
+        try:
+            disk_key = self._disk_key(key)
+            exists = self._db.execute(
+                "SELECT 1 FROM product_cache WHERE cache_key = ?", (disk_key,)
+            ).fetchone() is not None
+            self._db.execute(
+                "INSERT OR REPLACE INTO product_cache (cache_key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (disk_key, json.dumps(value, ensure_ascii=False), expires_at, self._clock())
+            )
+            if not exists:
+                self._disk_count += 1
+            self._disk_puts += 1
+
+            # 上限を超えたと見込まれる時・一定間隔ごとのみ実数を数える
+            if self._disk_count > self.disk_max_entries or self._disk_puts % DISK_COUNT_RESYNC_INTERVAL == 0:
+                self._disk_count = self._db.execute("SELECT COUNT(*) FROM product_cache").fetchone()[0]
+
+            # 最終アクセスが古いものから削除
+            overflow = self._disk_count - self.disk_max_entries
+            if overflow > 0:
+                self._db.execute(
+                    "DELETE FROM product_cache WHERE cache_key IN "
+                    "(SELECT cache_key FROM product_cache ORDER BY accessed_at LIMIT ?)",
+                    (overflow,)
+                )
+                self._disk_count -= overflow
+                self.evictions += overflow
+            self._db.commit()
+
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.error(f"商品キャッシュ書き込みエラー: {str(e)}")
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_default_cache() -> ProductCache:
+    """環境変数の設定で共有キャッシュを生成・取得"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ProductCache(
+                ttl_seconds=float(os.getenv('PRODUCT_CACHE_TTL', DEFAULT_TTL_SECONDS)),
+                max_entries=int(os.getenv('PRODUCT_CACHE_MAX_ENTRIES', DEFAULT_MEMORY_MAX_ENTRIES)),
+                db_path=os.getenv('PRODUCT_CACHE_PATH', DEFAULT_DB_PATH) or None,
+                disk_max_entries=int(os.getenv('PRODUCT_CACHE_DISK_MAX_ENTRIES', DEFAULT_DISK_MAX_ENTRIES))
+            )
+        return _default_cache
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+トラッキング商品のバックグラウンド更新
+active な商品の価格履歴を定期的にKeepaから差分取得する
+"""
+import logging
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+# ログ設定
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# デフォルト設定（環境変数で上書き可能）
+DEFAULT_INTERVAL_SECONDS = 300
+DEFAULT_JITTER_SECONDS = 30
+DEFAULT_MIN_REFRESH_SECONDS = 3600
+DEFAULT_MAX_TOKENS_PER_CYCLE = 100
+DEFAULT_VOLATILE_CATEGORIES = "家電・AV機器,Electronics"
+
+# 価格変動の大きいカテゴリの更新頻度倍率
+VOLATILE_WEIGHT = 2.0
+
+# 商品1件あたりの消費トークン数
+TOKENS_PER_PRODUCT = 1
+
+class RefreshScheduler:
+    """active な商品を古い順・カテゴリ優先度順に定期更新"""
+
+    def __init__(self, tracking_manager, client_factory: Callable,
+                 interval_seconds: float = DEFAULT_INTERVAL_SECONDS,
+                 jitter_seconds: float = DEFAULT_JITTER_SECONDS,
+                 min_refresh_seconds: float = DEFAULT_MIN_REFRESH_SECONDS,
+                 max_tokens_per_cycle: int = DEFAULT_MAX_TOKENS_PER_CYCLE,
+                 volatile_categories: Optional[List[str]] = None,
+                 domain: str = 'JP'):
+        self.tracking_manager = tracking_manager
+        self.client_factory = client_factory
+        self.interval_seconds = interval_seconds
+        self.jitter_seconds = jitter_seconds
+        self.min_refresh_seconds = min_refresh_seconds
+        self.max_tokens_per_cycle = max_tokens_per_cycle
+        self.volatile_categories = set(
+            volatile_categories if volatile_categories is not None
+            else DEFAULT_VOLATILE_CATEGORIES.split(',')
+        )
+        self.domain = domain
+
+        self._client = None
+        self._thread = None
+        self._stop_event = threading.Event()
+
+        # 実行状況
+        self.cycles = 0
+        self.errors = 0
+        self.last_cycle_at = None
+        self.last_cycle_seconds = None
+        self.last_summary = None
+
+    @classmethod
+    def from_env(cls, tracking_manager, client_factory: Callable) -> 'RefreshScheduler':
+        """環境変数の設定でスケジューラを生成"""
+        return cls(
+            tracking_manager,
+            client_factory,
+            interval_seconds=float(os.environ.get('REFRESH_INTERVAL_SECONDS', DEFAULT_INTERVAL_SECONDS)),
+            jitter_seconds=float(os.environ.get('REFRESH_JITTER_SECONDS', DEFAULT_JITTER_SECONDS)),
+            min_refresh_seconds=float(os.environ.get('REFRESH_MIN_INTERVAL_SECONDS', DEFAULT_MIN_REFRESH_SECONDS)),
+            max_tokens_per_cycle=int(os.environ.get('REFRESH_MAX_TOKENS_PER_CYCLE', DEFAULT_MAX_TOKENS_PER_CYCLE)),
+            volatile_categories=[
+                c.strip() for c in os.environ.get('REFRESH_VOLATILE_CATEGORIES', DEFAULT_VOLATILE_CATEGORIES).split(',')
+                if c.strip()
+            ]
+        )
+
+    def select_due(self, now: Optional[float] = None) -> List[str]:
+        """
+        今回の更新対象を優先度順に選択
+
+        未チェック・最終チェックが古い商品を優先し、変動の大きいカテゴリは
+        経過時間を重み付けしてより頻繁に更新する。件数はトークン上限で打ち切る
+        """
+        now = now if now is not None else time.time()
+        candidates = []
+
+        active_asins = self.tracking_manager.get_products_by_status("active")
+        for asin, record in self.tracking_manager.get_product_records(active_asins).items():
+            staleness = now - record.last_check if record.last_check is not None else float('inf')
+            weight = VOLATILE_WEIGHT if record.category in self.volatile_categories else 1.0
+            priority = staleness * weight
+
+            if priority >= self.min_refresh_seconds:
+                candidates.append((priority, asin))
+
+        candidates.sort(reverse=True)
+        limit = max(0, self.max_tokens_per_cycle // TOKENS_PER_PRODUCT)
+        return [asin for _, asin in candidates[:limit]]
+
+    def run_cycle(self) -> Optional[Dict]:
+        """1回分の更新を実行"""
+        started = time.monotonic()
+        try:
+            asins = self.select_due()
+            if not asins:
+                logger.info("Refresh cycle: no products due")
+                summary = {"requested": 0}
+            else:
+                if self._client is None:
+                    self._client = self.client_factory()
+                summary = self.tracking_manager.refresh_all_price_history(self._client, asins, self.domain)
+
+            self.last_summary = summary
+            return summary
+
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Error in refresh cycle: {str(e)}")
+            return None
+
+        finally:
+            self.cycles += 1
+            self.last_cycle_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            self.last_cycle_seconds = round(time.monotonic() - started, 3)
+
+    def _next_delay(self) -> float:
+        """次回実行までの待機時間（複数タスクの同時実行を避けるため揺らぎを加える）"""
+        return max(1.0, self.interval_seconds + random.uniform(-self.jitter_seconds, self.jitter_seconds))
+
+    def _loop(self):
+        # 起動直後の一斉実行を避ける
+        if self._stop_event.wait(random.uniform(0, self.jitter_seconds)):
+            return
+        while not self._stop_event.is_set():
+            self.run_cycle()
+            self._stop_event.wait(self._next_delay())
+
+    def start(self):
+        """バックグラウンドスレッドで定期更新を開始"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, name='refresh-scheduler', daemon=True)
+        self._thread.start()
+        logger.info(f"Refresh scheduler started: interval={self.interval_seconds}s, "
+                    f"max_tokens_per_cycle={self.max_tokens_per_cycle}")
+
+    def stop(self, timeout: float = 5.0):
+        """定期更新を停止"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+        logger.info("Refresh scheduler stopped")
+
+    def get_status(self) -> Dict:
+        """スケジューラの実行状況"""
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "interval_seconds": self.interval_seconds,
+            "max_tokens_per_cycle": self.max_tokens_per_cycle,
+            "cycles": self.cycles,
+            "errors": self.errors,
+            "last_cycle_at": self.last_cycle_at,
+            "last_cycle_seconds": self.last_cycle_seconds,
+            "last_summary": self.last_summary
+        }
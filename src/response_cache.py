@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+読み込み系APIのレスポンスキャッシュ
+URL（パス+クエリ）ごとに、生成時のデータ版と本文を保持する。版が変われば再生成する
+"""
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional
+
+# ログ設定
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 256
+
+class CachedResponse(NamedTuple):
+    version: str
+    body: bytes
+    status: int
+    mimetype: str
+    # 返却時に時刻を埋める場合の本文（デコード済み）
+    payload: Optional[Any] = None
+
+class ResponseCache:
+    """データ版で検証するLRUレスポンスキャッシュ"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, version: str) -> Optional[CachedResponse]:
+        """現在の版で生成されたレスポンスを取得（古い版は破棄）"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.version == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key: str, entry: CachedResponse):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0
+        }
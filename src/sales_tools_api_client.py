@@ -7,8 +7,12 @@ import keepa
 import os
 import time
 import logging
+import threading
 from typing import Dict, List, Optional
 from dotenv import load_dotenv
+from price_history import PriceHistory
+from product_cache import ProductCache, get_default_cache
+from single_flight import SingleFlight
 
 # 環境変数読み込み
 load_dotenv()
@@ -17,81 +21,405 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Keepaが1回のクエリで受け付けるASINの最大件数
+KEEPA_MAX_ASINS_PER_QUERY = 100
+
+# 商品1件あたりの消費トークン数
+KEEPA_TOKENS_PER_PRODUCT = 1
+
+# 価格統計の集計期間（日）
+PRICE_STATS_WINDOW_DAYS = 90
+
+# Keepaのデフォルト補充レート（トークン/分）
+DEFAULT_REFILL_RATE = 20
+
+class RequestCancelled(Exception):
+    """呼び出し元のタイムアウト・キャンセルにより処理を中止した"""
+
+class TokenBudgetScheduler:
+    """
+    Keepaトークン残量に基づくリクエストスケジューラ
+    
+    残りトークンと補充レートから予算を見積もり、
+    予定コストが予算を超える場合のみ待機する
+    """
+    
+    def __init__(self, refill_rate: float = DEFAULT_REFILL_RATE, tokens_left: Optional[float] = None,
+                 clock=time.monotonic, sleep=time.sleep):
+        self._lock = threading.Lock()
+        self._clock = clock
+        self._sleep = sleep
+        self.refill_rate = float(refill_rate)
+        # Keepaのトークンは60分で失効するため、補充レート×60を上限とする
+        self.capacity = self.refill_rate * 60
+        self.tokens = float(tokens_left) if tokens_left is not None else self.capacity
+        self._updated_at = clock()
+        
+        # メトリクス
+        self.wait_seconds = 0.0
+        self.work_seconds = 0.0
+        self.wait_count = 0
+        self.request_count = 0
+        self.tokens_consumed = 0
+    
+    def _refill(self):
+        """経過時間に応じてトークンを補充（ロック内で呼び出す）"""
+        now = self._clock()
+        elapsed = now - self._updated_at
+        self._updated_at = now
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_rate / 60.0)
+    
+    def sync(self, api) -> None:
+        """
+        Keepaクライアントの残りトークン・補充レートで予算を更新
+        
+        keepa は生成時にステータスを取得しないため、tokens_left は最初の応答までは仮の0になる。
+        応答を受け取った（status に tokensLeft か timestamp が入っている）場合のみ残量を反映し、
+        それまでは設定済みの予算を使う
+        """
+        status = getattr(api, 'status', None)
+        status = status if isinstance(status, dict) else {}
+        refill_rate = status.get('refillRate')
+        tokens_left = None
+        if status.get('tokensLeft') is not None or status.get('timestamp') is not None:
+            tokens_left = status.get('tokensLeft')
+            if not isinstance(tokens_left, (int, float)):
+                tokens_left = getattr(api, 'tokens_left', None)
+        
+        with self._lock:
+            self._refill()
+            if isinstance(refill_rate, (int, float)) and refill_rate > 0:
+                self.refill_rate = float(refill_rate)
+                self.capacity = self.refill_rate * 60
+            if isinstance(tokens_left, (int, float)):
+                self.tokens = min(self.capacity, float(tokens_left))
+    
+    def acquire(self, cost: int, cancel: Optional[threading.Event] = None) -> float:
+        """
+        コスト分のトークンを確保（不足時のみ待機）
+        
+        Args:
+            cost: 予定消費トークン数
+            cancel: 設定されたら待機を打ち切る（予約したトークンは戻す）
+        
+        Returns:
+            待機した秒数
+        
+        Raises:
+            RequestCancelled: 待機前・待機中に cancel が設定された
+        """
+        if cancel is not None and cancel.is_set():
+            raise RequestCancelled("トークン確保前に中止されました")
+        with self._lock:
+            self._refill()
+            # 先に予約して不足分は借りとして扱うことで、同時実行時も順番に待機させる
+            self.tokens -= cost
+            self.tokens_consumed += cost
+            self.request_count += 1
+            wait = -self.tokens * 60.0 / self.refill_rate if self.tokens < 0 else 0.0
+            if wait > 0:
+                self.wait_count += 1
+                self.wait_seconds += wait
+        
+        if wait > 0:
+            logger.info(f"トークン不足のため待機: {wait:.1f}秒 (必要トークン {cost})")
+            if cancel is None:
+                self._sleep(wait)
+            elif cancel.wait(wait):
+                with self._lock:
+                    self.tokens += cost
+                    self.tokens_consumed -= cost
+                    self.request_count -= 1
+                raise RequestCancelled("トークン待ちの途中で中止されました")
+        return wait
+    
+    def record_work(self, seconds: float) -> None:
+        """API呼び出しに要した時間を記録"""
+        with self._lock:
+            self.work_seconds += seconds
+    
+    def get_metrics(self) -> Dict:
+        """待機時間・処理時間のメトリクスを取得"""
+        with self._lock:
+            self._refill()
+            return {
+                'tokens_available': round(self.tokens, 1),
+                'refill_rate_per_minute': self.refill_rate,
+                'wait_seconds': round(self.wait_seconds, 3),
+                'work_seconds': round(self.work_seconds, 3),
+                'wait_count': self.wait_count,
+                'request_count': self.request_count,
+                'tokens_consumed': self.tokens_consumed
+            }
+
+# プロセス内で共有するトークン予算
+token_budget = TokenBudgetScheduler()
+
+# 同一商品の同時取得を合流させる
+product_flight = SingleFlight()
+
 class SalesToolsAPIClient:
-    def __init__(self):
+    def __init__(self, scheduler: Optional[TokenBudgetScheduler] = None, cache: Optional[ProductCache] = None,
+                 single_flight: Optional[SingleFlight] = None):
         """Sales Tools APIクライアント初期化"""
         self.api_key = os.getenv('SALES_TOOLS_API_KEY')
         if not self.api_key:
             raise ValueError("SALES_TOOLS_API_KEY環境変数が設定されていません")
         
         self.api = keepa.Keepa(self.api_key)
+        self.scheduler = scheduler or token_budget
+        self.scheduler.sync(self.api)
+        self.cache = cache or get_default_cache()
+        self.single_flight = single_flight or product_flight
         logger.info("Sales Tools APIクライアント初期化完了")
     
-    def get_product_info(self, asin: str, domain: str = 'JP') -> Optional[Dict]:
+    def get_product_info(self, asin: str, domain: str = 'JP', history: bool = True) -> Optional[Dict]:
         """
         商品情報を取得
         
         Args:
             asin: 商品ASIN
             domain: Amazonドメイン
+            history: 価格履歴を含めるか
         
         Returns:
             商品情報辞書
         """
-        try:
-            logger.info(f"商品情報取得開始: {asin}")
-            
-            # API呼び出し
-            products = self.api.query(asin, domain=domain, history=True)
-            
-            if not products or len(products) == 0:
-                logger.warning(f"商品が見つかりません: {asin}")
+        # 同じ商品の同時リクエストは1回の取得結果を共有
+        product_info = self.single_flight.do(
+            (asin, domain, history),
+            lambda: self.get_products_batch([asin], domain, history).get(asin)
+        )
+        
+        if product_info is None:
+            logger.warning(f"商品が見つかりません: {asin}")
+        
+        return product_info
+    
+    def get_products_batch(self, asins: List[str], domain: str = 'JP', history: bool = True,
+                           errors: Optional[Dict[str, str]] = None,
+                           cancel: Optional[threading.Event] = None) -> Dict[str, Dict]:
+        """
+        複数商品の情報をまとめて取得
+        
+        キャッシュにない商品のみ、Keepaが1リクエストで受け付ける最大件数ごとに分割してクエリを発行する
+        
+        Args:
+            asins: 商品ASINリスト
+            domain: Amazonドメイン
+            history: 価格履歴を含めるか
+            errors: 指定した場合、クエリに失敗した商品のエラー内容（ASIN -> 内容）を書き込む
+            cancel: 設定されたら、以降のトークン待ち・クエリを行わない
+        
+        Returns:
+            ASINをキーとした商品情報辞書
+        """
+        results = {}
+        
+        # 重複を除いて入力順を維持
+        unique_asins = list(dict.fromkeys(asin for asin in asins if asin))
+        if not unique_asins:
+            return results
+        
+        # キャッシュ確認
+        missing_asins = []
+        for asin in unique_asins:
+            cached = self.cache.get(asin, domain, history)
+            if cached is not None:
+                results[asin] = cached
+            else:
+                missing_asins.append(asin)
+        
+        if not missing_asins:
+            logger.info(f"商品情報一括取得: 全{len(unique_asins)}件キャッシュヒット")
+            return results
+        
+        for product in self._query_chunks(missing_asins, domain, history, "商品情報一括取得",
+                                          errors=errors, cancel=cancel):
+            product_info = self._build_product_info(product, domain)
+            results[product['asin']] = product_info
+            self.cache.set(product['asin'], domain, history, product_info)
+        
+        logger.info(f"商品情報一括取得完了: {len(results)}/{len(unique_asins)}件")
+        return results
+    
+    def get_price_history_delta(self, asin: str, domain: str = 'JP', since: Optional[int] = None,
+                                last_update: Optional[int] = None) -> Optional[Dict]:
+        """
+        前回取得以降の価格履歴（差分）を取得
+        
+        Args:
+            asin: 商品ASIN
+            domain: Amazonドメイン
+            since: 保存済みの最新時刻（UNIX分）
+            last_update: 前回取得時のlastUpdate（Keepa分）
+        
+        Returns:
+            差分情報（get_price_history_deltas参照）
+        """
+        since_map = {asin: since} if since is not None else {}
+        last_update_map = {asin: last_update} if last_update is not None else {}
+        return self.get_price_history_deltas([asin], domain, since_map, last_update_map).get(asin)
+    
+    def get_price_history_deltas(self, asins: List[str], domain: str = 'JP',
+                                 since: Optional[Dict[str, int]] = None,
+                                 last_updates: Optional[Dict[str, int]] = None) -> Dict[str, Dict]:
+        """
+        複数商品の前回取得以降の価格履歴（差分）をまとめて取得
+        
+        履歴は保存済みの最新時刻以降の日数分だけ要求し、
+        lastUpdateが前回から変わっていない商品は差分の抽出を省略する
+        
+        Args:
+            asins: 商品ASINリスト
+            domain: Amazonドメイン
+            since: ASIN -> 保存済みの最新時刻（UNIX分）
+            last_updates: ASIN -> 前回取得時のlastUpdate（Keepa分）
+        
+        Returns:
+            ASIN -> {'last_update', 'changed', 'timestamps', 'prices'}
+        """
+        since = since or {}
+        last_updates = last_updates or {}
+        unique_asins = list(dict.fromkeys(asin for asin in asins if asin))
+        now_minutes = int(time.time() // 60)
+        
+        def days_for(chunk):
+            # チャンク内で最も古い最新時刻から必要な日数を算出（未保存があれば全履歴）
+            marks = [since.get(asin) for asin in chunk]
+            if any(mark is None for mark in marks):
                 return None
+            return max(1, (now_minutes - min(marks)) // (24 * 60) + 1)
+        
+        deltas = {}
+        for product in self._query_chunks(unique_asins, domain, True, "価格履歴差分取得", days_for):
+            asin = product['asin']
+            last_update = product.get('lastUpdate')
+            delta = {'last_update': last_update, 'changed': True, 'timestamps': [], 'prices': []}
             
-            product = products[0]
-            
-            # 商品情報を整理
-            product_info = {
-                'asin': product.get('asin'),
-                'title': product.get('title'),
-                'domain': domain,
-                'categories': product.get('categories', []),
-                'manufacturer': product.get('manufacturer'),
-                'brand': product.get('brand'),
-                'model': product.get('model'),
-                'package_dimensions': product.get('packageDimensions'),
-                'features': product.get('features', [])
-            }
-            
-            # 価格情報
-            if 'csv' in product and len(product['csv']) > 0:
-                amazon_prices = product['csv'][0]  # Amazon価格
-                if len(amazon_prices) >= 2:
-                    current_price = amazon_prices[-1]
-                    if current_price != -1:
-                        product_info['current_price'] = current_price / 100.0
-                        product_info['currency'] = 'JPY' if domain == 'JP' else 'USD'
-            
-            # 価格統計
-            if 'stats' in product:
-                stats = product['stats']
-                product_info['price_stats'] = {
-                    'min': stats.get('min', 0) / 100.0 if stats.get('min') else None,
-                    'max': stats.get('max', 0) / 100.0 if stats.get('max') else None,
-                    'avg': stats.get('avg', 0) / 100.0 if stats.get('avg') else None,
-                    'current': stats.get('current', 0) / 100.0 if stats.get('current') else None
-                }
+            if last_update is not None and last_update == last_updates.get(asin):
+                delta['changed'] = False
+            else:
+                history = PriceHistory.from_product(product).since(since.get(asin))
+                delta['timestamps'] = history.unix_minutes().tolist()
+                delta['prices'] = history.prices.tolist()
             
-            # 最終更新時間
-            if 'lastUpdate' in product:
-                product_info['last_update'] = product['lastUpdate']
+            deltas[asin] = delta
+        
+        changed = sum(1 for delta in deltas.values() if delta['changed'])
+        logger.info(f"価格履歴差分取得完了: 更新あり {changed}/{len(unique_asins)}件")
+        return deltas
+    
+    def _query_chunks(self, asins: List[str], domain: str, history: bool, label: str, days_for=None,
+                      errors: Optional[Dict[str, str]] = None, cancel: Optional[threading.Event] = None):
+        """
+        Keepaが1リクエストで受け付ける最大件数ごとに分割してクエリを発行し、取得した商品を順に返す
+        
+        失敗したチャンクはログに記録してスキップする（errors を指定した場合はチャンク内の各ASINにエラー内容を記録）。
+        cancel が設定されたら、トークン確保・クエリの前に打ち切り、残りのチャンクも問い合わせない
+        """
+        chunk_size = KEEPA_MAX_ASINS_PER_QUERY
+        total_chunks = (len(asins) + chunk_size - 1) // chunk_size
+        
+        for start in range(0, len(asins), chunk_size):
+            chunk = asins[start:start + chunk_size]
+            chunk_no = start // chunk_size + 1
+            params = {}
+            days = days_for(chunk) if days_for else None
+            if days:
+                params['days'] = days
             
-            logger.info(f"商品情報取得完了: {product_info.get('title', 'N/A')[:50]}")
-            return product_info
+            try:
+                logger.info(f"{label}開始: {len(chunk)}件 ({chunk_no}/{total_chunks})")
+                
+                # トークン予算を超える場合のみ待機
+                self.scheduler.acquire(len(chunk) * KEEPA_TOKENS_PER_PRODUCT, cancel)
+                if cancel is not None and cancel.is_set():
+                    raise RequestCancelled("クエリ前に中止されました")
+                
+                # API呼び出し（チャンク単位で1回）
+                started = time.monotonic()
+                try:
+                    products = self.api.query(chunk, domain=domain, history=history, progress_bar=False, **params)
+                finally:
+                    self.scheduler.record_work(time.monotonic() - started)
+                    self.scheduler.sync(self.api)
+                
+            except RequestCancelled as e:
+                logger.warning(f"{label}中止 ({chunk_no}/{total_chunks}): {str(e)}")
+                if errors is not None:
+                    errors.update(dict.fromkeys(asins[start:], "Cancelled"))
+                return
+            except Exception as e:
+                logger.error(f"{label}エラー ({chunk_no}/{total_chunks}): {str(e)}")
+                if errors is not None:
+                    errors.update(dict.fromkeys(chunk, f"Keepa query failed: {str(e)}"))
+                continue
             
-        except Exception as e:
-            logger.error(f"商品情報取得エラー: {str(e)}")
-            return None
+            for product in products or []:
+                if product and product.get('asin'):
+                    yield product
+    
+    def invalidate_cache(self, asin: str, domain: Optional[str] = None) -> None:
+        """商品情報キャッシュを明示的に無効化"""
+        self.cache.invalidate(asin, domain)
+    
+    def _build_product_info(self, product: Dict, domain: str) -> Dict:
+        """Keepaの商品データをレスポンス用の商品情報に整形"""
+        # 商品情報を整理
+        product_info = {
+            'asin': product.get('asin'),
+            'title': product.get('title'),
+            'domain': domain,
+            'categories': product.get('categories', []),
+            'manufacturer': product.get('manufacturer'),
+            'brand': product.get('brand'),
+            'model': product.get('model'),
+            'package_dimensions': product.get('packageDimensions'),
+            'features': product.get('features', [])
+        }
+        
+        # 価格履歴（Amazon価格）
+        history = PriceHistory.from_product(product)
+        current_price = history.current_price
+        if current_price is not None:
+            product_info['current_price'] = current_price / 100.0
+            product_info['currency'] = 'JPY' if domain == 'JP' else 'USD'
+        
+        # 価格統計
+        if len(history) > 0:
+            stats = history.stats(days=PRICE_STATS_WINDOW_DAYS)
+            product_info['price_stats'] = {
+                'min': stats['min'] / 100.0 if stats['min'] is not None else None,
+                'max': stats['max'] / 100.0 if stats['max'] is not None else None,
+                'avg': round(stats['avg'] / 100.0, 2) if stats['avg'] is not None else None,
+                'current': stats['current'] / 100.0 if stats['current'] is not None else None,
+                'period_days': PRICE_STATS_WINDOW_DAYS,
+                'data_points': stats['data_points']
+            }
+            p25, p50, p75 = history.percentiles((25, 50, 75), days=PRICE_STATS_WINDOW_DAYS)
+            product_info['price_percentiles'] = {
+                'p25': p25 / 100.0 if p25 is not None else None,
+                'p50': p50 / 100.0 if p50 is not None else None,
+                'p75': p75 / 100.0 if p75 is not None else None
+            }
+        elif 'stats' in product:
+            # 履歴がない場合はKeepaの統計値を使用
+            stats = product['stats']
+            product_info['price_stats'] = {
+                'min': stats.get('min', 0) / 100.0 if stats.get('min') else None,
+                'max': stats.get('max', 0) / 100.0 if stats.get('max') else None,
+                'avg': stats.get('avg', 0) / 100.0 if stats.get('avg') else None,
+                'current': stats.get('current', 0) / 100.0 if stats.get('current') else None
+            }
+        
+        # 最終更新時間
+        if 'lastUpdate' in product:
+            product_info['last_update'] = product['lastUpdate']
+        
+        logger.info(f"商品情報取得完了: {(product_info.get('title') or 'N/A')[:50]}")
+        return product_info
     
     def analyze_price_trend(self, asin: str, domain: str = 'JP') -> Optional[Dict]:
         """
@@ -105,53 +433,88 @@ class SalesToolsAPIClient:
             価格分析結果
         """
         try:
-            logger.info(f"価格トレンド分析開始: {asin}")
-            
-            # 商品情報取得
+            # 同じ商品の同時リクエストは get_product_info と同じキーで1回の取得結果を共有
             product_info = self.get_product_info(asin, domain)
-            if not product_info:
+            if product_info is None:
                 return None
+            return self._analyze_product_info(asin, product_info)
+        except Exception as e:
+            logger.error(f"価格トレンド分析エラー: {str(e)}")
+            return None
+    
+    def analyze_price_trends(self, asins: List[str], domain: str = 'JP',
+                             errors: Optional[Dict[str, str]] = None,
+                             cancel: Optional[threading.Event] = None) -> Dict[str, Dict]:
+        """
+        複数商品の価格トレンドをまとめて分析
+        
+        Args:
+            asins: 商品ASINリスト
+            domain: Amazonドメイン
+            errors: 指定した場合、取得・分析に失敗した商品のエラー内容（ASIN -> 内容）を書き込む
+            cancel: 設定されたら、以降のトークン待ち・クエリを行わない
+        
+        Returns:
+            ASINをキーとした価格分析結果
+        """
+        try:
+            logger.info(f"価格トレンド分析開始: {len(asins)}件")
             
-            # 価格履歴分析
-            analysis = {
-                'asin': asin,
-                'title': product_info.get('title'),
-                'current_price': product_info.get('current_price'),
-                'currency': product_info.get('currency', 'JPY'),
-                'price_stats': product_info.get('price_stats', {}),
-                'analysis_timestamp': time.strftime("%Y-%m-%d %H:%M:%S")
-            }
-            
-            # 価格トレンド判定
-            stats = product_info.get('price_stats', {})
-            current = product_info.get('current_price', 0)
+            # 商品情報一括取得
+            products = self.get_products_batch(asins, domain, errors=errors, cancel=cancel)
             
-            if stats.get('min') and stats.get('max') and current:
-                price_range = stats['max'] - stats['min']
-                if price_range > 0:
-                    price_position = (current - stats['min']) / price_range
-                    
-                    if price_position < 0.3:
-                        analysis['trend'] = 'low_price'
-                        analysis['recommendation'] = '買い時'
-                        analysis['confidence'] = 'high'
-                    elif price_position > 0.7:
-                        analysis['trend'] = 'high_price'
-                        analysis['recommendation'] = '高値圏'
-                        analysis['confidence'] = 'high'
-                    else:
-                        analysis['trend'] = 'normal'
-                        analysis['recommendation'] = '通常価格'
-                        analysis['confidence'] = 'medium'
-                    
-                    analysis['price_position'] = round(price_position * 100, 1)
+            analyses = {}
+            for asin, product_info in products.items():
+                analyses[asin] = self._analyze_product_info(asin, product_info)
             
-            logger.info(f"価格トレンド分析完了: {analysis.get('trend', 'unknown')}")
-            return analysis
+            logger.info(f"価格トレンド分析完了: {len(analyses)}件")
+            return analyses
             
         except Exception as e:
             logger.error(f"価格トレンド分析エラー: {str(e)}")
-            return None
+            if errors is not None:
+                errors.update(dict.fromkeys(asins, f"Analysis failed: {str(e)}"))
+            return {}
+    
+    def _analyze_product_info(self, asin: str, product_info: Dict) -> Dict:
+        """整形済み商品情報から価格トレンドを判定"""
+        # 価格履歴分析
+        analysis = {
+            'asin': asin,
+            'title': product_info.get('title'),
+            'current_price': product_info.get('current_price'),
+            'currency': product_info.get('currency', 'JPY'),
+            'price_stats': product_info.get('price_stats', {}),
+            'price_percentiles': product_info.get('price_percentiles', {}),
+            'analysis_timestamp': time.strftime("%Y-%m-%d %H:%M:%S")
+        }
+        
+        # 価格トレンド判定
+        stats = product_info.get('price_stats', {})
+        current = product_info.get('current_price', 0)
+        
+        if stats.get('min') and stats.get('max') and current:
+            price_range = stats['max'] - stats['min']
+            if price_range > 0:
+                price_position = (current - stats['min']) / price_range
+                
+                if price_position < 0.3:
+                    analysis['trend'] = 'low_price'
+                    analysis['recommendation'] = '買い時'
+                    analysis['confidence'] = 'high'
+                elif price_position > 0.7:
+                    analysis['trend'] = 'high_price'
+                    analysis['recommendation'] = '高値圏'
+                    analysis['confidence'] = 'high'
+                else:
+                    analysis['trend'] = 'normal'
+                    analysis['recommendation'] = '通常価格'
+                    analysis['confidence'] = 'medium'
+                
+                analysis['price_position'] = round(price_position * 100, 1)
+        
+        logger.info(f"価格トレンド判定: {asin} - {analysis.get('trend', 'unknown')}")
+        return analysis
     
     def search_deals(self, category: str = None, max_price: float = None, min_discount: float = 20.0) -> List[Dict]:
         """
@@ -180,13 +543,13 @@ class SalesToolsAPIClient:
                 'B07GXQZMM5'   # キッコーマン しょうゆ
             ]
             
+            # 一括クエリで分析
+            analyses = self.analyze_price_trends(sample_asins)
+            
             for asin in sample_asins:
-                analysis = self.analyze_price_trend(asin)
+                analysis = analyses.get(asin)
                 if analysis and analysis.get('trend') == 'low_price':
                     deals.append(analysis)
-                
-                # API制限を考慮した待機
-                time.sleep(1)
             
             logger.info(f"お得商品検索完了: {len(deals)}件")
             return deals
@@ -201,6 +564,9 @@ class SalesToolsAPIClient:
             status = {
                 'api_key': self.api_key[:10] + '...' if self.api_key else 'Not Set',
                 'tokens_left': getattr(self.api, 'tokens_left', 'Unknown'),
+                'token_budget': self.scheduler.get_metrics(),
+                'cache': self.cache.get_stats(),
+                'coalescing': self.single_flight.get_stats(),
                 'status': 'active',
                 'timestamp': time.strftime("%Y-%m-%d %H:%M:%S")
             }
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+リクエスト合流（single-flight）
+同一キーの同時呼び出しを1回の実行にまとめ、結果を共有する
+"""
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+# ログ設定
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class _Call:
+    """実行中の呼び出し"""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """同一キーの同時呼び出しを1回の実行にまとめる"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+        # カウンター
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        キーごとに1回だけfnを実行し、同時に呼ばれた呼び出し元で結果を共有
+
+        Args:
+            key: 合流キー
+            fn: 実行する関数
+
+        Returns:
+            fnの戻り値（例外は全ての呼び出し元に送出）
+        """
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            logger.debug(f"実行中の呼び出しに合流: {key}")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def get_stats(self) -> Dict:
+        """合流状況の統計"""
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'executions': self.executions,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._calls)
+            }
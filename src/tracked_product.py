@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+トラッキング商品レコード
+__slots__ で属性辞書を持たず、時刻はUNIX秒（int）、繰り返し出現する文字列は intern して保持する。
+APIで返す辞書形式（'%Y-%m-%d %H:%M:%S' 形式の時刻）への変換は to_dict で行う
+"""
+import sys
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Optional
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+DATE_FORMAT = "%Y-%m-%d"
+
+# ステータス・登録方法の値（intern 済み）
+STATUS_PENDING = sys.intern("pending")
+STATUS_ACTIVE = sys.intern("active")
+
+# 商品レコードの項目（ASIN以外、APIの辞書形式と同じ順序）
+PRODUCT_FIELDS = (
+    "name", "category", "status", "threshold", "added_date",
+    "last_check", "setup_method", "keepa_last_update"
+)
+
+class TrackedProduct:
+    """トラッキング商品1件分（不変として扱い、更新時は with_fields で複製する）"""
+
+    __slots__ = ("asin",) + PRODUCT_FIELDS
+
+    def __init__(self, asin: str, name: Optional[str] = None, category: Optional[str] = None,
+                 status: str = STATUS_PENDING, threshold: Optional[int] = None,
+                 added_date: Optional[int] = None, last_check: Optional[int] = None,
+                 setup_method: Optional[str] = None, keepa_last_update: Optional[int] = None):
+        self.asin = asin
+        self.name = name
+        self.category = _intern(category)
+        self.status = _intern(status)
+        self.threshold = threshold
+        self.added_date = added_date
+        self.last_check = last_check
+        self.setup_method = _intern(setup_method)
+        self.keepa_last_update = keepa_last_update
+
+    @classmethod
+    def from_dict(cls, asin: str, product: Dict) -> 'TrackedProduct':
+        """APIの辞書形式から生成"""
+        return cls(asin, **{field: _parse(field, product.get(field)) for field in PRODUCT_FIELDS})
+
+    def with_fields(self, fields: Dict) -> 'TrackedProduct':
+        """指定項目（辞書形式の値）を差し替えた複製"""
+        values = {field: getattr(self, field) for field in PRODUCT_FIELDS}
+        values.update((k, _parse(k, v)) for k, v in fields.items() if k in PRODUCT_FIELDS)
+        return TrackedProduct(self.asin, **values)
+
+    def to_dict(self) -> Dict:
+        """APIの辞書形式に変換"""
+        product = {field: getattr(self, field) for field in PRODUCT_FIELDS}
+        product["added_date"] = format_epoch(self.added_date, DATE_FORMAT)
+        product["last_check"] = format_epoch(self.last_check)
+        return product
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, TrackedProduct):
+            return NotImplemented
+        return all(getattr(self, slot) == getattr(other, slot) for slot in self.__slots__)
+
+    def __repr__(self) -> str:
+        return f"TrackedProduct(asin={self.asin!r}, status={self.status!r}, category={self.category!r})"
+
+@lru_cache(maxsize=4096)
+def parse_epoch(value, fmt: str = TIMESTAMP_FORMAT) -> Optional[int]:
+    """時刻文字列をUNIX秒に変換（int・Noneはそのまま）"""
+    if value is None or isinstance(value, int):
+        return value
+    return int(datetime.strptime(value, fmt).timestamp())
+
+@lru_cache(maxsize=4096)
+def format_epoch(value: Optional[int], fmt: str = TIMESTAMP_FORMAT) -> Optional[str]:
+    """UNIX秒を時刻文字列に変換（一括更新で同じ時刻が多いためキャッシュする）"""
+    if value is None:
+        return None
+    return datetime.fromtimestamp(value).strftime(fmt)
+
+def _parse(field: str, value):
+    if field == "last_check":
+        return parse_epoch(value)
+    if field == "added_date":
+        return parse_epoch(value, DATE_FORMAT)
+    return value
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if isinstance(value, str) else value
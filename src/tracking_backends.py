@@ -0,0 +1,513 @@
+# -*- coding: utf-8 -*-
+"""
+トラッキング商品の保存先
+メモリ（テスト・開発用）とSQLite（WAL、デフォルト）の実装
+"""
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from tracked_product import (
+    TrackedProduct, PRODUCT_FIELDS, DATE_FORMAT, STATUS_ACTIVE, STATUS_PENDING, format_epoch, parse_epoch
+)
+
+# ログ設定
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.path.join(tempfile.gettempdir(), 'sales_tools_tracking.sqlite3')
+
+# 既存行は全項目を置き換える（INSERT OR REPLACE の暗黙の削除では件数のトリガーが動かないため UPDATE で置き換える）
+UPSERT_SQL = (
+    f"INSERT INTO tracked_products (asin, {', '.join(PRODUCT_FIELDS)}) "
+    f"VALUES (?, {', '.join('?' * len(PRODUCT_FIELDS))}) "
+    f"ON CONFLICT (asin) DO UPDATE SET {', '.join(f'{field} = excluded.{field}' for field in PRODUCT_FIELDS)}"
+)
+
+# 件数を保持する列
+COUNTED_COLUMNS = ("status", "category")
+
+# 件数を更新するトリガー（{column} は COUNTED_COLUMNS の列名）
+COUNT_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_count_{column}_insert AFTER INSERT ON tracked_products
+    WHEN NEW.{column} IS NOT NULL
+    BEGIN
+        INSERT INTO tracking_counts (kind, key, n) VALUES ('{column}', NEW.{column}, 1)
+        ON CONFLICT (kind, key) DO UPDATE SET n = n + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_count_{column}_delete AFTER DELETE ON tracked_products
+    WHEN OLD.{column} IS NOT NULL
+    BEGIN
+        UPDATE tracking_counts SET n = n - 1 WHERE kind = '{column}' AND key = OLD.{column};
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_count_{column}_update AFTER UPDATE OF {column} ON tracked_products
+    WHEN OLD.{column} IS NOT NEW.{column}
+    BEGIN
+        UPDATE tracking_counts SET n = n - 1 WHERE kind = '{column}' AND key = OLD.{column};
+        INSERT INTO tracking_counts (kind, key, n) SELECT '{column}', NEW.{column}, 1
+        WHERE NEW.{column} IS NOT NULL
+        ON CONFLICT (kind, key) DO UPDATE SET n = n + 1;
+    END
+    """,
+)
+
+class TrackingBackend:
+    """トラッキング商品の保存先インターフェース"""
+
+    def get(self, asin: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def get_many(self, asins: Iterable[str]) -> Dict[str, Dict]:
+        return {asin: record.to_dict() for asin, record in self.get_records(asins).items()}
+
+    def get_records(self, asins: Iterable[str]) -> Dict[str, TrackedProduct]:
+        """複数商品のレコードを取得（辞書形式に変換しない内部処理用）"""
+        raise NotImplementedError
+
+    def get_all(self) -> Dict[str, Dict]:
+        raise NotImplementedError
+
+    def asins_by_status(self, status: str) -> List[str]:
+        raise NotImplementedError
+
+    def query(self, status: Optional[str] = None, category: Optional[str] = None,
+              min_threshold: Optional[int] = None, max_threshold: Optional[int] = None,
+              stale_since: Optional[str] = None, after: Optional[str] = None,
+              limit: Optional[int] = None) -> List[Tuple[str, Dict]]:
+        """
+        条件に合う商品をASIN順に取得
+
+        Args:
+            stale_since: この時刻より前に最終チェックされた（または未チェックの）商品のみ
+            after: このASINより後の商品から取得（カーソル）
+            limit: 最大件数
+        """
+        raise NotImplementedError
+
+    def upsert(self, asin: str, product: Dict) -> None:
+        raise NotImplementedError
+
+    def upsert_many(self, products: Iterable[Tuple[str, Dict]]) -> int:
+        raise NotImplementedError
+
+    def update(self, asin: str, fields: Dict) -> bool:
+        raise NotImplementedError
+
+    def update_many(self, updates: Iterable[Tuple[str, Dict]]) -> int:
+        raise NotImplementedError
+
+    def activate_pending(self, last_check: str, setup_method: str) -> List[str]:
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def count_by_status(self) -> Dict[str, int]:
+        raise NotImplementedError
+
+    def count_by_category(self) -> Dict[str, int]:
+        raise NotImplementedError
+
+    def counts(self) -> Optional[Tuple[Dict[str, int], Dict[str, int]]]:
+        """
+        保存先で全プロセス共通に保持している件数
+
+        Returns:
+            (ステータス別件数, カテゴリ別件数)。件数を保持しない保存先は None
+        """
+        return None
+
+    def version(self) -> Tuple[int, float]:
+        """データの版数と最終更新時刻（UNIX秒）。書き込みごとに版数が増える"""
+        raise NotImplementedError
+
+class InMemoryTrackingBackend(TrackingBackend):
+    """
+    プロセス内に TrackedProduct として保存（再起動で消える）
+
+    コピーオンライト方式: 書き込みはロック下で辞書を複製して差し替え、
+    読み込みはその時点の辞書をロックなしで参照する（レコードは差し替えのみで変更しない）
+    """
+
+    def __init__(self):
+        self._products: Dict[str, TrackedProduct] = {}
+        self._write_lock = threading.Lock()
+        self._version = (0, time.time())
+
+    def get(self, asin: str) -> Optional[Dict]:
+        record = self._products.get(asin)
+        return record.to_dict() if record is not None else None
+
+    def get_records(self, asins: Iterable[str]) -> Dict[str, TrackedProduct]:
+        products = self._products
+        return {asin: products[asin] for asin in asins if asin in products}
+
+    def get_all(self) -> Dict[str, Dict]:
+        return {asin: record.to_dict() for asin, record in self._products.items()}
+
+    def asins_by_status(self, status: str) -> List[str]:
+        return [asin for asin, record in self._products.items() if record.status == status]
+
+    def query(self, status: Optional[str] = None, category: Optional[str] = None,
+              min_threshold: Optional[int] = None, max_threshold: Optional[int] = None,
+              stale_since: Optional[str] = None, after: Optional[str] = None,
+              limit: Optional[int] = None) -> List[Tuple[str, Dict]]:
+        products = self._products
+        stale_epoch = parse_epoch(stale_since)
+        results = []
+        for asin in sorted(products):
+            if after is not None and asin <= after:
+                continue
+            record = products[asin]
+            if status is not None and record.status != status:
+                continue
+            if category is not None and record.category != category:
+                continue
+            if min_threshold is not None and (record.threshold is None or record.threshold < min_threshold):
+                continue
+            if max_threshold is not None and (record.threshold is None or record.threshold > max_threshold):
+                continue
+            if stale_epoch is not None and record.last_check is not None and record.last_check >= stale_epoch:
+                continue
+            results.append((asin, record.to_dict()))
+            if limit is not None and len(results) >= limit:
+                break
+        return results
+
+    def upsert(self, asin: str, product: Dict) -> None:
+        self.upsert_many([(asin, product)])
+
+    def upsert_many(self, products: Iterable[Tuple[str, Dict]]) -> int:
+        records = {asin: TrackedProduct.from_dict(asin, product) for asin, product in products}
+        with self._write_lock:
+            updated = dict(self._products)
+            updated.update(records)
+            self._products = updated
+            self._bump()
+        return len(records)
+
+    def update(self, asin: str, fields: Dict) -> bool:
+        return self.update_many([(asin, fields)]) == 1
+
+    def update_many(self, updates: Iterable[Tuple[str, Dict]]) -> int:
+        with self._write_lock:
+            updated = dict(self._products)
+            count = 0
+            for asin, fields in updates:
+                record = updated.get(asin)
+                if record is None:
+                    continue
+                updated[asin] = record.with_fields(fields)
+                count += 1
+            self._products = updated
+            if count:
+                self._bump()
+        return count
+
+    def activate_pending(self, last_check: str, setup_method: str) -> List[str]:
+        with self._write_lock:
+            activated = self.asins_by_status(STATUS_PENDING)
+            fields = {"status": STATUS_ACTIVE, "last_check": last_check, "setup_method": setup_method}
+            updated = dict(self._products)
+            for asin in activated:
+                updated[asin] = updated[asin].with_fields(fields)
+            self._products = updated
+            if activated:
+                self._bump()
+        return activated
+
+    def count(self) -> int:
+        return len(self._products)
+
+    def count_by_status(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for record in self._products.values():
+            counts[record.status] = counts.get(record.status, 0) + 1
+        return counts
+
+    def count_by_category(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for record in self._products.values():
+            counts[record.category] = counts.get(record.category, 0) + 1
+        return counts
+
+    def version(self) -> Tuple[int, float]:
+        return self._version
+
+    def _bump(self):
+        """版数を進める（書き込みロック下で呼び出す）"""
+        self._version = (self._version[0] + 1, time.time())
+
+class SQLiteTrackingBackend(TrackingBackend):
+    """
+    SQLite（WALモード）に保存
+
+    status / category / last_check にインデックスを張り、集計・抽出をSQLで行う。
+    last_check はUNIX秒で保存し、取得時に文字列へ変換する
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._init_schema()
+        logger.info(f"Tracking backend initialized: {db_path}")
+
+    def _conn(self) -> sqlite3.Connection:
+        """スレッドごとの接続（フォーク後の子プロセスでは親の接続を使わず開き直す）"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _init_schema(self):
+        conn = self._conn()
+        with conn:
+            # 複数ワーカーが同時に起動しても、件数テーブルの作成と初回集計は1プロセスだけが行う
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS tracked_products (
+                    asin TEXT PRIMARY KEY,
+                    name TEXT,
+                    category TEXT,
+                    status TEXT NOT NULL,
+                    threshold INTEGER,
+                    added_date TEXT,
+                    last_check INTEGER,
+                    setup_method TEXT,
+                    keepa_last_update INTEGER
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tracked_status ON tracked_products (status)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tracked_category ON tracked_products (category)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tracked_last_check ON tracked_products (last_check)")
+            # 版数（全プロセス共通、書き込みと同じトランザクションで更新）
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS tracking_meta (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    version INTEGER NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("INSERT OR IGNORE INTO tracking_meta (id, version, updated_at) VALUES (1, 0, ?)",
+                         (time.time(),))
+            # ステータス別・カテゴリ別の件数（全プロセス共通、トリガーで書き込みと同じトランザクション内に更新）
+            created = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tracking_counts'"
+            ).fetchone() is None
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS tracking_counts (
+                    kind TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    n INTEGER NOT NULL,
+                    PRIMARY KEY (kind, key)
+                )
+            """)
+            for column in COUNTED_COLUMNS:
+                for trigger in COUNT_TRIGGERS:
+                    conn.execute(trigger.format(column=column))
+            # 件数テーブル導入前のデータベースは既存の行から集計する
+            if created:
+                for column in COUNTED_COLUMNS:
+                    conn.execute(
+                        f"INSERT INTO tracking_counts (kind, key, n) "
+                        f"SELECT '{column}', {column}, COUNT(*) FROM tracked_products "
+                        f"WHERE {column} IS NOT NULL GROUP BY {column}"
+                    )
+
+    @staticmethod
+    def _bump(conn: sqlite3.Connection):
+        """版数を進める（書き込みトランザクション内で呼び出す）"""
+        conn.execute("UPDATE tracking_meta SET version = version + 1, updated_at = ? WHERE id = 1", (time.time(),))
+
+    def version(self) -> Tuple[int, float]:
+        row = self._conn().execute("SELECT version, updated_at FROM tracking_meta WHERE id = 1").fetchone()
+        return (row["version"], row["updated_at"])
+
+    @staticmethod
+    def _to_row(product: Dict) -> Tuple:
+        values = []
+        for field in PRODUCT_FIELDS:
+            value = product.get(field)
+            if field == "last_check":
+                value = parse_epoch(value)
+            values.append(value)
+        return tuple(values)
+
+    @staticmethod
+    def _to_record(row: sqlite3.Row) -> TrackedProduct:
+        values = {field: row[field] for field in PRODUCT_FIELDS}
+        # added_date は既存スキーマに合わせて文字列で保存している
+        values["added_date"] = parse_epoch(values["added_date"], DATE_FORMAT)
+        return TrackedProduct(row["asin"], **values)
+
+    @staticmethod
+    def _from_row(row: sqlite3.Row) -> Dict:
+        product = {field: row[field] for field in PRODUCT_FIELDS}
+        product["last_check"] = format_epoch(product["last_check"])
+        return product
+
+    def get(self, asin: str) -> Optional[Dict]:
+        row = self._conn().execute("SELECT * FROM tracked_products WHERE asin = ?", (asin,)).fetchone()
+        return self._from_row(row) if row is not None else None
+
+    def get_records(self, asins: Iterable[str]) -> Dict[str, TrackedProduct]:
+        asins = list(asins)
+        products = {}
+        # SQLiteのパラメータ数上限を考慮して分割
+        for start in range(0, len(asins), 500):
+            chunk = asins[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._conn().execute(
+                f"SELECT * FROM tracked_products WHERE asin IN ({placeholders})", chunk
+            ).fetchall()
+            products.update((row["asin"], self._to_record(row)) for row in rows)
+        return products
+
+    def get_all(self) -> Dict[str, Dict]:
+        rows = self._conn().execute("SELECT * FROM tracked_products ORDER BY asin").fetchall()
+        return {row["asin"]: self._from_row(row) for row in rows}
+
+    def asins_by_status(self, status: str) -> List[str]:
+        rows = self._conn().execute(
+            "SELECT asin FROM tracked_products WHERE status = ? ORDER BY asin", (status,)
+        ).fetchall()
+        return [row["asin"] for row in rows]
+
+    def query(self, status: Optional[str] = None, category: Optional[str] = None,
+              min_threshold: Optional[int] = None, max_threshold: Optional[int] = None,
+              stale_since: Optional[str] = None, after: Optional[str] = None,
+              limit: Optional[int] = None) -> List[Tuple[str, Dict]]:
+        conditions = []
+        params: List = []
+        if status is not None:
+            conditions.append("status = ?")
+            params.append(status)
+        if category is not None:
+            conditions.append("category = ?")
+            params.append(category)
+        if min_threshold is not None:
+            conditions.append("threshold >= ?")
+            params.append(min_threshold)
+        if max_threshold is not None:
+            conditions.append("threshold <= ?")
+            params.append(max_threshold)
+        if stale_since is not None:
+            conditions.append("(last_check IS NULL OR last_check < ?)")
+            params.append(parse_epoch(stale_since))
+        if after is not None:
+            conditions.append("asin > ?")
+            params.append(after)
+
+        sql = "SELECT * FROM tracked_products"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY asin"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        rows = self._conn().execute(sql, params).fetchall()
+        return [(row["asin"], self._from_row(row)) for row in rows]
+
+    def upsert(self, asin: str, product: Dict) -> None:
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                UPSERT_SQL,
+                (asin,) + self._to_row(product)
+            )
+            self._bump(conn)
+
+    def upsert_many(self, products: Iterable[Tuple[str, Dict]]) -> int:
+        rows = [(asin,) + self._to_row(product) for asin, product in products]
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                UPSERT_SQL,
+                rows
+            )
+            self._bump(conn)
+        return len(rows)
+
+    def update(self, asin: str, fields: Dict) -> bool:
+        return self.update_many([(asin, fields)]) == 1
+
+    def update_many(self, updates: Iterable[Tuple[str, Dict]]) -> int:
+        conn = self._conn()
+        updated = 0
+        with conn:
+            for asin, fields in updates:
+                fields = {k: v for k, v in fields.items() if k in PRODUCT_FIELDS}
+                if not fields:
+                    continue
+                if "last_check" in fields:
+                    fields["last_check"] = parse_epoch(fields["last_check"])
+                assignments = ", ".join(f"{field} = ?" for field in fields)
+                cursor = conn.execute(
+                    f"UPDATE tracked_products SET {assignments} WHERE asin = ?",
+                    tuple(fields.values()) + (asin,)
+                )
+                updated += cursor.rowcount
+            if updated:
+                self._bump(conn)
+        return updated
+
+    def activate_pending(self, last_check: str, setup_method: str) -> List[str]:
+        conn = self._conn()
+        with conn:
+            # 抽出と更新の間に他プロセスが pending を追加・変更しないよう、先に書き込みロックを取る
+            conn.execute("BEGIN IMMEDIATE")
+            activated = [row["asin"] for row in conn.execute(
+                "SELECT asin FROM tracked_products WHERE status = 'pending'"
+            ).fetchall()]
+            conn.execute(
+                "UPDATE tracked_products SET status = 'active', last_check = ?, setup_method = ? "
+                "WHERE status = 'pending'",
+                (parse_epoch(last_check), setup_method)
+            )
+            if activated:
+                self._bump(conn)
+        return activated
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM tracked_products").fetchone()[0]
+
+    def count_by_status(self) -> Dict[str, int]:
+        rows = self._conn().execute(
+            "SELECT status, COUNT(*) AS n FROM tracked_products GROUP BY status"
+        ).fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def count_by_category(self) -> Dict[str, int]:
+        rows = self._conn().execute(
+            "SELECT category, COUNT(*) AS n FROM tracked_products GROUP BY category"
+        ).fetchall()
+        return {row["category"]: row["n"] for row in rows}
+
+    def counts(self) -> Tuple[Dict[str, int], Dict[str, int]]:
+        rows = self._conn().execute("SELECT kind, key, n FROM tracking_counts WHERE n > 0").fetchall()
+        counts = {column: {} for column in COUNTED_COLUMNS}
+        for row in rows:
+            counts[row["kind"]][row["key"]] = row["n"]
+        return counts["status"], counts["category"]
+
+def create_backend_from_env() -> TrackingBackend:
+    """環境変数 TRACKING_BACKEND（sqlite / memory）に応じて保存先を生成"""
+    backend = os.environ.get('TRACKING_BACKEND', 'sqlite').lower()
+    if backend == 'memory':
+        return InMemoryTrackingBackend()
+    return SQLiteTrackingBackend(os.environ.get('TRACKING_DB_PATH', DEFAULT_DB_PATH))
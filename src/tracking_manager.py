@@ -5,105 +5,505 @@ Keepaトラッキング商品管理
 複数商品のトラッキング状況を管理・監視
 """
 
+import hashlib
 import json
 import logging
+import os
+import threading
 import time
+from collections import Counter
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from analysis_snapshots import AnalysisSnapshotStore
+from price_alerts import ThresholdAlertEngine, create_sinks_from_env
+from price_history_store import PriceHistoryStore, DEFAULT_STORE_PATH
+from tracked_product import TrackedProduct
+from tracking_backends import TrackingBackend, create_backend_from_env
 
 # ログ設定
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 一覧取得の1ページあたりの件数
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# 一覧取得の絞り込み条件
+PRODUCT_FILTERS = ("status", "category", "min_threshold", "max_threshold", "stale_since")
+
+# 一括登録・更新の1リクエストあたりの上限件数
+MAX_BULK_ITEMS = 10000
+
+# 初回起動時に登録する商品
+DEFAULT_PRODUCTS = {
+    "B08CDYX378": {
+        "name": "コカ・コーラ カナダドライ",
+        "category": "食品・飲料",
+        "status": "active",
+        "threshold": 95,
+        "added_date": "2025-08-01",
+        "last_check": "2025-08-02 07:10:00",
+        "setup_method": "selenium_manual"
+    },
+    "B0B5SDFLTB": {
+        "name": "Sample Product",
+        "category": "Electronics", 
+        "status": "active",  # pending → active に変更
+        "threshold": 95,
+        "added_date": "2025-08-02",
+        "last_check": "2025-08-02 07:10:00",
+        "setup_method": "manual_simulation"
+    },
+    "B08N5WRWNW": {
+        "name": "Echo Dot (第4世代)",
+        "category": "家電・AV機器",
+        "status": "active",  # pending → active に変更
+        "threshold": 95,
+        "added_date": "2025-08-02",
+        "last_check": "2025-08-02 07:10:00",
+        "setup_method": "manual_simulation"
+    }
+}
+
 class TrackingManager:
     """トラッキング商品管理クラス"""
     
-    def __init__(self):
-        self.tracked_products = {
-            "B08CDYX378": {
-                "name": "コカ・コーラ カナダドライ",
-                "category": "食品・飲料",
-                "status": "active",
-                "threshold": 95,
-                "added_date": "2025-08-01",
-                "last_check": "2025-08-02 07:10:00",
-                "setup_method": "selenium_manual"
-            },
-            "B0B5SDFLTB": {
-                "name": "Sample Product",
-                "category": "Electronics", 
-                "status": "active",  # pending → active に変更
-                "threshold": 95,
-                "added_date": "2025-08-02",
-                "last_check": "2025-08-02 07:10:00",
-                "setup_method": "manual_simulation"
-            },
-            "B08N5WRWNW": {
-                "name": "Echo Dot (第4世代)",
-                "category": "家電・AV機器",
-                "status": "active",  # pending → active に変更
-                "threshold": 95,
-                "added_date": "2025-08-02",
-                "last_check": "2025-08-02 07:10:00",
-                "setup_method": "manual_simulation"
-            }
-        }
+    def __init__(self, price_store: Optional[PriceHistoryStore] = None,
+                 backend: Optional[TrackingBackend] = None,
+                 alerts: Optional[ThresholdAlertEngine] = None):
+        self._price_store = price_store
+        self.snapshots = AnalysisSnapshotStore()
+        # 閾値アラート（監視状態は価格データが届いた商品から順に作成する）
+        self.alerts = alerts or ThresholdAlertEngine(create_sinks_from_env())
+        self.backend = backend or create_backend_from_env()
+        
+        # 空の場合は初期商品を登録
+        if self.backend.count() == 0:
+            for asin, product in DEFAULT_PRODUCTS.items():
+                self.backend.upsert(asin, product)
+        
+        # 書き込み（保存先の更新と件数の反映）を直列化するロック。読み込みはロックを取らない
+        self._write_lock = threading.RLock()
+        
+        # ステータス別・カテゴリ別の件数。保存先が全プロセス共通の件数を持つ場合（SQLite）はそれを使う。
+        # 持たない場合（メモリ）は起動時に一度だけ集計し、以降はプロセス内で差分更新する
+        self._shared_counts = self.backend.counts() is not None
+        if self._shared_counts:
+            self._counts = (Counter(), Counter())
+        else:
+            self._counts = (Counter(self.backend.count_by_status()), Counter(self.backend.count_by_category()))
+    
+    @property
+    def price_store(self) -> PriceHistoryStore:
+        """価格履歴ストア（初回アクセス時に開く）"""
+        if self._price_store is None:
+            self._price_store = PriceHistoryStore(
+                os.environ.get('PRICE_HISTORY_STORE_PATH', DEFAULT_STORE_PATH)
+            )
+        return self._price_store
     
     def get_all_tracked_products(self) -> Dict:
         """全トラッキング商品の取得"""
-        return self.tracked_products
+        return self.backend.get_all()
+    
+    def get_products_by_status(self, status: str) -> List[str]:
+        """指定ステータスの商品ASIN一覧"""
+        return self.backend.asins_by_status(status)
+    
+    def get_products(self, asins: List[str]) -> Dict[str, Dict]:
+        """複数商品のトラッキング状況をまとめて取得"""
+        return self.backend.get_many(asins)
+    
+    def get_product_records(self, asins: List[str]) -> Dict[str, TrackedProduct]:
+        """複数商品のレコードをまとめて取得（時刻はUNIX秒のまま）"""
+        return self.backend.get_records(asins)
+    
+    def find_products(self, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+                      **filters) -> Tuple[Dict[str, Dict], Optional[str]]:
+        """
+        条件に合う商品をASIN順に1ページ分取得
+        
+        Args:
+            cursor: 前ページの next_cursor（このASINより後から取得）
+            limit: 1ページの件数（MAX_PAGE_SIZE まで）
+            **filters: status / category / min_threshold / max_threshold / stale_since
+        
+        Returns:
+            (ASINをキーとした商品辞書, 次ページのカーソル。最終ページはNone)
+        """
+        unknown = set(filters) - set(PRODUCT_FILTERS)
+        if unknown:
+            raise ValueError(f"未対応の絞り込み条件: {', '.join(sorted(unknown))}")
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        
+        # 1件多く取得して次ページの有無を判定
+        rows = self.backend.query(after=cursor, limit=limit + 1, **filters)
+        next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+        return dict(rows[:limit]), next_cursor
+    
+    def iter_products(self, page_size: int = MAX_PAGE_SIZE, **filters) -> Iterator[Tuple[str, Dict]]:
+        """条件に合う商品をページ単位で読み出しながら1件ずつ返す"""
+        cursor = None
+        while True:
+            page, cursor = self.find_products(cursor, page_size, **filters)
+            yield from page.items()
+            if cursor is None:
+                return
     
     def get_product_status(self, asin: str) -> Optional[Dict]:
         """特定商品のトラッキング状況取得"""
-        return self.tracked_products.get(asin)
+        return self.backend.get(asin)
     
     def update_product_status(self, asin: str, status: str, last_check: str = None, setup_method: str = None):
         """商品のトラッキング状況更新"""
-        if asin in self.tracked_products:
-            self.tracked_products[asin]["status"] = status
-            if last_check:
-                self.tracked_products[asin]["last_check"] = last_check
-            if setup_method:
-                self.tracked_products[asin]["setup_method"] = setup_method
-            logger.info(f"Updated {asin} status to {status}")
+        fields = {"status": status}
+        if last_check:
+            fields["last_check"] = last_check
+        if setup_method:
+            fields["setup_method"] = setup_method
+        with self._write_lock:
+            current = self.backend.get_records([asin]).get(asin)
+            if current is not None and self.backend.update(asin, fields):
+                status_delta = Counter()
+                status_delta[current.status] -= 1
+                status_delta[status] += 1
+                self._apply_counts(status_delta)
+                self.alerts.unwatch(asin)
+                logger.info(f"Updated {asin} status to {status}")
     
     def activate_all_pending(self):
         """全ての pending 商品を active に変更"""
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        for asin, product in self.tracked_products.items():
-            if product["status"] == "pending":
-                product["status"] = "active"
-                product["last_check"] = current_time
-                product["setup_method"] = "manual_activation"
-                logger.info(f"Activated tracking for {asin}")
+        with self._write_lock:
+            activated = self.backend.activate_pending(current_time, "manual_activation")
+            if activated:
+                self._apply_counts(Counter({"pending": -len(activated), "active": len(activated)}))
+                for asin in activated:
+                    self.alerts.unwatch(asin)
+        if activated:
+            logger.info(f"Activated tracking for {len(activated)} products")
     
     def add_product(self, asin: str, name: str, category: str, threshold: int = 95):
         """新しい商品をトラッキングリストに追加"""
-        self.tracked_products[asin] = {
+        with self._write_lock:
+            status_delta = Counter({"pending": 1})
+            category_delta = Counter({category: 1})
+            # 既存商品の置き換えは旧レコード分の件数を差し引く
+            previous = self.backend.get_records([asin]).get(asin)
+            if previous is not None:
+                status_delta[previous.status] -= 1
+                category_delta[previous.category] -= 1
+            
+            self.backend.upsert(asin, self._new_product(name, category, threshold))
+            self._apply_counts(status_delta, category_delta)
+            self.alerts.unwatch(asin)
+        logger.info(f"Added new product to tracking: {asin} - {name}")
+    
+    @staticmethod
+    def _new_product(name: str, category: str, threshold: int = 95) -> Dict:
+        """新規登録時の商品レコード"""
+        return {
             "name": name,
             "category": category,
             "status": "pending",
             "threshold": threshold,
             "added_date": datetime.now().strftime("%Y-%m-%d"),
             "last_check": None,
-            "setup_method": "api_added"
+            "setup_method": "api_added",
+            "keepa_last_update": None
         }
-        logger.info(f"Added new product to tracking: {asin} - {name}")
+    
+    def bulk_upsert(self, products: List[Dict]) -> Dict:
+        """
+        複数商品をまとめてトラッキングリストに追加（1トランザクション）
+        
+        Args:
+            products: asin, name, category, threshold（省略時95）を持つ辞書のリスト
+        
+        Returns:
+            追加・置き換え件数と、asin/name/category が欠けている（文字列でない）か
+            threshold が整数に変換できない項目の位置
+        """
+        records = {}
+        invalid = []
+        for index, item in enumerate(products):
+            if not isinstance(item, dict) or not all(
+                    isinstance(item.get(key), str) and item[key] for key in ("asin", "name", "category")):
+                invalid.append(index)
+                continue
+            try:
+                threshold = int(item.get("threshold", 95))
+            except (TypeError, ValueError):
+                invalid.append(index)
+                continue
+            records[item["asin"]] = self._new_product(item["name"], item["category"], threshold)
+        
+        with self._write_lock:
+            previous = self.backend.get_records(records)
+            self.backend.upsert_many(records.items())
+            
+            status_delta = Counter({"pending": len(records)})
+            category_delta = Counter(product["category"] for product in records.values())
+            for record in previous.values():
+                status_delta[record.status] -= 1
+                category_delta[record.category] -= 1
+            self._apply_counts(status_delta, category_delta)
+            for asin in previous:
+                self.alerts.unwatch(asin)
+        
+        result = {
+            "added": len(records) - len(previous),
+            "replaced": len(previous),
+            "invalid": invalid
+        }
+        logger.info(f"Bulk upsert: {len(records)} products "
+                    f"(added={result['added']}, replaced={result['replaced']}, invalid={len(invalid)})")
+        return result
+    
+    def bulk_update_status(self, asins: List[str], status: str, last_check: str = None,
+                           setup_method: str = None) -> Dict:
+        """
+        複数商品のトラッキング状況をまとめて更新（1トランザクション）
+        
+        Returns:
+            更新件数と未登録のASIN
+        """
+        fields = {"status": status}
+        if last_check:
+            fields["last_check"] = last_check
+        if setup_method:
+            fields["setup_method"] = setup_method
+        
+        unique_asins = list(dict.fromkeys(asins))
+        with self._write_lock:
+            current = self.backend.get_records(unique_asins)
+            updated = self.backend.update_many((asin, fields) for asin in current)
+            
+            status_delta = Counter()
+            for record in current.values():
+                status_delta[record.status] -= 1
+                status_delta[status] += 1
+                self.alerts.unwatch(record.asin)
+            self._apply_counts(status_delta)
+        
+        not_found = [asin for asin in unique_asins if asin not in current]
+        logger.info(f"Bulk status update to {status}: {updated} products (not_found={len(not_found)})")
+        return {"updated": updated, "not_found": not_found}
+    
+    def _apply_counts(self, status_delta: Counter, category_delta: Optional[Counter] = None):
+        """
+        件数の差分を反映（書き込みロック下で呼び出す）
+        
+        読み込み側がロックなしで参照できるよう、更新後の件数を新しいオブジェクトとして差し替える。
+        保存先が件数を持つ場合は書き込みと同じトランザクションで更新済みのため何もしない
+        """
+        if self._shared_counts:
+            return
+        status_counts, category_counts = self._counts
+        status_counts = status_counts.copy()
+        status_counts.update(status_delta)
+        if category_delta:
+            category_counts = category_counts.copy()
+            category_counts.update(category_delta)
+        self._counts = (status_counts, category_counts)
+    
+    def _current_counts(self) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """ステータス別・カテゴリ別の件数（保存先の共通の件数、なければプロセス内の件数）"""
+        return self.backend.counts() if self._shared_counts else self._counts
     
     def get_tracking_summary(self) -> Dict:
-        """トラッキング状況のサマリー"""
-        total = len(self.tracked_products)
-        active = sum(1 for p in self.tracked_products.values() if p["status"] == "active")
-        pending = sum(1 for p in self.tracked_products.values() if p["status"] == "pending")
+        """トラッキング状況のサマリー（保持している件数から算出）"""
+        status_counts, category_counts = self._current_counts()
+        total = sum(status_counts.values())
+        active = status_counts.get("active", 0)
+        pending = status_counts.get("pending", 0)
         
         return {
             "total_products": total,
             "active_tracking": active,
             "pending_setup": pending,
+            "categories": {category: n for category, n in category_counts.items() if n > 0},
             "last_updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             "setup_complete": active == total
         }
     
+    def data_version(self) -> Tuple[str, float]:
+        """
+        トラッキングデータ・価格履歴の版（HTTPキャッシュの検証用）
+        
+        Returns:
+            (版を表す文字列, 最終更新時刻（UNIX秒）)。いずれかが変更されると版が変わる。
+            保存先の版数と価格履歴ファイルの状態から求めるため、複数プロセスでも一致する
+        """
+        version, updated_at = self.backend.version()
+        size, mtime_ns = self.price_store.signature()
+        # 更新時刻も含め、再起動でメモリ上の版数が戻った場合も別の版とする
+        token = hashlib.sha1(f"{version}:{updated_at!r}:{size}:{mtime_ns}".encode()).hexdigest()[:16]
+        return token, max(updated_at, mtime_ns / 1e9)
+    
+    def verify_counters(self) -> bool:
+        """保持している件数が保存先の集計と一致するか検証"""
+        with self._write_lock:
+            expected_status = self.backend.count_by_status()
+            expected_category = self.backend.count_by_category()
+            status_counts, category_counts = self._current_counts()
+        # 件数0のキーは比較対象外
+        status_counts = {k: v for k, v in status_counts.items() if v != 0}
+        category_counts = {k: v for k, v in category_counts.items() if v != 0}
+        consistent = status_counts == expected_status and category_counts == expected_category
+        if not consistent:
+            logger.warning(f"Tracking counters out of sync: status={status_counts} expected={expected_status}, "
+                           f"category={category_counts} expected={expected_category}")
+        return consistent
+    
+    def record_prices(self, asin: str, timestamps: Sequence[int], prices: Sequence[int], domain: str = 'JP') -> int:
+        """
+        価格データを履歴ストアに追記し、分析スナップショットを更新
+        
+        Args:
+            asin: 商品ASIN
+            timestamps: 時刻（UNIX分、昇順）
+            prices: 価格（出品なしは-1）
+            domain: Amazonドメイン
+        
+        Returns:
+            追記した件数
+        """
+        appended = self.price_store.append(asin, timestamps, prices)
+        if appended:
+            logger.info(f"Recorded {appended} price points for {asin}")
+            self.update_analysis_snapshot(asin, domain)
+            self.check_alerts(asin, timestamps, prices)
+        return appended
+    
+    def check_alerts(self, asin: str, timestamps: Sequence[int], prices: Sequence[int]) -> List[Dict]:
+        """
+        新しい価格データで閾値アラートを判定
+        
+        active な商品のみ対象とする。監視していない商品は、届いたデータの最新価格を
+        基準価格として監視を開始する（それ以前の履歴では発火しない）。
+        商品の更新時は監視状態を破棄し、次の価格データで作り直す
+        """
+        if not self.alerts.is_watching(asin):
+            record = self.backend.get_records([asin]).get(asin)
+            if record is None or record.status != "active" or not record.threshold:
+                return []
+            valid_prices = [int(price) for price in prices if price != -1]
+            self.alerts.watch(asin, record.threshold,
+                              reference_price=valid_prices[-1] if valid_prices else None,
+                              since=int(timestamps[-1]) if len(timestamps) else None)
+            return []
+        return self.alerts.on_prices(asin, timestamps, prices)
+    
+    def update_analysis_snapshot(self, asin: str, domain: str = 'JP') -> Optional[Dict]:
+        """価格履歴から分析スナップショットを再計算"""
+        source_timestamp = self.price_store.last_timestamp(asin)
+        stats = self.price_store.window_stats(asin, self.snapshots.period_days)
+        return self.snapshots.update(asin, domain, stats, source_timestamp)
+    
+    def get_analysis_snapshot(self, asin: str, domain: str = 'JP') -> Optional[Dict]:
+        """
+        分析スナップショットの取得
+        
+        未計算の場合と、計算後に履歴が追記されていた場合（他のワーカーによる追記を含む）は再計算する
+        """
+        snapshot = self.snapshots.get(asin, domain)
+        latest = self.price_store.last_timestamp(asin)
+        if latest is not None and (snapshot is None or snapshot.get('source_timestamp') is None
+                                   or snapshot['source_timestamp'] < latest):
+            snapshot = self.update_analysis_snapshot(asin, domain)
+        return snapshot
+    
+    def get_price_data(self, asin: str, days: int = 30) -> Dict:
+        """履歴ストアから直近days日の価格データを取得（未保存の場合はシミュレーション）"""
+        stats = self.price_store.window_stats(asin, days)
+        if stats is None:
+            return self.simulate_price_data(asin)
+        
+        product_status = self.get_product_status(asin)
+        current_price = stats['current']
+        base_price = stats['first']
+        price_change = current_price - base_price if current_price is not None else None
+        
+        return {
+            "asin": asin,
+            "current_price": current_price,
+            "base_price": base_price,
+            f"min_price_{days}d": stats['min'],
+            f"max_price_{days}d": stats['max'],
+            f"avg_price_{days}d": int(stats['avg']),
+            "price_change": price_change,
+            "price_change_percent": round((price_change / base_price) * 100, 2) if price_change is not None and base_price else None,
+            "data_points": stats['data_points'],
+            "last_updated": datetime.fromtimestamp(stats['last_timestamp'] * 60).strftime("%Y-%m-%d %H:%M:%S"),
+            "tracking_status": product_status,
+            "data_quality": "price_history"
+        }
+    
+    def refresh_price_history(self, client, asin: str, domain: str = 'JP') -> Dict:
+        """
+        1商品の価格履歴を差分更新
+        
+        Args:
+            client: SalesToolsAPIClient
+            asin: 商品ASIN
+            domain: Amazonドメイン
+        
+        Returns:
+            更新結果サマリー
+        """
+        return self.refresh_all_price_history(client, [asin], domain)
+    
+    def refresh_all_price_history(self, client, asins: Optional[List[str]] = None, domain: str = 'JP') -> Dict:
+        """
+        複数商品の価格履歴を差分更新（省略時は active な全商品）
+        
+        保存済みの最新時刻より新しい価格のみを履歴ストアに追記し、
+        lastUpdateが変わっていない商品は追記を省略する
+        
+        Args:
+            client: SalesToolsAPIClient
+            asins: 商品ASINリスト
+            domain: Amazonドメイン
+        
+        Returns:
+            更新結果サマリー
+        """
+        if asins is None:
+            asins = self.backend.asins_by_status("active")
+        
+        records = self.backend.get_records(asins)
+        since = {}
+        last_updates = {}
+        for asin in asins:
+            last_timestamp = self.price_store.last_timestamp(asin)
+            if last_timestamp is not None:
+                since[asin] = last_timestamp
+            record = records.get(asin)
+            if record is not None and record.keepa_last_update is not None:
+                last_updates[asin] = record.keepa_last_update
+        
+        deltas = client.get_price_history_deltas(asins, domain, since, last_updates)
+        
+        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        summary = {"requested": len(asins), "fetched": len(deltas), "skipped": 0, "updated": 0, "points_added": 0}
+        product_updates = []
+        for asin, delta in deltas.items():
+            if delta["changed"]:
+                added = self.record_prices(asin, delta["timestamps"], delta["prices"], domain)
+                summary["points_added"] += added
+                if added:
+                    summary["updated"] += 1
+            else:
+                summary["skipped"] += 1
+            
+            product_updates.append((asin, {"keepa_last_update": delta["last_update"], "last_check": current_time}))
+        
+        self.backend.update_many(product_updates)
+        logger.info(f"Price history refresh: {summary}")
+        return summary
+    
     def simulate_price_data(self, asin: str) -> Dict:
         """価格データのシミュレーション（テスト用）"""
         import random
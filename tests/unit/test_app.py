@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+import json
+import unittest
+import os
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+# srcディレクトリをパスに追加
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src'))
+
+import app as app_module
+from price_history_store import PriceHistoryStore
+from tracking_backends import InMemoryTrackingBackend
+from tracking_manager import TrackingManager
+
+class TestApp(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.manager = TrackingManager(price_store=PriceHistoryStore(os.path.join(self.tmpdir.name, 'history.bin')),
+                                       backend=InMemoryTrackingBackend())
+        self.patcher = patch.object(app_module, 'tracking_manager', self.manager)
+        self.patcher.start()
+        app_module.response_cache.clear()
+        self.client = app_module.app.test_client()
+        self.now_min = int(time.time() // 60)
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.tmpdir.cleanup()
+
+    def test_create_app_returns_flask_app(self):
+        """gunicorn用ファクトリがアプリを返すテスト"""
+        self.assertIs(app_module.create_app(), app_module.app)
+
+    def test_json_response_keeps_japanese(self):
+        """レスポンスの日本語がエスケープされないテスト"""
+        response = self.client.get('/tracking/B08CDYX378')
+
+        self.assertIn('コカ・コーラ'.encode('utf-8'), response.get_data())
+
+    def test_etag_not_modified(self):
+        """同じ版への再要求が304となるテスト"""
+        response = self.client.get('/tracking')
+        etag = response.headers['ETag']
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response.headers['Cache-Control'])
+        self.assertIsNotNone(response.headers.get('Last-Modified'))
+
+        response = self.client.get('/tracking', headers={'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.get_data(), b'')
+
+    def test_etag_changes_after_mutation(self):
+        """トラッキングデータ・価格履歴の更新で版が変わるテスト"""
+        etag = self.client.get('/tracking/B08CDYX378').headers['ETag']
+
+        self.manager.update_product_status('B08CDYX378', 'paused')
+        after_status = self.client.get('/tracking/B08CDYX378', headers={'If-None-Match': etag})
+
+        self.assertEqual(after_status.status_code, 200)
+        self.assertEqual(after_status.get_json()['tracking_info']['status'], 'paused')
+
+        self.manager.record_prices('B08CDYX378', [self.now_min], [150])
+        after_prices = self.client.get('/tracking/B08CDYX378',
+                                       headers={'If-None-Match': after_status.headers['ETag']})
+
+        self.assertEqual(after_prices.status_code, 200)
+
+    def test_response_cached_until_mutation(self):
+        """版が変わるまで生成済みの本文を返すテスト"""
+        with patch.object(self.manager, 'find_products', wraps=self.manager.find_products) as find_products:
+            first = self.client.get('/tracking?limit=2')
+            second = self.client.get('/tracking?limit=2')
+            self.client.get('/tracking?limit=1')
+
+            self.assertEqual(find_products.call_count, 2)
+            self.assertEqual(first.get_json()['products'], second.get_json()['products'])
+
+            self.manager.add_product('B0TEST0001', 'テスト商品', '食品・飲料')
+            third = self.client.get('/tracking?limit=2')
+
+            self.assertEqual(find_products.call_count, 3)
+            self.assertEqual(third.get_json()['summary']['total_products'], 4)
+
+    def test_cached_body_has_current_times(self):
+        """キャッシュから返す本文も、返却時刻・スナップショットの経過秒数が現在時刻で埋められるテスト"""
+        self.manager.record_prices('B08CDYX378', [self.now_min - 60, self.now_min], [200, 150])
+        first = self.client.get('/product/B08CDYX378').get_json()
+        first_list = self.client.get('/tracking').get_json()
+
+        later = time.time() + 120
+        with patch('time.time', return_value=later):
+            second = self.client.get('/product/B08CDYX378').get_json()
+            second_list = self.client.get('/tracking').get_json()
+
+        self.assertEqual(app_module.response_cache.get_stats()['hits'], 2)
+        self.assertGreaterEqual(second['metadata']['snapshot_age_seconds'],
+                                first['metadata']['snapshot_age_seconds'] + 119)
+        self.assertEqual(second['metadata']['retrieved_at'],
+                         time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(later)))
+        self.assertEqual(second['metadata']['snapshot_computed_at'], first['metadata']['snapshot_computed_at'])
+        self.assertEqual(second_list['timestamp'], time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(later)))
+        self.assertEqual(second_list['summary']['last_updated'], second_list['timestamp'])
+        self.assertEqual(second_list['products'], first_list['products'])
+
+    def test_errors_not_cached(self):
+        """エラーレスポンスはキャッシュされないテスト"""
+        response = self.client.get('/tracking?min_threshold=abc')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIsNone(response.headers.get('ETag'))
+        self.assertEqual(app_module.response_cache.get_stats()['entries'], 0)
+
+    def test_analyze_reads_snapshot(self):
+        """事前計算済みの分析結果を返すテスト"""
+        self.manager.record_prices('B08CDYX378', [self.now_min - 60, self.now_min], [200, 150])
+
+        response = self.client.post('/analyze', json={'asin': 'B08CDYX378'})
+
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertEqual(body['analysis']['current_price'], 150)
+        self.assertEqual(body['metadata']['data_source'], 'analysis_snapshot')
+        self.assertIsNotNone(body['metadata']['snapshot_age_seconds'])
+
+    def test_analyze_without_snapshot(self):
+        """スナップショットがない場合のテスト"""
+        response = self.client.post('/analyze', json={'asin': 'B08CDYX378'})
+
+        body = response.get_json()
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(body['metadata']['snapshot_age_seconds'])
+
+    def test_analyze_requires_asin(self):
+        """ASINなしは400となるテスト"""
+        response = self.client.post('/analyze', json={})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_product_info_reads_snapshot(self):
+        """商品情報に事前計算済みの価格履歴が含まれるテスト"""
+        self.manager.record_prices('B08CDYX378', [self.now_min - 60, self.now_min], [200, 150])
+
+        response = self.client.get('/product/B08CDYX378')
+
+        body = response.get_json()
+        self.assertEqual(body['price_history']['min_price'], 150)
+        self.assertEqual(body['metadata']['data_source'], 'analysis_snapshot')
+
+    def test_tracking_list_paginates(self):
+        """カーソルで一覧をページングするテスト"""
+        first = self.client.get('/tracking?limit=2').get_json()
+
+        self.assertEqual(list(first['products']), ['B08CDYX378', 'B08N5WRWNW'])
+        self.assertEqual(first['pagination']['next_cursor'], 'B08N5WRWNW')
+        self.assertEqual(first['summary']['total_products'], 3)
+
+        second = self.client.get(f"/tracking?limit=2&cursor={first['pagination']['next_cursor']}").get_json()
+
+        self.assertEqual(list(second['products']), ['B0B5SDFLTB'])
+        self.assertIsNone(second['pagination']['next_cursor'])
+
+    def test_tracking_list_filters(self):
+        """絞り込み条件のテスト"""
+        self.manager.add_product('B0TEST0001', 'テスト商品', 'Electronics', threshold=80)
+
+        body = self.client.get('/tracking?category=Electronics&status=pending').get_json()
+        self.assertEqual(list(body['products']), ['B0TEST0001'])
+
+        body = self.client.get('/tracking?max_threshold=90').get_json()
+        self.assertEqual(list(body['products']), ['B0TEST0001'])
+
+        body = self.client.get('/tracking?stale_since=2025-08-02 07:00:00').get_json()
+        self.assertEqual(list(body['products']), ['B0TEST0001'])
+
+    def test_tracking_list_invalid_filter(self):
+        """不正な絞り込み条件は400となるテスト"""
+        self.assertEqual(self.client.get('/tracking?min_threshold=abc').status_code, 400)
+        self.assertEqual(self.client.get('/tracking?stale_since=yesterday').status_code, 400)
+
+    def test_tracking_list_ndjson(self):
+        """NDJSON形式で逐次出力するテスト"""
+        response = self.client.get('/tracking?format=ndjson&status=active')
+
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual([line['asin'] for line in lines], ['B08CDYX378', 'B08N5WRWNW', 'B0B5SDFLTB'])
+        self.assertEqual(lines[0]['status'], 'active')
+
+    def test_bulk_add_and_activate(self):
+        """一括登録・一括アクティベーションのテスト"""
+        products = [{'asin': f'B0TEST{i:04d}', 'name': f'商品{i}', 'category': 'Electronics'} for i in range(50)]
+
+        response = self.client.post('/tracking/bulk', json={'action': 'add', 'products': products})
+
+        body = response.get_json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body['result']['added'], 50)
+        self.assertEqual(body['summary']['pending_setup'], 50)
+
+        response = self.client.post('/tracking/bulk', json={
+            'action': 'activate', 'asins': [p['asin'] for p in products] + ['UNKNOWN']
+        })
+
+        body = response.get_json()
+        self.assertEqual(body['result']['updated'], 50)
+        self.assertEqual(body['result']['not_found'], ['UNKNOWN'])
+        self.assertEqual(body['summary']['active_tracking'], 53)
+        self.assertTrue(self.manager.verify_counters())
+
+    def test_bulk_invalid_request(self):
+        """不正な一括リクエストは400となるテスト"""
+        self.assertEqual(self.client.post('/tracking/bulk', json={'action': 'delete', 'asins': ['A']}).status_code, 400)
+        self.assertEqual(self.client.post('/tracking/bulk', json={'action': 'add'}).status_code, 400)
+        self.assertEqual(self.client.post('/tracking/bulk', json={'action': 'update_status', 'asins': ['A']}).status_code, 400)
+        self.assertEqual(self.client.post('/tracking/bulk', json={'action': 'activate', 'asins': [{'asin': 'A'}]}).status_code, 400)
+
+    def test_bulk_add_malformed_items(self):
+        """閾値・ASINが不正な項目は500にせず invalid として返すテスト"""
+        response = self.client.post('/tracking/bulk', json={'action': 'add', 'products': [
+            {'asin': 'B0TEST0001', 'name': '商品', 'category': 'Electronics', 'threshold': 'abc'},
+            {'asin': None, 'name': '商品', 'category': 'Electronics'},
+            {'asin': 'B0TEST0002', 'name': '商品', 'category': 'Electronics'}
+        ]})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['result']['invalid'], [0, 1])
+
+    def test_tracking_product_price_data(self):
+        """トラッキング商品の価格データが履歴ストアから返されるテスト"""
+        self.manager.record_prices('B08CDYX378', [self.now_min], [150])
+
+        response = self.client.get('/tracking/B08CDYX378')
+
+        body = response.get_json()
+        self.assertEqual(body['price_data']['data_quality'], 'price_history')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+import unittest
+import asyncio
+import os
+import sys
+import threading
+import time
+from unittest.mock import Mock
+
+# srcディレクトリをパスに追加
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src'))
+
+from async_sales_tools_api_client import AsyncSalesToolsAPIClient, run_fan_out
+from sales_tools_api_client import KEEPA_MAX_ASINS_PER_QUERY
+
+class TestAsyncSalesToolsAPIClient(unittest.TestCase):
+
+    def setUp(self):
+        self.sync_client = Mock()
+        self.sync_client.get_products_batch.side_effect = lambda asins, domain, cancel=None: {a: {'asin': a} for a in asins}
+        self.sync_client.analyze_price_trends.side_effect = lambda asins, domain, cancel=None: {a: {'trend': 'normal'} for a in asins}
+
+    def test_get_product_info(self):
+        """単体取得が同期クライアントに委譲されるテスト"""
+        self.sync_client.get_product_info.return_value = {'asin': 'B0B5SDFLTB'}
+
+        async def main():
+            async with AsyncSalesToolsAPIClient(self.sync_client) as client:
+                return await client.get_product_info('B0B5SDFLTB')
+
+        self.assertEqual(asyncio.run(main()), {'asin': 'B0B5SDFLTB'})
+        self.sync_client.get_product_info.assert_called_once_with('B0B5SDFLTB', 'JP')
+
+    def test_fan_out_splits_into_query_chunks(self):
+        """チャンク単位で並行実行されるテスト"""
+        asins = [f'B{i:09d}' for i in range(KEEPA_MAX_ASINS_PER_QUERY * 3)]
+
+        result = run_fan_out(asins, action='info', client=self.sync_client)
+
+        self.assertEqual(len(result), len(asins))
+        self.assertEqual(self.sync_client.get_products_batch.call_count, 3)
+
+    def test_concurrency_is_bounded(self):
+        """同時実行数が制限されるテスト"""
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def slow_batch(asins, domain, cancel=None):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.05)
+            with lock:
+                active.pop()
+            return {a: {} for a in asins}
+
+        self.sync_client.analyze_price_trends.side_effect = slow_batch
+        asins = [f'B{i:09d}' for i in range(KEEPA_MAX_ASINS_PER_QUERY * 6)]
+
+        run_fan_out(asins, client=self.sync_client, concurrency=2)
+
+        self.assertLessEqual(max(peak), 2)
+
+    def test_timeout_drops_chunk(self):
+        """タイムアウトしたチャンクが結果から除外されるテスト"""
+        def batch(asins, domain, cancel=None):
+            if asins[0] == 'SLOW000000':
+                time.sleep(0.5)
+            return {a: {} for a in asins}
+
+        self.sync_client.analyze_price_trends.side_effect = batch
+        asins = ['SLOW000000'] + [f'B{i:09d}' for i in range(KEEPA_MAX_ASINS_PER_QUERY)]
+
+        result = run_fan_out(asins, client=self.sync_client, timeout=0.1)
+
+        self.assertNotIn('SLOW000000', result)
+        self.assertEqual(len(result), 1)
+
+    def test_timeout_cancels_running_chunk(self):
+        """タイムアウトしたチャンクの同期処理に中止が伝わるテスト"""
+        seen = threading.Event()
+
+        def batch(asins, domain, cancel=None):
+            if cancel.wait(5):
+                seen.set()
+            return {}
+
+        self.sync_client.analyze_price_trends.side_effect = batch
+
+        result = run_fan_out(['B0B5SDFLTB'], client=self.sync_client, timeout=0.05)
+
+        self.assertEqual(result, {})
+        self.assertTrue(seen.wait(1))
+
+    def test_failed_chunk_does_not_fail_batch(self):
+        """一部チャンクのエラーが他に影響しないテスト"""
+        def batch(asins, domain, cancel=None):
+            if asins[0] == 'B000000000':
+                raise RuntimeError("API接続エラー")
+            return {a: {} for a in asins}
+
+        self.sync_client.analyze_price_trends.side_effect = batch
+        asins = [f'B{i:09d}' for i in range(KEEPA_MAX_ASINS_PER_QUERY + 1)]
+
+        result = run_fan_out(asins, client=self.sync_client)
+
+        self.assertEqual(list(result), [asins[-1]])
+
+    def test_chunk_errors_reported_per_asin(self):
+        """タイムアウト・例外・同期クライアントが記録した失敗が、ASINごとの原因として返るテスト"""
+        def batch(asins, domain, errors=None, cancel=None):
+            if asins[0] == 'SLOW000000':
+                time.sleep(0.5)
+            elif asins[0] == 'FAIL000000':
+                raise RuntimeError("API接続エラー")
+            errors['B000000BAD'] = 'Keepa query failed: REQUEST_REJECTED'
+            return {a: {} for a in asins if a != 'B000000BAD'}
+
+        self.sync_client.analyze_price_trends.side_effect = batch
+        slow = ['SLOW000000'] + [f'S{i:09d}' for i in range(KEEPA_MAX_ASINS_PER_QUERY - 1)]
+        failing = ['FAIL000000'] + [f'F{i:09d}' for i in range(KEEPA_MAX_ASINS_PER_QUERY - 1)]
+        errors = {}
+
+        result = run_fan_out(slow + failing + ['B08CDYX378', 'B000000BAD'], client=self.sync_client,
+                             timeout=0.1, errors=errors)
+
+        self.assertEqual(list(result), ['B08CDYX378'])
+        self.assertEqual(errors['SLOW000000'], 'Timed out after 0.1s')
+        self.assertEqual(errors['F000000001'], 'API接続エラー')
+        self.assertEqual(errors['B000000BAD'], 'Keepa query failed: REQUEST_REJECTED')
+        self.assertNotIn('B08CDYX378', errors)
+
+if __name__ == '__main__':
+    unittest.main()
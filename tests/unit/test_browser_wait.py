@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import time
+import unittest
+
+# srcディレクトリをパスに追加
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src'))
+
+from selenium.webdriver.common.by import By
+
+import browser_wait
+from browser_wait import WaitEngine, WaitProfile, merge_wait_seconds
+
+FAST_TEST_PROFILE = WaitProfile(
+    name='test',
+    timeouts={'track_tab': 0.5, 'page_load': 1.0, 'network_idle': 1.0},
+    pauses={'hover': (0.2, 0.4)},
+    poll_interval=0.01,
+    network_idle_seconds=0.05
+)
+
+class FakeElement:
+
+    def __init__(self, displayed=True, enabled=True):
+        self.displayed = displayed
+        self.enabled = enabled
+
+    def is_displayed(self):
+        return self.displayed
+
+    def is_enabled(self):
+        return self.enabled
+
+class FakeDriver:
+    """execute_script・find_elements の結果を順に返すドライバ"""
+
+    def __init__(self, scripts=None, elements=None, appear_after=0):
+        self.scripts = {key: list(values) for key, values in (scripts or {}).items()}
+        self.elements = elements or {}
+        self.appear_after = appear_after
+        self.find_calls = 0
+
+    def execute_script(self, script):
+        key = 'readyState' if 'readyState' in script else 'resources'
+        values = self.scripts[key]
+        return values.pop(0) if len(values) > 1 else values[0]
+
+    def find_elements(self, by, value):
+        self.find_calls += 1
+        if self.find_calls <= self.appear_after:
+            return []
+        return self.elements.get((by, value), [])
+
+class TestWaitEngine(unittest.TestCase):
+
+    def test_element_checks_all_selectors_together(self):
+        """候補のセレクタを順に待たず、表示された要素をすぐ返す"""
+        element = FakeElement()
+        driver = FakeDriver(elements={
+            (By.CSS_SELECTOR, '#tabTrack'): [FakeElement(displayed=False)],
+            (By.XPATH, "//a[contains(text(), 'Track')]"): [element]
+        }, appear_after=6)
+        waits = WaitEngine(driver, FAST_TEST_PROFILE)
+
+        started = time.monotonic()
+        selector, found = waits.element('track_tab', ['#tabTrack', '.track-tab', "//a[contains(text(), 'Track')]"])
+
+        self.assertIs(found, element)
+        self.assertEqual(selector, "//a[contains(text(), 'Track')]")
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertIn('track_tab', waits.item_report())
+
+    def test_element_clickable_requires_enabled(self):
+        """クリック対象は有効な要素のみ"""
+        driver = FakeDriver(elements={(By.CSS_SELECTOR, '#submit'): [FakeElement(enabled=False)]})
+        waits = WaitEngine(driver, FAST_TEST_PROFILE)
+
+        self.assertEqual(waits.element('track_tab', ['#submit']), (None, None))
+        self.assertIsNotNone(waits.element('track_form', ['#submit'], clickable=False)[1])
+        self.assertEqual(waits.report()['track_tab']['timeouts'], 1)
+
+    def test_page_ready_waits_for_dom_and_network(self):
+        """DOMの読み込み完了後、リソース取得数が増えなくなるまで待機"""
+        driver = FakeDriver(scripts={
+            'readyState': ['loading', 'interactive', 'complete'],
+            'resources': [3, 5, 8, 8]
+        })
+        waits = WaitEngine(driver, FAST_TEST_PROFILE)
+
+        self.assertTrue(waits.page_ready())
+        report = waits.item_report()
+        self.assertIn('page_load', report)
+        self.assertGreaterEqual(report['network_idle'], FAST_TEST_PROFILE.network_idle_seconds)
+
+    def test_page_ready_timeout(self):
+        """通信が収束しない場合はタイムアウトとして記録"""
+        counter = iter(range(10 ** 6))
+        driver = FakeDriver(scripts={'readyState': ['complete'], 'resources': [0]})
+        driver.execute_script = lambda script: 'complete' if 'readyState' in script else next(counter)
+        waits = WaitEngine(driver, FAST_TEST_PROFILE)
+
+        self.assertFalse(waits.page_ready())
+        self.assertEqual(waits.report()['network_idle']['timeouts'], 1)
+
+    def test_pause_profiles(self):
+        """fastプロファイルは間を入れない"""
+        slept = []
+        human = WaitEngine(FakeDriver(), FAST_TEST_PROFILE, sleep=slept.append)
+        fast = WaitEngine(FakeDriver(), 'fast', sleep=slept.append)
+
+        human.pause('hover')
+        fast.pause('hover')
+        fast.pause('scroll')
+
+        self.assertEqual(len(slept), 1)
+        self.assertTrue(0.2 <= slept[0] <= 0.4)
+        self.assertEqual(fast.item_report(), {})
+
+    def test_timeout_adapts_to_observed_latency(self):
+        """実測値が集まるとタイムアウトを短縮（下限・上限あり）"""
+        waits = WaitEngine(FakeDriver(), 'human')
+        self.assertEqual(waits.timeout_for('track_tab'), 20)
+
+        for _ in range(browser_wait.ADAPT_MIN_SAMPLES):
+            waits._record('track_tab', 0.1, ok=True)
+            waits._record('page_load', 4.0, ok=True)
+        self.assertEqual(waits.timeout_for('track_tab'), browser_wait.ADAPT_FLOOR_SECONDS)
+        self.assertEqual(waits.timeout_for('page_load'), 12.0)
+
+        waits.adaptive = False
+        self.assertEqual(waits.timeout_for('track_tab'), 20)
+
+    def test_item_report_resets(self):
+        """1商品分の待機時間は start_item で初期化"""
+        waits = WaitEngine(FakeDriver(), FAST_TEST_PROFILE)
+        waits._record('page_load', 1.234, ok=True)
+        self.assertEqual(waits.item_report(), {'page_load': 1.23})
+
+        waits.start_item()
+        self.assertEqual(waits.item_report(), {})
+        self.assertEqual(waits.report()['page_load']['count'], 1)
+
+    def test_merge_wait_seconds(self):
+        total = merge_wait_seconds({'page_load': 1.0}, {'page_load': 0.5, 'track_tab': 0.25})
+        self.assertEqual(total, {'page_load': 1.5, 'track_tab': 0.25})
+
+if __name__ == '__main__':
+    unittest.main()
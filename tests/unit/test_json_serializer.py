@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+import unittest
+import importlib
+import os
+import sys
+from datetime import datetime
+from unittest.mock import patch
+
+import numpy as np
+
+# srcディレクトリをパスに追加
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src'))
+
+import json_serializer
+
+PAYLOAD = {
+    "title": "コカ・コーラ カナダドライ",
+    "prices": np.array([1980, 2100], dtype=np.int32),
+    "times": np.array(['2025-08-01T00:00', '2025-08-02T12:30'], dtype='datetime64[m]'),
+    "avg": np.float64(2040.5),
+    "count": np.int64(2),
+    "checked": datetime(2025, 8, 2, 7, 10, 0)
+}
+
+EXPECTED = {
+    "title": "コカ・コーラ カナダドライ",
+    "prices": [1980, 2100],
+    "times": ["2025-08-01T00:00:00", "2025-08-02T12:30:00"],
+    "avg": 2040.5,
+    "count": 2,
+    "checked": "2025-08-02T07:10:00"
+}
+
+class SerializerTestMixin:
+
+    def test_numpy_and_datetime(self):
+        """NumPy配列・スカラー・日時を変換するテスト"""
+        self.assertEqual(self.serializer.loads(self.serializer.dumps(PAYLOAD)), EXPECTED)
+
+    def test_japanese_not_escaped(self):
+        """日本語をエスケープしないテスト"""
+        self.assertIn("コカ・コーラ", self.serializer.dumps({"title": "コカ・コーラ"}))
+        self.assertIn("コカ・コーラ".encode('utf-8'), self.serializer.dumps_bytes({"title": "コカ・コーラ"}))
+
+    def test_unsupported_type(self):
+        """変換できない値はTypeErrorとなるテスト"""
+        with self.assertRaises(TypeError):
+            self.serializer.dumps({"value": object()})
+
+class TestDefaultSerializer(SerializerTestMixin, unittest.TestCase):
+
+    def setUp(self):
+        self.serializer = json_serializer
+
+class TestStdlibFallback(SerializerTestMixin, unittest.TestCase):
+
+    def setUp(self):
+        # orjsonがない環境を再現
+        with patch.dict(sys.modules, {'orjson': None}):
+            self.serializer = importlib.reload(json_serializer)
+
+    def tearDown(self):
+        importlib.reload(json_serializer)
+
+    def test_backend(self):
+        """標準jsonにフォールバックするテスト"""
+        self.assertEqual(self.serializer.BACKEND, 'json')
+
+if __name__ == '__main__':
+    unittest.main()
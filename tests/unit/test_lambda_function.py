@@ -2,12 +2,14 @@
 import unittest
 import json
 import os
+import subprocess
 import sys
 from unittest.mock import Mock, patch
 
 # srcディレクトリをパスに追加
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src'))
 
+import lambda_function
 from lambda_function import lambda_handler
 
 class TestLambdaFunction(unittest.TestCase):
@@ -107,5 +109,324 @@ class TestLambdaFunction(unittest.TestCase):
         
         self.assertEqual(result['statusCode'], 200)
 
+class TestLambdaColdStart(unittest.TestCase):
+    """コンテナ内でのクライアント共有・遅延読み込みのテスト"""
+
+    def setUp(self):
+        lambda_function._client = None
+        lambda_function._client_init_seconds = None
+
+    def tearDown(self):
+        lambda_function._client = None
+
+    def test_status_does_not_import_heavy_modules(self):
+        """statusアクションではkeepa・numpyを読み込まない"""
+        src_dir = os.path.join(os.path.dirname(__file__), '../../src')
+        code = (
+            "import sys, json, lambda_function;"
+            "r = lambda_function.lambda_handler({'action': 'status'}, None);"
+            "print(json.dumps([r['statusCode'], 'keepa' in sys.modules, 'numpy' in sys.modules]))"
+        )
+        output = subprocess.run([sys.executable, '-c', code], cwd=src_dir, capture_output=True,
+                                text=True, check=True).stdout
+        self.assertEqual(json.loads(output.strip().splitlines()[-1]), [200, False, False])
+
+    @patch('sales_tools_api_client.SalesToolsAPIClient')
+    def test_client_created_once_per_container(self, mock_client_class):
+        """クライアントは最初の呼び出しでのみ生成される"""
+        mock_client_class.return_value.analyze_price_trend.return_value = {'asin': 'B0B5SDFLTB'}
+        event = {'asin': 'B0B5SDFLTB', 'action': 'analyze'}
+
+        first = json.loads(lambda_handler(event, None)['body'])
+        second = json.loads(lambda_handler(event, None)['body'])
+
+        mock_client_class.assert_called_once_with()
+        self.assertEqual(mock_client_class.return_value.analyze_price_trend.call_count, 2)
+        self.assertIn('client_init_ms', first['timing'])
+        self.assertNotIn('client_init_ms', second['timing'])
+        self.assertEqual(second['data'], {'asin': 'B0B5SDFLTB'})
+
+    def test_timing_reports_cold_start_once(self):
+        """初期化時間は最初の呼び出しのみ報告される"""
+        lambda_function._cold_start = True
+        first = json.loads(lambda_handler({'action': 'status'}, None)['body'])['timing']
+        second = json.loads(lambda_handler({'action': 'status'}, None)['body'])['timing']
+
+        self.assertTrue(first['cold_start'])
+        self.assertGreater(first['init_ms'], 0)
+        self.assertFalse(second['cold_start'])
+        self.assertEqual(second['init_ms'], 0)
+        self.assertIn('handler_ms', second)
+
+    @patch('sales_tools_api_client.SalesToolsAPIClient')
+    def test_client_init_error_is_retried(self, mock_client_class):
+        """API設定エラー時はクライアントを保持せず次回再生成する"""
+        client = Mock()
+        client.get_product_info.return_value = {'asin': 'B0B5SDFLTB'}
+        mock_client_class.side_effect = [ValueError("no key"), client]
+        event = {'asin': 'B0B5SDFLTB', 'action': 'info'}
+
+        self.assertEqual(lambda_handler(event, None)['statusCode'], 500)
+        self.assertIsNone(lambda_function._client)
+        self.assertEqual(lambda_handler(event, None)['statusCode'], 200)
+        self.assertEqual(mock_client_class.call_count, 2)
+
+class TestLambdaBatch(unittest.TestCase):
+    """batchアクション・SQSイベントのテスト"""
+
+    def setUp(self):
+        patcher = patch('sales_tools_api_client.SalesToolsAPIClient')
+        self.mock_client = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+        lambda_function._client = None
+        self.addCleanup(setattr, lambda_function, '_client', None)
+
+        # B000000BAD は Keepa にデータがない商品として扱う
+        self.mock_client.analyze_price_trends.side_effect = lambda asins, domain, errors=None, cancel=None: {
+            asin: {'trend': 'normal', 'domain': domain} for asin in asins if asin != 'B000000BAD'
+        }
+        self.mock_client.get_products_batch.side_effect = lambda asins, domain, errors=None, cancel=None: {
+            asin: {'title': asin} for asin in asins
+        }
+
+    def test_batch_partial_failure(self):
+        """一部のASINが失敗しても他の結果は返る"""
+        event = {'action': 'batch', 'asins': ['B0B5SDFLTB', 'B000000BAD', 'bad-asin', 'B08CDYX378']}
+        result = lambda_handler(event, None)
+
+        self.assertEqual(result['statusCode'], 200)
+        body = json.loads(result['body'])
+        self.assertFalse(body['success'])
+        self.assertEqual(sorted(body['results']), ['B08CDYX378', 'B0B5SDFLTB'])
+        self.assertEqual(body['failures'], [
+            {'asin': 'B000000BAD', 'error': 'No data found'},
+            {'asin': 'bad-asin', 'error': 'Invalid ASIN'}
+        ])
+        self.assertEqual(body['summary']['succeeded'], 2)
+        self.assertEqual(body['summary']['failed'], 2)
+
+    def test_batch_uses_batch_query(self):
+        """クエリ単位のチャンクでまとめて取得する"""
+        asins = [f'B{i:09d}' for i in range(250)]
+        body = json.loads(lambda_handler({'action': 'batch', 'asins': asins, 'mode': 'info'}, None)['body'])
+
+        self.assertTrue(body['success'])
+        self.assertEqual(len(body['results']), 250)
+        self.assertEqual(self.mock_client.get_products_batch.call_count, 3)
+        self.mock_client.get_product_info.assert_not_called()
+
+    def test_batch_chunk_error_reported_per_item(self):
+        """チャンクの取得に失敗した商品は失敗として返る"""
+        self.mock_client.get_products_batch.side_effect = Exception("Keepa error")
+        body = json.loads(lambda_handler({'action': 'batch', 'asins': ['B0B5SDFLTB'], 'mode': 'info'}, None)['body'])
+
+        self.assertEqual(body['results'], {})
+        self.assertEqual(body['failures'], [{'asin': 'B0B5SDFLTB', 'error': 'Keepa error'}])
+
+    def test_batch_reports_keepa_query_failure(self):
+        """同期クライアントが記録したKeepaクエリの失敗内容が、商品ごとの失敗原因として返る"""
+        def analyze(asins, domain, errors=None, cancel=None):
+            errors.update(dict.fromkeys(asins[1:], 'Keepa query failed: REQUEST_REJECTED'))
+            return {asins[0]: {'trend': 'normal'}}
+
+        self.mock_client.analyze_price_trends.side_effect = analyze
+        body = json.loads(lambda_handler({'action': 'batch', 'asins': ['B0B5SDFLTB', 'B08CDYX378']}, None)['body'])
+
+        self.assertEqual(list(body['results']), ['B0B5SDFLTB'])
+        self.assertEqual(body['failures'], [{'asin': 'B08CDYX378', 'error': 'Keepa query failed: REQUEST_REJECTED'}])
+
+    def test_batch_validation(self):
+        """ASINリスト・モードの検証"""
+        self.assertEqual(lambda_handler({'action': 'batch'}, None)['statusCode'], 400)
+        self.assertEqual(lambda_handler({'action': 'batch', 'asins': 'B0B5SDFLTB'}, None)['statusCode'], 400)
+        self.assertEqual(lambda_handler({'action': 'batch', 'asins': ['B0B5SDFLTB'], 'mode': 'x'},
+                                        None)['statusCode'], 400)
+        with patch.object(lambda_function, 'MAX_BATCH_SIZE', 2):
+            event = {'action': 'batch', 'asins': ['B0B5SDFLTB'] * 3}
+            self.assertEqual(lambda_handler(event, None)['statusCode'], 400)
+
+    def test_sqs_records_report_failed_messages(self):
+        """SQSイベントは失敗したメッセージIDのみ返す"""
+        event = {'Records': [
+            {'messageId': 'm1', 'body': 'B0B5SDFLTB'},
+            {'messageId': 'm2', 'body': json.dumps({'asin': 'B000000BAD'})},
+            {'messageId': 'm3', 'body': json.dumps({'asin': 'B08CDYX378', 'domain': 'US'})},
+            {'messageId': 'm4', 'body': '{broken'},
+            {'messageId': 'm5', 'body': json.dumps({'asin': 'B08CDYX378', 'mode': 'unknown'})}
+        ]}
+        for record in event['Records']:
+            record['eventSource'] = 'aws:sqs'
+        result = lambda_handler(event, None)
+
+        self.assertEqual(result, {'batchItemFailures': [
+            {'itemIdentifier': 'm2'}, {'itemIdentifier': 'm4'}, {'itemIdentifier': 'm5'}
+        ]})
+        domains = sorted(call.args[1] for call in self.mock_client.analyze_price_trends.call_args_list)
+        self.assertEqual(domains, ['JP', 'US'])
+
+    def test_sqs_records_all_failed_without_client(self):
+        """クライアント生成に失敗した場合は全メッセージを再配信させる"""
+        lambda_function._client = None
+        with patch('sales_tools_api_client.SalesToolsAPIClient', side_effect=ValueError("no key")):
+            result = lambda_handler({'Records': [{'messageId': 'm1', 'body': 'B0B5SDFLTB',
+                                                  'eventSource': 'aws:sqs'}]}, None)
+
+        self.assertEqual(result, {'batchItemFailures': [{'itemIdentifier': 'm1'}]})
+
+    def test_records_in_api_gateway_body_not_treated_as_sqs(self):
+        """API Gateway の body に Records があってもSQSとして扱わない"""
+        for body in ({'Records': 1},
+                     {'Records': [{'messageId': 'm1', 'body': 'B0B5SDFLTB', 'eventSource': 'aws:sqs'}]}):
+            with self.subTest(body=body):
+                result = lambda_handler({'body': json.dumps(body)}, None)
+
+                self.assertEqual(result['statusCode'], 200)
+                self.assertEqual(json.loads(result['body'])['timing']['action'], 'status')
+        self.mock_client.analyze_price_trends.assert_not_called()
+
+    def test_sqs_action_not_callable_directly(self):
+        """action に sqs を指定しても呼び出せない"""
+        event = {'action': 'sqs', 'Records': [{'messageId': 'm1', 'body': 'B0B5SDFLTB'}]}
+        for candidate in (event, {'body': json.dumps(event)}, {**event, 'Records': [{'eventSource': 'aws:s3'}]}):
+            with self.subTest(event=candidate):
+                result = lambda_handler(candidate, None)
+
+                self.assertEqual(result['statusCode'], 400)
+                self.assertEqual(json.loads(result['body'])['error'], 'Invalid action')
+        self.mock_client.analyze_price_trends.assert_not_called()
+
+class TestLambdaBatchColdClient(unittest.TestCase):
+    """コールドスタート直後（Keepaステータス未取得）のクライアントでの batch・SQS のテスト"""
+
+    def setUp(self):
+        import keepa
+        import sales_tools_api_client
+        from product_cache import ProductCache
+
+        lambda_function._client = None
+        self.addCleanup(setattr, lambda_function, '_client', None)
+        self.sleep = Mock()
+        self.scheduler = sales_tools_api_client.TokenBudgetScheduler(sleep=self.sleep)
+        for patcher in (
+            patch.dict(os.environ, {'SALES_TOOLS_API_KEY': 'test_api_key_000000'}),
+            patch.object(sales_tools_api_client, 'token_budget', self.scheduler),
+            patch.object(sales_tools_api_client, 'get_default_cache', return_value=ProductCache()),
+            # keepa.Keepa は実体を使い、通信する query のみ差し替える
+            patch.object(keepa.Keepa, 'query', autospec=True, side_effect=self.query)
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def query(api, items, **kwargs):
+        api.tokens_left = 1200 - len(items)
+        api.status.update({'tokensLeft': api.tokens_left, 'refillRate': 20, 'timestamp': 1754000000000})
+        return [{'asin': asin, 'title': asin, 'csv': [[]], 'stats': {}} for asin in items]
+
+    def test_batch_succeeds_without_token_wait(self):
+        """生成直後の仮の残量0でトークン待ちにならず、全件成功する"""
+        asins = [f'B{i:09d}' for i in range(50)]
+
+        body = json.loads(lambda_handler({'action': 'batch', 'asins': asins, 'mode': 'info'}, None)['body'])
+
+        self.assertTrue(body['success'], body['failures'][:3])
+        self.assertEqual(len(body['results']), 50)
+        self.sleep.assert_not_called()
+
+    def test_sqs_succeeds_without_token_wait(self):
+        """SQSでも全メッセージが成功し、再配信されない"""
+        records = [{'messageId': f'm{i}', 'body': json.dumps({'asin': f'B{i:09d}', 'mode': 'info'}),
+                    'eventSource': 'aws:sqs'} for i in range(20)]
+
+        result = lambda_handler({'Records': records}, None)
+
+        self.assertEqual(result, {'batchItemFailures': []})
+        self.sleep.assert_not_called()
+
+class TestLambdaDispatch(unittest.TestCase):
+    """アクション登録・入力検証・レスポンス上限のテスト"""
+
+    def setUp(self):
+        lambda_function._client = None
+        lambda_function._action_stats.clear()
+        self.addCleanup(setattr, lambda_function, '_client', None)
+
+    def test_actions_registered(self):
+        """全アクションが登録されている"""
+        self.assertEqual(sorted(lambda_function.ACTIONS),
+                         ['analyze', 'batch', 'deals', 'info', 'sqs', 'status'])
+
+    def test_event_not_echoed(self):
+        """イベントの内容はレスポンス・ログに出力しない"""
+        event = {'action': 'status', 'secret': 'do-not-echo'}
+        with self.assertLogs('lambda_function', level='INFO') as logs:
+            result = lambda_handler(event, None)
+
+        self.assertNotIn('do-not-echo', result['body'])
+        self.assertNotIn('event', json.loads(result['body']))
+        self.assertFalse(any('do-not-echo' in line for line in logs.output))
+
+    def test_invalid_action(self):
+        """未登録のアクションは400"""
+        body = json.loads(lambda_handler({'action': 'x' * 1000}, None)['body'])
+        self.assertEqual(body['error'], 'Invalid action')
+        self.assertEqual(len(body['received_action']), 64)
+        self.assertNotIn('sqs', body['supported_actions'])
+
+    def test_required_params_validated(self):
+        """必須パラメータの有無・型・ASIN形式を検証"""
+        for event in ({'action': 'info'},
+                      {'action': 'info', 'asin': 123},
+                      {'action': 'analyze', 'asin': 'not-an-asin'},
+                      {'action': 'analyze', 'asin': 'B0B5SDFLTB', 'domain': 5},
+                      {'action': 'batch', 'asins': {}}):
+            with self.subTest(event=event):
+                self.assertEqual(lambda_handler(event, None)['statusCode'], 400)
+        self.assertIsNone(lambda_function._client)
+
+    def test_non_dict_event(self):
+        """オブジェクト以外のイベントは400"""
+        self.assertEqual(lambda_handler(['status'], None)['statusCode'], 400)
+
+    @patch('sales_tools_api_client.SalesToolsAPIClient')
+    def test_api_gateway_body(self, mock_client_class):
+        """API Gateway形式はbodyのJSONをパラメータとして扱う"""
+        mock_client_class.return_value.analyze_price_trend.return_value = {'asin': 'B0B5SDFLTB'}
+        event = {'body': json.dumps({'asin': 'B0B5SDFLTB', 'action': 'analyze'})}
+
+        result = lambda_handler(event, None)
+
+        self.assertEqual(result['statusCode'], 200)
+        self.assertEqual(json.loads(result['body'])['data'], {'asin': 'B0B5SDFLTB'})
+        self.assertEqual(lambda_handler({'body': '{broken'}, None)['statusCode'], 400)
+
+    @patch('sales_tools_api_client.SalesToolsAPIClient')
+    def test_response_size_limit(self, mock_client_class):
+        """上限を超えるレスポンスは413に差し替える"""
+        mock_client_class.return_value.get_product_info.return_value = {'title': 'x' * 2000}
+        with patch.object(lambda_function, 'MAX_RESPONSE_BYTES', 1000):
+            result = lambda_handler({'action': 'info', 'asin': 'B0B5SDFLTB'}, None)
+
+        self.assertEqual(result['statusCode'], 413)
+        self.assertLess(len(result['body']), 1000)
+
+    def test_action_errors_and_stats(self):
+        """処理関数の例外は500となり、アクションごとの統計に記録される"""
+        failing = lambda_function.ActionSpec(Mock(side_effect=Exception("boom")), {}, False)
+        with patch.dict(lambda_function.ACTIONS, {'failing': failing}):
+            self.assertEqual(lambda_handler({'action': 'failing'}, None)['statusCode'], 500)
+
+        body = json.loads(lambda_handler({'action': 'status'}, None)['body'])
+        self.assertEqual(body['actions']['failing']['calls'], 1)
+        self.assertEqual(body['actions']['failing']['errors'], 1)
+        self.assertEqual(body['timing']['action'], 'status')
+
+    def test_raw_action_failure_raises(self):
+        """SQSイベントの処理に失敗した場合は呼び出しを失敗させる"""
+        failing = lambda_function.ActionSpec(Mock(side_effect=Exception("boom")), {}, True)
+        with patch.dict(lambda_function.ACTIONS, {'sqs': failing}):
+            with self.assertRaises(RuntimeError):
+                lambda_handler({'Records': [{'messageId': 'm1', 'body': 'B0B5SDFLTB', 'eventSource': 'aws:sqs'}]}, None)
+
 if __name__ == '__main__':
     unittest.main()
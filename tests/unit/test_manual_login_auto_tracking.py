@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from unittest.mock import Mock
+
+from selenium.common.exceptions import NoSuchElementException
+
+# srcディレクトリをパスに追加
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src'))
+
+from manual_login_auto_tracking import BatchTrackingRunner, ManualLoginAutoTracker, TrackingProgress, load_asins
+
+class FakeTracker:
+    """ブラウザを使わないトラッカー"""
+
+    def __init__(self, failures=None, setup_ok=True, unconfirmed=()):
+        # ASIN → 失敗させる回数
+        self.failures = failures if failures is not None else {}
+        # 送信後に成功表示を確認できないASIN
+        self.unconfirmed = set(unconfirmed)
+        self.setup_ok = setup_ok
+        self.session = None
+        self.tracked = []
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def setup_browser(self):
+        return self.setup_ok
+
+    def export_session(self):
+        return {'cookies': [{'name': 'token', 'value': 'abc'}], 'local_storage': {}}
+
+    def import_session(self, session):
+        self.session = session
+        return True
+
+    def navigate_to_product_and_track(self, asin, interactive=True):
+        assert not interactive
+        with self._lock:
+            self.tracked.append(asin)
+            if self.failures.get(asin, 0) > 0:
+                self.failures[asin] -= 1
+                return {'asin': asin, 'status': 'error', 'error': 'Trackタブが見つかりません'}
+        if asin in self.unconfirmed:
+            return {'asin': asin, 'status': 'completed', 'tracking_success': False, 'wait_seconds': {}}
+        return {'asin': asin, 'status': 'success', 'tracking_success': True,
+                'wait_seconds': {'page_load': 0.5}}
+
+    def close_browser(self, confirm=True):
+        self.closed = True
+
+class TestBatchTrackingRunner(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.progress_path = os.path.join(self.tmpdir.name, 'progress.json')
+        self.workers = []
+
+    def factory(self, **kwargs):
+        def create():
+            tracker = FakeTracker(**kwargs)
+            self.workers.append(tracker)
+            return tracker
+        return create
+
+    def test_parallel_workers_share_session(self):
+        """全ASINが複数ワーカーで設定され、セッションが共有される"""
+        session_tracker = FakeTracker()
+        runner = BatchTrackingRunner(session_tracker, workers=3, retries=0,
+                                     progress=TrackingProgress(self.progress_path),
+                                     tracker_factory=self.factory())
+        asins = [f'B{i:09d}' for i in range(20)]
+
+        summary = runner.run(asins)
+
+        self.assertEqual(summary['completed'], 20)
+        self.assertEqual(summary['failed'], 0)
+        self.assertEqual(summary['unprocessed'], 0)
+        self.assertGreater(summary['asins_per_minute'], 0)
+        self.assertEqual(summary['wait_seconds'], {'page_load': 10.0})
+        self.assertEqual(len(self.workers), 2)
+        for worker in self.workers:
+            self.assertEqual(worker.session['cookies'][0]['name'], 'token')
+            self.assertTrue(worker.closed)
+        self.assertFalse(session_tracker.closed)
+        tracked = session_tracker.tracked + [a for w in self.workers for a in w.tracked]
+        self.assertEqual(sorted(tracked), asins)
+
+    def test_retries_failed_asin(self):
+        """失敗したASINは上限まで再試行される"""
+        session_tracker = FakeTracker(failures={'B000000001': 1, 'B000000002': 5})
+        runner = BatchTrackingRunner(session_tracker, workers=1, retries=2,
+                                     progress=TrackingProgress(self.progress_path))
+
+        summary = runner.run(['B000000001', 'B000000002', 'B000000003'])
+
+        self.assertEqual(summary['completed'], 2)
+        self.assertEqual(summary['failed'], 1)
+        self.assertEqual(summary['retried'], 3)
+        self.assertEqual(session_tracker.tracked.count('B000000002'), 3)
+        results = runner.progress.results
+        self.assertEqual(results['B000000001']['attempts'], 2)
+        self.assertEqual(results['B000000002']['status'], 'error')
+
+    def test_unconfirmed_result_not_done(self):
+        """成功表示を確認できなかった結果は設定済みとせず再試行される"""
+        session_tracker = FakeTracker(unconfirmed={'B000000002'})
+        runner = BatchTrackingRunner(session_tracker, workers=1, retries=1,
+                                     progress=TrackingProgress(self.progress_path))
+
+        summary = runner.run(['B000000001', 'B000000002'])
+
+        self.assertEqual(summary['completed'], 1)
+        self.assertEqual(summary['failed'], 1)
+        self.assertEqual(session_tracker.tracked.count('B000000002'), 2)
+        self.assertFalse(runner.progress.is_done('B000000002'))
+
+    def test_resume_from_progress_file(self):
+        """設定済みのASINは再実行時にスキップされる"""
+        first = FakeTracker(failures={'B000000002': 1})
+        BatchTrackingRunner(first, workers=1, retries=0,
+                            progress=TrackingProgress(self.progress_path)).run(['B000000001', 'B000000002'])
+
+        with open(self.progress_path, encoding='utf-8') as f:
+            saved = json.load(f)['results']
+        self.assertEqual(saved['B000000001']['status'], 'success')
+        self.assertEqual(saved['B000000002']['status'], 'error')
+
+        second = FakeTracker()
+        summary = BatchTrackingRunner(second, workers=1, retries=0,
+                                      progress=TrackingProgress(self.progress_path)).run(
+            ['B000000001', 'B000000002', 'B000000003'])
+
+        self.assertEqual(second.tracked, ['B000000002', 'B000000003'])
+        self.assertEqual(summary['skipped'], 1)
+        self.assertEqual(summary['completed'], 2)
+
+    def test_worker_setup_failure(self):
+        """ブラウザ準備に失敗したワーカーがあっても残りで完了する"""
+        session_tracker = FakeTracker()
+        runner = BatchTrackingRunner(session_tracker, workers=3, retries=0,
+                                     progress=TrackingProgress(self.progress_path),
+                                     tracker_factory=self.factory(setup_ok=False))
+
+        summary = runner.run([f'B{i:09d}' for i in range(5)])
+
+        self.assertEqual(summary['completed'], 5)
+        self.assertEqual(len(session_tracker.tracked), 5)
+
+    def test_load_asins(self):
+        """カンマ区切り・ファイルからASINを読み込む"""
+        path = os.path.join(self.tmpdir.name, 'asins.txt')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("B000000002\n# コメント\n\nB000000003  # 飲料\n")
+
+        self.assertEqual(load_asins('B000000001, ', path), ['B000000001', 'B000000002', 'B000000003'])
+
+class TestNonInteractiveTracking(unittest.TestCase):
+    """手動操作を待たない設定（一括設定のワーカー）のテスト"""
+
+    def make_tracker(self, missing):
+        """missing に含まれるセレクタの要素がない画面を模したトラッカー"""
+        tracker = ManualLoginAutoTracker()
+        tracker.driver = Mock(title='商品ページ')
+        tracker.actions = Mock()
+        tracker.waits = Mock()
+        tracker.waits.element.return_value = ('#tabTrack', Mock())
+        tracker.waits.item_report.return_value = {}
+        tracker.human_type = Mock()
+
+        def find_element(by, selector):
+            if any(part in selector for part in missing):
+                raise NoSuchElementException(selector)
+            return Mock()
+
+        tracker.driver.find_element.side_effect = find_element
+        return tracker
+
+    def test_missing_checkbox_is_error(self):
+        """チェックボックスがない場合は送信せずエラーとする"""
+        tracker = self.make_tracker(missing=('csv', 'checkbox', 'amazon'))
+
+        result = tracker.navigate_to_product_and_track('B08CDYX378', interactive=False)
+
+        self.assertEqual(result['status'], 'error')
+        self.assertIn('チェックボックス', result['error'])
+        tracker.human_type.assert_not_called()
+
+    def test_missing_threshold_is_error(self):
+        """閾値入力フィールドがない場合は送信せずエラーとする"""
+        tracker = self.make_tracker(missing=('threshold', 'number'))
+
+        result = tracker.navigate_to_product_and_track('B08CDYX378', interactive=False)
+
+        self.assertEqual(result['status'], 'error')
+        self.assertIn('閾値', result['error'])
+        searched = [call.args[1] for call in tracker.driver.find_element.call_args_list]
+        self.assertNotIn('#submitTracking', searched)
+
+if __name__ == '__main__':
+    unittest.main()
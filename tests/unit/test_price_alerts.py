@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+import unittest
+import json
+import os
+import sys
+import tempfile
+from unittest.mock import Mock, patch
+
+# srcディレクトリをパスに追加
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src'))
+
+from price_alerts import (
+    ThresholdAlertEngine, FileAlertSink, WebhookAlertSink, LogAlertSink, create_sinks_from_env
+)
+
+class TestThresholdAlertEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.sink = Mock()
+        self.engine = ThresholdAlertEngine([self.sink])
+        self.engine.watch("B08CDYX378", 95, reference_price=1000)
+
+    def test_fires_below_threshold(self):
+        """基準価格の95%以下で発火するテスト"""
+        self.assertIsNone(self.engine.on_price("B08CDYX378", 100, 960))
+
+        alert = self.engine.on_price("B08CDYX378", 101, 950)
+
+        self.assertEqual(alert["price"], 950)
+        self.assertEqual(alert["trigger_price"], 950)
+        self.sink.send.assert_called_once_with(alert)
+
+    def test_deduplicates_until_recovery(self):
+        """価格が戻るまで再発火しないテスト"""
+        alerts = self.engine.on_prices("B08CDYX378", [100, 101, 102, 103], [900, 890, 1000, 900])
+
+        self.assertEqual([a["price"] for a in alerts], [900, 900])
+        self.assertEqual(self.engine.get_stats()["suppressed"], 1)
+
+    def test_replayed_points_ignored(self):
+        """処理済み時刻以前のデータを判定しないテスト"""
+        self.engine.on_prices("B08CDYX378", [100, 101], [900, 1000])
+
+        alerts = self.engine.on_prices("B08CDYX378", [100, 101, 102], [900, 1000, 1000])
+
+        self.assertEqual(alerts, [])
+        self.assertEqual(self.sink.send.call_count, 1)
+
+    def test_unwatched_and_no_offer_ignored(self):
+        """監視外の商品・出品なしは判定しないテスト"""
+        self.assertEqual(self.engine.on_prices("UNKNOWN", [100], [1]), [])
+        self.assertEqual(self.engine.on_prices("B08CDYX378", [100], [-1]), [])
+        self.sink.send.assert_not_called()
+
+    def test_reference_from_first_price(self):
+        """基準価格未指定の場合は最初の価格を基準とするテスト"""
+        self.engine.watch("B0B5SDFLTB", 90)
+
+        alerts = self.engine.on_prices("B0B5SDFLTB", [100, 101, 102], [2000, 1850, 1800])
+
+        self.assertEqual([a["price"] for a in alerts], [1800])
+        self.assertEqual(alerts[0]["reference_price"], 2000)
+
+    def test_sink_failure_isolated(self):
+        """通知先の失敗が他の通知先に影響しないテスト"""
+        failing = Mock()
+        failing.send.side_effect = IOError("disk full")
+        engine = ThresholdAlertEngine([failing, self.sink])
+        engine.watch("B08CDYX378", 95, reference_price=1000)
+
+        engine.on_price("B08CDYX378", 100, 900)
+
+        self.sink.send.assert_called_once()
+        self.assertEqual(engine.get_stats()["sink_errors"], 1)
+
+class TestAlertSinks(unittest.TestCase):
+
+    def test_file_sink_appends_json_lines(self):
+        """ファイル出力のテスト"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'alerts.jsonl')
+            sink = FileAlertSink(path)
+
+            sink.send({"asin": "A1", "price": 1})
+            sink.send({"asin": "A2", "price": 2})
+
+            with open(path, encoding='utf-8') as f:
+                self.assertEqual([json.loads(line)["asin"] for line in f], ["A1", "A2"])
+
+    def test_webhook_stub_queues_payload(self):
+        """Webhookスタブが送信内容を保持するテスト"""
+        sink = WebhookAlertSink("https://example.com/hook")
+
+        sink.send({"asin": "A1"})
+
+        self.assertEqual(sink.outbox[0], {"url": "https://example.com/hook", "payload": {"asin": "A1"}})
+
+    @patch.dict(os.environ, {'PRICE_ALERT_SINKS': 'log,webhook,unknown', 'PRICE_ALERT_WEBHOOK_URL': 'https://example.com'})
+    def test_sinks_from_env(self):
+        """環境変数から通知先を生成するテスト"""
+        sinks = create_sinks_from_env()
+
+        self.assertEqual([type(s) for s in sinks], [LogAlertSink, WebhookAlertSink])
+
+if __name__ == '__main__':
+    unittest.main()
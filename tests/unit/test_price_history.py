@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+import unittest
+import os
+import sys
+
+import numpy as np
+
+# srcディレクトリをパスに追加
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src'))
+
+from price_history import PriceHistory, KEEPA_EPOCH_OFFSET_MINUTES
+
+# 2025-08-01 00:00 (UTC) のKeepa分
+BASE = int(np.datetime64('2025-08-01T00:00', 'm').astype(np.int64)) - KEEPA_EPOCH_OFFSET_MINUTES
+DAY = 24 * 60
+NOW = np.datetime64('2025-08-05T00:00', 'm')
+
+class TestPriceHistory(unittest.TestCase):
+
+    def setUp(self):
+        # 8/1 1000円 → 8/2 -1（出品なし） → 8/3 800円 → 8/4 1200円
+        self.history = PriceHistory.from_csv([
+            BASE, 1000,
+            BASE + DAY, -1,
+            BASE + 2 * DAY, 800,
+            BASE + 3 * DAY, 1200
+        ])
+
+    def test_from_csv_decodes_interleaved(self):
+        """交互配列が時刻・価格の配列に変換されるテスト"""
+        self.assertEqual(len(self.history), 4)
+        self.assertEqual(self.history.times[0], np.datetime64('2025-08-01T00:00'))
+        self.assertEqual(self.history.prices.dtype, np.int32)
+        self.assertEqual(self.history.valid.tolist(), [True, False, True, True])
+
+    def test_empty_series(self):
+        """空の系列のテスト"""
+        history = PriceHistory.from_csv([])
+
+        self.assertEqual(len(history), 0)
+        self.assertIsNone(history.current_price)
+        self.assertIsNone(history.stats()['min'])
+
+    def test_masked_prices(self):
+        """出品なしがマスクされるテスト"""
+        self.assertEqual(self.history.masked_prices.min(), 800)
+
+    def test_stats_time_weighted(self):
+        """統計値（出品なし期間は平均から除外）のテスト"""
+        stats = self.history.stats(now=NOW)
+
+        self.assertEqual(stats['min'], 800)
+        self.assertEqual(stats['max'], 1200)
+        self.assertEqual(stats['current'], 1200)
+        self.assertAlmostEqual(stats['avg'], 1000.0)
+
+    def test_window_carries_in_price(self):
+        """期間開始時点の価格が補われるテスト"""
+        window = self.history.window(1.5, now=NOW)
+
+        self.assertEqual(window.prices.tolist(), [800, 1200])
+        self.assertEqual(window.times[0], np.datetime64('2025-08-03T12:00'))
+
+    def test_resample_daily(self):
+        """日次リサンプリングのテスト"""
+        daily = self.history.resample('D', now=NOW)
+
+        self.assertEqual(daily.prices.tolist(), [1000, -1, 800, 1200, 1200])
+        self.assertEqual(daily.valid.tolist(), [True, False, True, True, True])
+
+    def test_resample_hourly(self):
+        """時間単位リサンプリングのテスト"""
+        hourly = self.history.resample('h', now=NOW)
+
+        self.assertEqual(len(hourly), 4 * 24 + 1)
+
+    def test_resample_invalid_freq(self):
+        """未対応の間隔はエラーとなるテスト"""
+        with self.assertRaises(ValueError):
+            self.history.resample('W')
+
+    def test_percentiles(self):
+        """パーセンタイルのテスト"""
+        p0, p50, p100 = self.history.percentiles((0, 50, 100), freq='D', now=NOW)
+
+        self.assertEqual((p0, p50, p100), (800.0, 1100.0, 1200.0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+import unittest
+import multiprocessing
+import os
+import struct
+import sys
+import tempfile
+import threading
+
+import numpy as np
+
+# srcディレクトリをパスに追加
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src'))
+
+from price_history import PriceHistory
+from price_history_store import PriceHistoryStore
+
+# 基準時刻（UNIX秒）とUNIX分
+NOW = 1754000000
+NOW_MIN = NOW // 60
+DAY = 24 * 60
+
+def append_overlapping(path):
+    """別プロセスから、前回と1件ずつ重なるデータを繰り返し追記"""
+    store = PriceHistoryStore(path)
+    for i in range(300):
+        store.append('B08CDYX378', [NOW_MIN + i, NOW_MIN + i + 1], [100 + i, 101 + i])
+
+class TestPriceHistoryStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'history.bin')
+        self.store = PriceHistoryStore(self.path)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_append_and_read(self):
+        """追記したデータを読み出せるテスト"""
+        self.store.append('B08CDYX378', [NOW_MIN - 2, NOW_MIN - 1], [150, 160])
+
+        times, prices = self.store.read('B08CDYX378')
+
+        self.assertEqual(list(times), [NOW_MIN - 2, NOW_MIN - 1])
+        self.assertEqual(list(prices), [150, 160])
+
+    def test_append_skips_old_points(self):
+        """保存済みの最新時刻以前のデータは追記されないテスト"""
+        self.store.append('B08CDYX378', [NOW_MIN - 2, NOW_MIN - 1], [150, 160])
+
+        appended = self.store.append('B08CDYX378', [NOW_MIN - 1, NOW_MIN], [999, 170])
+
+        self.assertEqual(appended, 1)
+        self.assertEqual(list(self.store.read('B08CDYX378')[1]), [150, 160, 170])
+        self.assertEqual(self.store.last_timestamp('B08CDYX378'), NOW_MIN)
+
+    def test_read_window_across_segments(self):
+        """複数セグメントにまたがる期間指定の読み出しテスト"""
+        self.store.append('B08CDYX378', [NOW_MIN - 100 * DAY, NOW_MIN - 40 * DAY], [100, 110])
+        self.store.append('B0B5SDFLTB', [NOW_MIN - 10 * DAY], [1980])
+        self.store.append('B08CDYX378', [NOW_MIN - 20 * DAY, NOW_MIN - DAY], [120, 130])
+
+        times, prices = self.store.read('B08CDYX378', days=30, now=NOW)
+
+        self.assertEqual(list(prices), [120, 130])
+
+    def test_window_stats_carries_in_price(self):
+        """期間開始時点の価格を含めた統計のテスト"""
+        self.store.append('B08CDYX378', [NOW_MIN - 40 * DAY, NOW_MIN - 10 * DAY, NOW_MIN - DAY], [100, -1, 140])
+
+        stats = self.store.window_stats('B08CDYX378', 30, now=NOW)
+
+        self.assertEqual(stats['first'], 100)
+        self.assertEqual(stats['min'], 100)
+        self.assertEqual(stats['max'], 140)
+        self.assertEqual(stats['current'], 140)
+        self.assertEqual(stats['data_points'], 2)
+
+    def test_window_stats_avg_is_time_weighted(self):
+        """平均が PriceHistory.stats と同じ時間加重平均になるテスト"""
+        times = [NOW_MIN - 40 * DAY, NOW_MIN - 20 * DAY, NOW_MIN - 15 * DAY, NOW_MIN - 14 * DAY, NOW_MIN - DAY]
+        prices = [100, 200, -1, 1000, 150]
+        self.store.append('B08CDYX378', times, prices)
+
+        stats = self.store.window_stats('B08CDYX378', 30, now=NOW)
+        expected = PriceHistory(np.array(times), np.array(prices)).stats(
+            30, now=np.datetime64(NOW, 's'))
+
+        # 30日前から: 100が10日, 200が5日, 1000が13日, 150が1日
+        self.assertAlmostEqual(stats['avg'], (100 * 10 + 200 * 5 + 1000 * 13 + 150 * 1) / 29)
+        self.assertAlmostEqual(stats['avg'], expected['avg'])
+        self.assertEqual((stats['min'], stats['max']), (expected['min'], expected['max']))
+
+    def test_window_stats_unknown_asin(self):
+        """未保存のASINはNoneとなるテスト"""
+        self.assertIsNone(self.store.window_stats('UNKNOWN', 30, now=NOW))
+
+    def test_reopen_rebuilds_index(self):
+        """再オープン時にインデックスが再構築されるテスト"""
+        self.store.append('B08CDYX378', [NOW_MIN], [150])
+
+        reopened = PriceHistoryStore(self.path)
+
+        self.assertEqual(reopened.asins(), ['B08CDYX378'])
+        self.assertEqual(reopened.last_timestamp('B08CDYX378'), NOW_MIN)
+
+    def test_truncated_tail_is_discarded(self):
+        """書き込み途中のセグメントが破棄されるテスト"""
+        self.store.append('B08CDYX378', [NOW_MIN], [150])
+        with open(self.path, 'ab') as f:
+            f.write(b'B0B5SDFLTB\0\0\x05\0\0\0\x01')
+
+        reopened = PriceHistoryStore(self.path)
+
+        self.assertEqual(reopened.asins(), ['B08CDYX378'])
+        self.assertEqual(reopened.append('B0B5SDFLTB', [NOW_MIN], [1980]), 1)
+        self.assertEqual(list(PriceHistoryStore(self.path).read('B0B5SDFLTB')[1]), [1980])
+
+    def test_refresh_sees_other_writer(self):
+        """別インスタンスの追記がrefreshで反映されるテスト"""
+        reader = PriceHistoryStore(self.path)
+        self.store.append('B08CDYX378', [NOW_MIN], [150])
+
+        reader.refresh()
+
+        self.assertEqual(list(reader.read('B08CDYX378')[1]), [150])
+
+    def test_append_after_other_writer_keeps_its_segment(self):
+        """走査後に別プロセスが追記した場合も、そのセグメントを取りこぼさないテスト"""
+        other = PriceHistoryStore(self.path)
+        self.store.asins()
+        other.append('B0B5SDFLTB', [NOW_MIN], [990])
+
+        self.store.append('B08CDYX378', [NOW_MIN], [150])
+
+        self.assertEqual(list(self.store.read('B0B5SDFLTB')[1]), [990])
+        self.assertEqual(list(self.store.read('B08CDYX378')[1]), [150])
+
+    def test_concurrent_appends_do_not_duplicate(self):
+        """複数プロセスからの同時追記でも、同じ時刻のデータが重複しないテスト"""
+        processes = [multiprocessing.Process(target=append_overlapping, args=(self.path,)) for _ in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        times = list(PriceHistoryStore(self.path).read('B08CDYX378')[0])
+        self.assertEqual(times, list(range(NOW_MIN, NOW_MIN + 301)))
+
+    def test_open_does_not_truncate_segment_being_written(self):
+        """他プロセスが書き込み中の末尾セグメントを、開く側が切り詰めないテスト"""
+        self.store.append('B08CDYX378', [NOW_MIN], [150])
+        segment = struct.pack('<10s2xI', b'B0B5SDFLTB', 1) + struct.pack('<ii', NOW_MIN, 1980)
+        opened = []
+
+        with self.store._file_lock():
+            with open(self.path, 'ab') as f:
+                f.write(segment[:14])
+            opener = threading.Thread(target=lambda: opened.append(PriceHistoryStore(self.path)))
+            opener.start()
+            opener.join(0.2)
+            self.assertTrue(opener.is_alive())
+            with open(self.path, 'ab') as f:
+                f.write(segment[14:])
+        opener.join()
+
+        self.assertEqual(list(opened[0].read('B0B5SDFLTB')[1]), [1980])
+
+    def test_compact(self):
+        """圧縮後もデータが保持されるテスト"""
+        for i in range(5):
+            self.store.append('B08CDYX378', [NOW_MIN + i], [100 + i])
+
+        self.store.compact()
+
+        self.assertEqual(list(self.store.read('B08CDYX378')[1]), [100, 101, 102, 103, 104])
+        self.assertEqual(os.path.getsize(self.path), 8 + 16 + 5 * 8)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+import unittest
+import os
+import sys
+import tempfile
+
+# srcディレクトリをパスに追加
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src'))
+
+from product_cache import ProductCache
+
+class FakeClock:
+    """テスト用の時計"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class TestProductCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'cache.sqlite3')
+        self.clock = FakeClock()
+        self.cache = ProductCache(ttl_seconds=60, max_entries=2, db_path=self.db_path, clock=self.clock)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_memory_hit(self):
+        """メモリ層ヒットのテスト"""
+        self.cache.set('B0B5SDFLTB', 'JP', True, {'asin': 'B0B5SDFLTB'})
+
+        self.assertEqual(self.cache.get('B0B5SDFLTB', 'JP', True), {'asin': 'B0B5SDFLTB'})
+        self.assertEqual(self.cache.get_stats()['memory_hits'], 1)
+
+    def test_key_includes_domain_and_history(self):
+        """ドメイン・履歴フラグ違いは別キーとなるテスト"""
+        self.cache.set('B0B5SDFLTB', 'JP', True, {'asin': 'B0B5SDFLTB'})
+
+        self.assertIsNone(self.cache.get('B0B5SDFLTB', 'US', True))
+        self.assertIsNone(self.cache.get('B0B5SDFLTB', 'JP', False))
+        self.assertEqual(self.cache.get_stats()['misses'], 2)
+
+    def test_ttl_expiry(self):
+        """TTL経過後は未ヒットとなるテスト"""
+        self.cache.set('B0B5SDFLTB', 'JP', True, {'asin': 'B0B5SDFLTB'})
+        self.clock.now += 61
+
+        self.assertIsNone(self.cache.get('B0B5SDFLTB', 'JP', True))
+        self.assertGreaterEqual(self.cache.get_stats()['expired'], 1)
+
+    def test_lru_eviction_falls_back_to_disk(self):
+        """メモリ層から追い出されてもディスク層でヒットするテスト"""
+        for asin in ['A1', 'A2', 'A3']:
+            self.cache.set(asin, 'JP', True, {'asin': asin})
+
+        self.assertEqual(self.cache.get_stats()['memory_entries'], 2)
+        self.assertEqual(self.cache.get('A1', 'JP', True), {'asin': 'A1'})
+        self.assertEqual(self.cache.get_stats()['disk_hits'], 1)
+
+    def test_disk_tier_persists(self):
+        """別インスタンスからディスク層を参照できるテスト"""
+        self.cache.set('B0B5SDFLTB', 'JP', True, {'title': 'テスト商品'})
+        other = ProductCache(ttl_seconds=60, db_path=self.db_path, clock=self.clock)
+
+        self.assertEqual(other.get('B0B5SDFLTB', 'JP', True), {'title': 'テスト商品'})
+
+    def test_disk_size_bound(self):
+        """ディスク層のサイズ上限テスト"""
+        cache = ProductCache(ttl_seconds=60, max_entries=1, db_path=self.db_path,
+                             disk_max_entries=2, clock=self.clock)
+        for asin in ['A1', 'A2', 'A3']:
+            self.clock.now += 1
+            cache.set(asin, 'JP', True, {'asin': asin})
+
+        self.assertIsNone(cache.get('A1', 'JP', True))
+        self.assertIsNotNone(cache.get('A2', 'JP', True))
+
+    def test_disk_hit_keeps_original_expiry(self):
+        """ディスク層ヒット時もTTLは書き込み時刻から数える"""
+        cache = ProductCache(ttl_seconds=100, max_entries=1, db_path=self.db_path, clock=self.clock)
+        cache.set('A1', 'JP', True, {'asin': 'A1'})
+        cache.set('A2', 'JP', True, {'asin': 'A2'})
+
+        self.clock.now += 90
+        self.assertEqual(cache.get('A1', 'JP', True), {'asin': 'A1'})
+        self.assertEqual(cache.get_stats()['disk_hits'], 1)
+
+        self.clock.now += 20
+        self.assertIsNone(cache.get('A1', 'JP', True))
+
+    def test_disk_count_tracked(self):
+        """ディスク層の件数は上書き・無効化を反映して追跡される"""
+        cache = ProductCache(ttl_seconds=60, max_entries=1, db_path=self.db_path,
+                             disk_max_entries=3, clock=self.clock)
+        for asin in ['A1', 'A2', 'A1', 'A2', 'A3']:
+            self.clock.now += 1
+            cache.set(asin, 'JP', True, {'asin': asin})
+        self.assertEqual(cache._disk_count, 3)
+
+        cache.invalidate('A3')
+        self.assertEqual(cache._disk_count, 2)
+        self.assertIsNotNone(cache.get('A1', 'JP', True))
+
+    def test_invalidate(self):
+        """明示的な無効化のテスト"""
+        self.cache.set('B0B5SDFLTB', 'JP', True, {'asin': 'B0B5SDFLTB'})
+        self.cache.set('B0B5SDFLTB', 'JP', False, {'asin': 'B0B5SDFLTB'})
+        self.cache.invalidate('B0B5SDFLTB', 'JP')
+
+        self.assertIsNone(self.cache.get('B0B5SDFLTB', 'JP', True))
+        self.assertIsNone(self.cache.get('B0B5SDFLTB', 'JP', False))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+import unittest
+import os
+import sys
+from datetime import datetime
+from unittest.mock import Mock
+
+# srcディレクトリをパスに追加
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src'))
+
+from refresh_scheduler import RefreshScheduler
+from tracked_product import TrackedProduct
+
+NOW = datetime(2025, 8, 2, 12, 0, 0).timestamp()
+
+def product(category, status="active", last_check=None):
+    return {"category": category, "status": status, "last_check": last_check}
+
+def record(asin, product):
+    return TrackedProduct.from_dict(asin, product)
+
+class TestRefreshScheduler(unittest.TestCase):
+
+    def setUp(self):
+        products = {
+            "FRESH00001": product("食品・飲料", last_check="2025-08-02 11:30:00"),
+            "STALE00001": product("食品・飲料", last_check="2025-08-02 09:00:00"),
+            "VOLAT00001": product("Electronics", last_check="2025-08-02 10:00:00"),
+            "NEVER00001": product("食品・飲料"),
+            "PENDI00001": product("食品・飲料", status="pending")
+        }
+        self.manager = Mock()
+        self.manager.get_products_by_status.side_effect = lambda status: [
+            asin for asin, p in products.items() if p["status"] == status
+        ]
+        self.manager.get_product_records.side_effect = lambda asins: {
+            asin: record(asin, products[asin]) for asin in asins
+        }
+        self.client = Mock()
+        self.factory = Mock(return_value=self.client)
+        self.scheduler = RefreshScheduler(self.manager, self.factory, min_refresh_seconds=3600,
+                                          max_tokens_per_cycle=10, volatile_categories=["Electronics"])
+
+    def test_select_due_priority_order(self):
+        """未チェック → 変動カテゴリ → 古い順に選択されるテスト"""
+        due = self.scheduler.select_due(NOW)
+
+        # VOLAT: 2時間×2 = 4時間相当、STALE: 3時間
+        self.assertEqual(due, ["NEVER00001", "VOLAT00001", "STALE00001"])
+
+    def test_select_due_token_cap(self):
+        """1サイクルのトークン上限で打ち切られるテスト"""
+        self.scheduler.max_tokens_per_cycle = 2
+
+        self.assertEqual(len(self.scheduler.select_due(NOW)), 2)
+
+    def test_run_cycle_refreshes_due_products(self):
+        """サイクル実行で差分更新が呼ばれるテスト"""
+        self.manager.refresh_all_price_history.return_value = {"requested": 3}
+
+        summary = self.scheduler.run_cycle()
+
+        self.assertEqual(summary, {"requested": 3})
+        self.factory.assert_called_once()
+        args = self.manager.refresh_all_price_history.call_args[0]
+        self.assertIs(args[0], self.client)
+        self.assertIn("NEVER00001", args[1])
+
+    def test_run_cycle_records_errors(self):
+        """更新エラーでもスケジューラが継続するテスト"""
+        self.manager.refresh_all_price_history.side_effect = RuntimeError("API接続エラー")
+
+        self.assertIsNone(self.scheduler.run_cycle())
+        status = self.scheduler.get_status()
+        self.assertEqual(status["errors"], 1)
+        self.assertEqual(status["cycles"], 1)
+
+    def test_jitter_bounds(self):
+        """揺らぎ付きの待機時間が範囲内となるテスト"""
+        self.scheduler.interval_seconds = 300
+        self.scheduler.jitter_seconds = 30
+
+        for _ in range(50):
+            self.assertTrue(270 <= self.scheduler._next_delay() <= 330)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,355 @@
+# -*- coding: utf-8 -*-
+import unittest
+import os
+import sys
+import threading
+import time
+from unittest.mock import Mock, patch
+
+import keepa
+
+# srcディレクトリをパスに追加
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src'))
+
+from product_cache import ProductCache
+from single_flight import SingleFlight
+from sales_tools_api_client import (SalesToolsAPIClient, TokenBudgetScheduler, RequestCancelled,
+                                    KEEPA_MAX_ASINS_PER_QUERY)
+
+def keepa_minutes_ago(days):
+    """現在からdays日前のKeepa分"""
+    return int(time.time() // 60) - 21564000 - int(days * 24 * 60)
+
+def make_product(asin, prices=None):
+    """テスト用のKeepa商品データ（直近30日で 1500 → 2000 → 1000 → 1200）"""
+    if prices is None:
+        prices = [
+            keepa_minutes_ago(30), 150000,
+            keepa_minutes_ago(20), 200000,
+            keepa_minutes_ago(10), 100000,
+            keepa_minutes_ago(5), 120000
+        ]
+    return {
+        'asin': asin,
+        'title': f'テスト商品 {asin}',
+        'csv': [prices],
+        'stats': {'min': 100000, 'max': 200000, 'avg': 150000, 'current': 120000}
+    }
+
+class FakeClock:
+    """テスト用の時計（sleepで時間が進む）"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+class TestTokenBudgetScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.scheduler = TokenBudgetScheduler(refill_rate=60, tokens_left=10,
+                                              clock=self.clock, sleep=self.clock.sleep)
+
+    def test_no_wait_within_budget(self):
+        """予算内であれば待機しないテスト"""
+        self.assertEqual(self.scheduler.acquire(10), 0.0)
+        self.assertEqual(self.clock.sleeps, [])
+
+    def test_waits_only_for_shortfall(self):
+        """不足分の補充時間だけ待機するテスト"""
+        self.scheduler.acquire(10)
+        wait = self.scheduler.acquire(5)
+
+        # 60トークン/分 = 1トークン/秒
+        self.assertAlmostEqual(wait, 5.0)
+        self.assertEqual(self.scheduler.get_metrics()['wait_count'], 1)
+
+    def test_refill_over_time(self):
+        """時間経過でトークンが補充されるテスト"""
+        self.scheduler.acquire(10)
+        self.clock.now += 10
+
+        self.assertEqual(self.scheduler.acquire(10), 0.0)
+
+    def test_sync_from_api(self):
+        """Keepaクライアントの残りトークンと補充レートを反映するテスト"""
+        api = Mock(tokens_left=3, status={'tokensLeft': 3, 'refillRate': 120, 'timestamp': 1754000000000})
+        self.scheduler.sync(api)
+
+        metrics = self.scheduler.get_metrics()
+        self.assertEqual(metrics['tokens_available'], 3)
+        self.assertEqual(metrics['refill_rate_per_minute'], 120)
+
+    def test_sync_ignores_placeholder_before_first_response(self):
+        """最初の応答前の仮の残量（0）では予算を更新しないテスト"""
+        api = Mock(tokens_left=0, status={'tokensLeft': None, 'refillIn': None, 'refillRate': None, 'timestamp': None})
+        self.scheduler.sync(api)
+
+        metrics = self.scheduler.get_metrics()
+        self.assertEqual(metrics['tokens_available'], 10)
+        self.assertEqual(metrics['refill_rate_per_minute'], 60)
+
+    def test_metrics_wait_vs_work(self):
+        """待機時間と処理時間が別々に集計されるテスト"""
+        self.scheduler.acquire(12)
+        self.scheduler.record_work(0.5)
+
+        metrics = self.scheduler.get_metrics()
+        self.assertAlmostEqual(metrics['wait_seconds'], 2.0)
+        self.assertAlmostEqual(metrics['work_seconds'], 0.5)
+
+    def test_cancel_before_acquire(self):
+        """中止済みであればトークンを確保しないテスト"""
+        cancel = threading.Event()
+        cancel.set()
+
+        with self.assertRaises(RequestCancelled):
+            self.scheduler.acquire(5, cancel)
+        self.assertEqual(self.scheduler.get_metrics()['tokens_available'], 10)
+
+    def test_cancel_interrupts_wait_and_refunds(self):
+        """待機中の中止で待機を打ち切り、予約したトークンを戻すテスト"""
+        scheduler = TokenBudgetScheduler(refill_rate=1, tokens_left=0)
+        cancel = threading.Event()
+        threading.Timer(0.05, cancel.set).start()
+
+        started = time.monotonic()
+        with self.assertRaises(RequestCancelled):
+            scheduler.acquire(10, cancel)
+
+        # 補充レート1トークン/分のため、中止しなければ10分待つ
+        self.assertLess(time.monotonic() - started, 5)
+        metrics = scheduler.get_metrics()
+        self.assertLess(metrics['tokens_available'], 1)
+        self.assertEqual(metrics['tokens_consumed'], 0)
+
+class TestSalesToolsAPIClientRealKeepa(unittest.TestCase):
+    """keepa.Keepa の実体を使い、query のみ差し替えたテスト（生成直後のステータスの扱い）"""
+
+    @patch.dict(os.environ, {'SALES_TOOLS_API_KEY': 'test_api_key_000000'})
+    def test_first_query_does_not_wait_for_placeholder_budget(self):
+        """生成直後の仮の残量0で、最初のクエリが待機しないテスト"""
+        sleep = Mock()
+        scheduler = TokenBudgetScheduler(sleep=sleep)
+
+        def query(api, items, **kwargs):
+            # 応答を受け取ると keepa がステータスを更新する
+            api.tokens_left = 1200 - len(items)
+            api.status.update({'tokensLeft': api.tokens_left, 'refillRate': 20, 'timestamp': 1754000000000})
+            return [make_product(asin) for asin in items]
+
+        with patch.object(keepa.Keepa, 'query', autospec=True, side_effect=query):
+            client = SalesToolsAPIClient(scheduler=scheduler, cache=ProductCache(), single_flight=SingleFlight())
+            self.assertIsInstance(client.api, keepa.Keepa)
+            result = client.get_products_batch([f'B{i:09d}' for i in range(KEEPA_MAX_ASINS_PER_QUERY)])
+
+        self.assertEqual(len(result), KEEPA_MAX_ASINS_PER_QUERY)
+        sleep.assert_not_called()
+        self.assertEqual(scheduler.get_metrics()['wait_count'], 0)
+        # 応答後はKeepaの残量に合わせる
+        self.assertAlmostEqual(scheduler.get_metrics()['tokens_available'], 1100, delta=1)
+
+class TestSalesToolsAPIClientBatch(unittest.TestCase):
+
+    @patch.dict(os.environ, {'SALES_TOOLS_API_KEY': 'test_api_key'})
+    @patch('sales_tools_api_client.keepa.Keepa')
+    def setUp(self, mock_keepa):
+        self.mock_api = Mock()
+        self.mock_api.query.side_effect = lambda items, **kwargs: [make_product(a) for a in items]
+        mock_keepa.return_value = self.mock_api
+        self.scheduler = TokenBudgetScheduler(tokens_left=10000, sleep=Mock())
+        self.client = SalesToolsAPIClient(scheduler=self.scheduler, cache=ProductCache(),
+                                          single_flight=SingleFlight())
+
+    def test_get_products_batch_splits_into_chunks(self):
+        """最大件数ごとにチャンク分割されるテスト"""
+        asins = [f'B{i:09d}' for i in range(KEEPA_MAX_ASINS_PER_QUERY * 2 + 5)]
+
+        result = self.client.get_products_batch(asins)
+
+        self.assertEqual(len(result), len(asins))
+        self.assertEqual(self.mock_api.query.call_count, 3)
+        first_chunk = self.mock_api.query.call_args_list[0][0][0]
+        self.assertEqual(len(first_chunk), KEEPA_MAX_ASINS_PER_QUERY)
+
+    def test_get_products_batch_deduplicates(self):
+        """重複ASINは1回だけ問い合わせるテスト"""
+        result = self.client.get_products_batch(['B0B5SDFLTB', 'B0B5SDFLTB', 'B08CDYX378'])
+
+        self.assertEqual(set(result), {'B0B5SDFLTB', 'B08CDYX378'})
+        self.mock_api.query.assert_called_once()
+        self.assertEqual(self.mock_api.query.call_args[0][0], ['B0B5SDFLTB', 'B08CDYX378'])
+
+    def test_get_products_batch_stops_when_cancelled(self):
+        """中止後はトークン待ち・クエリを行わず、残りのASINを中止として記録するテスト"""
+        asins = [f'B{i:09d}' for i in range(KEEPA_MAX_ASINS_PER_QUERY * 2)]
+        cancel = threading.Event()
+        errors = {}
+
+        def query(items, **kwargs):
+            cancel.set()
+            return [make_product(a) for a in items]
+
+        self.mock_api.query.side_effect = query
+        result = self.client.get_products_batch(asins, errors=errors, cancel=cancel)
+
+        self.assertEqual(len(result), KEEPA_MAX_ASINS_PER_QUERY)
+        self.mock_api.query.assert_called_once()
+        self.assertEqual(set(errors), set(asins[KEEPA_MAX_ASINS_PER_QUERY:]))
+        self.assertEqual(errors[asins[-1]], 'Cancelled')
+
+    def test_get_products_batch_skips_failed_chunk(self):
+        """1チャンクの失敗が他のチャンクに影響しないテスト"""
+        asins = [f'B{i:09d}' for i in range(KEEPA_MAX_ASINS_PER_QUERY + 1)]
+        self.mock_api.query.side_effect = [Exception("API接続エラー"), [make_product(asins[-1])]]
+
+        result = self.client.get_products_batch(asins)
+
+        self.assertEqual(list(result), [asins[-1]])
+
+    def test_get_products_batch_records_chunk_errors(self):
+        """errors を指定すると、失敗したチャンクの各ASINにエラー内容が記録されるテスト"""
+        asins = [f'B{i:09d}' for i in range(KEEPA_MAX_ASINS_PER_QUERY + 1)]
+        self.mock_api.query.side_effect = [Exception("API接続エラー"), [make_product(asins[-1])]]
+        errors = {}
+
+        self.client.get_products_batch(asins, errors=errors)
+
+        self.assertEqual(set(errors), set(asins[:-1]))
+        self.assertEqual(errors[asins[0]], "Keepa query failed: API接続エラー")
+
+    def test_get_product_info_uses_shaping(self):
+        """単体取得がバッチと同じ整形結果を返すテスト"""
+        result = self.client.get_product_info('B0B5SDFLTB')
+
+        self.assertEqual(result['asin'], 'B0B5SDFLTB')
+        self.assertEqual(result['current_price'], 1200.0)
+        self.assertEqual(result['currency'], 'JPY')
+        self.assertEqual(result['price_stats']['min'], 1000.0)
+        self.assertEqual(result['price_stats']['max'], 2000.0)
+
+    def test_get_product_info_no_offer(self):
+        """最新価格が出品なし（-1）の場合のテスト"""
+        self.mock_api.query.side_effect = None
+        self.mock_api.query.return_value = [make_product('B0B5SDFLTB', [keepa_minutes_ago(3), 150000, keepa_minutes_ago(1), -1])]
+
+        result = self.client.get_product_info('B0B5SDFLTB')
+
+        self.assertNotIn('current_price', result)
+        self.assertEqual(result['price_stats']['max'], 1500.0)
+
+    def test_get_product_info_not_found(self):
+        """商品が見つからない場合のテスト"""
+        self.mock_api.query.side_effect = None
+        self.mock_api.query.return_value = []
+
+        self.assertIsNone(self.client.get_product_info('INVALID_ASIN'))
+
+    def test_analyze_price_trends_batch(self):
+        """複数商品のトレンド分析が1回のクエリで行われるテスト"""
+        result = self.client.analyze_price_trends(['B0B5SDFLTB', 'B08CDYX378'])
+
+        self.assertEqual(len(result), 2)
+        self.assertEqual(result['B0B5SDFLTB']['trend'], 'low_price')
+        self.mock_api.query.assert_called_once()
+
+    def test_analyze_price_trend_coalesces_concurrent_requests(self):
+        """同じ商品の単体分析・単体取得の同時リクエストが1回のクエリにまとまるテスト"""
+        release = threading.Event()
+
+        def slow_query(items, **kwargs):
+            release.wait(5)
+            return [make_product(a) for a in items]
+
+        self.mock_api.query.side_effect = slow_query
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.client.analyze_price_trend('B0B5SDFLTB')))
+                   for _ in range(3)]
+        threads.append(threading.Thread(target=lambda: results.append(self.client.get_product_info('B0B5SDFLTB'))))
+        for thread in threads:
+            thread.start()
+        deadline = time.monotonic() + 1
+        while self.client.single_flight.calls < len(threads) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.mock_api.query.assert_called_once()
+        self.assertEqual(len(results), 4)
+        self.assertEqual([r['asin'] for r in results], ['B0B5SDFLTB'] * 4)
+        self.assertEqual(sum(1 for r in results if r.get('trend') == 'low_price'), 3)
+
+    def test_search_deals_single_query(self):
+        """お得商品検索がサンプル商品を一括取得するテスト"""
+        self.client.search_deals()
+
+        self.mock_api.query.assert_called_once()
+        self.scheduler._sleep.assert_not_called()
+
+    def test_batch_acquires_tokens_per_chunk(self):
+        """チャンクごとにトークンを確保するテスト"""
+        asins = [f'B{i:09d}' for i in range(KEEPA_MAX_ASINS_PER_QUERY + 1)]
+
+        self.client.get_products_batch(asins)
+
+        metrics = self.scheduler.get_metrics()
+        self.assertEqual(metrics['request_count'], 2)
+        self.assertEqual(metrics['tokens_consumed'], len(asins))
+
+    def test_cache_hit_skips_query(self):
+        """キャッシュ済みの商品は再取得しないテスト"""
+        self.client.get_product_info('B0B5SDFLTB')
+        self.client.get_products_batch(['B0B5SDFLTB', 'B08CDYX378'])
+
+        self.assertEqual(self.mock_api.query.call_count, 2)
+        self.assertEqual(self.mock_api.query.call_args[0][0], ['B08CDYX378'])
+
+    def test_invalidate_cache_forces_refetch(self):
+        """無効化後は再取得するテスト"""
+        self.client.get_product_info('B0B5SDFLTB')
+        self.client.invalidate_cache('B0B5SDFLTB')
+        self.client.get_product_info('B0B5SDFLTB')
+
+        self.assertEqual(self.mock_api.query.call_count, 2)
+
+    def test_price_history_delta_since_high_water_mark(self):
+        """保存済みの最新時刻より新しい価格のみ返すテスト"""
+        since = keepa_minutes_ago(15) + 21564000
+
+        delta = self.client.get_price_history_delta('B0B5SDFLTB', since=since)
+
+        self.assertTrue(delta['changed'])
+        self.assertEqual(delta['prices'], [100000, 120000])
+        self.assertEqual(delta['timestamps'][0], keepa_minutes_ago(10) + 21564000)
+        self.assertEqual(self.mock_api.query.call_args[1]['days'], 16)
+
+    def test_price_history_delta_skips_unchanged(self):
+        """lastUpdateが変わっていない商品は差分を返さないテスト"""
+        self.mock_api.query.side_effect = None
+        product = make_product('B0B5SDFLTB')
+        product['lastUpdate'] = 7000000
+        self.mock_api.query.return_value = [product]
+
+        delta = self.client.get_price_history_delta('B0B5SDFLTB', last_update=7000000)
+
+        self.assertFalse(delta['changed'])
+        self.assertEqual(delta['prices'], [])
+
+    def test_price_history_deltas_full_history_without_mark(self):
+        """最新時刻が未保存の商品を含む場合は全履歴を要求するテスト"""
+        deltas = self.client.get_price_history_deltas(['B0B5SDFLTB', 'B08CDYX378'],
+                                                      since={'B0B5SDFLTB': 0})
+
+        self.assertNotIn('days', self.mock_api.query.call_args[1])
+        self.assertEqual(len(deltas['B08CDYX378']['prices']), 4)
+
+if __name__ == '__main__':
+    unittest.main()
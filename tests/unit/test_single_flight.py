@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+import unittest
+import os
+import sys
+import threading
+
+# srcディレクトリをパスに追加
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src'))
+
+from single_flight import SingleFlight
+
+class TestSingleFlight(unittest.TestCase):
+
+    def setUp(self):
+        self.flight = SingleFlight()
+
+    def run_concurrently(self, key, fn, count=8):
+        """同一キーで同時に呼び出し、全員が合流してから実行を完了させる"""
+        results = []
+        errors = []
+        started = threading.Barrier(count)
+
+        def worker():
+            started.wait()
+            try:
+                results.append(self.flight.do(key, fn))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        return results, errors
+
+    def test_concurrent_calls_share_one_execution(self):
+        """同時呼び出しが1回の実行を共有するテスト"""
+        release = threading.Event()
+        executions = []
+
+        def fetch():
+            executions.append(1)
+            # 他のスレッドが合流するまで待機
+            while self.flight.get_stats()['calls'] < 8:
+                release.wait(0.01)
+            return {'asin': 'B0B5SDFLTB'}
+
+        results, errors = self.run_concurrently(('B0B5SDFLTB', 'JP'), fetch)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(executions), 1)
+        self.assertEqual(results, [{'asin': 'B0B5SDFLTB'}] * 8)
+        stats = self.flight.get_stats()
+        self.assertEqual(stats['coalesced'], 7)
+        self.assertEqual(stats['in_flight'], 0)
+
+    def test_error_propagates_to_waiters(self):
+        """実行時の例外が全ての呼び出し元に送出されるテスト"""
+        def fetch():
+            while self.flight.get_stats()['calls'] < 4:
+                threading.Event().wait(0.01)
+            raise RuntimeError("API接続エラー")
+
+        results, errors = self.run_concurrently('key', fetch, count=4)
+
+        self.assertEqual(results, [])
+        self.assertEqual(len(errors), 4)
+
+    def test_sequential_calls_execute_each_time(self):
+        """完了後の呼び出しは再実行されるテスト"""
+        self.flight.do('key', lambda: 1)
+        self.flight.do('key', lambda: 2)
+
+        self.assertEqual(self.flight.get_stats()['executions'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
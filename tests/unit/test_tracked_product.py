@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import unittest
+import os
+import sys
+
+# srcディレクトリをパスに追加
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src'))
+
+from tracked_product import TrackedProduct
+
+PRODUCT = {
+    "name": "コカ・コーラ カナダドライ",
+    "category": "食品・飲料",
+    "status": "active",
+    "threshold": 95,
+    "added_date": "2025-08-01",
+    "last_check": "2025-08-02 07:10:00",
+    "setup_method": "selenium_manual",
+    "keepa_last_update": 7000000
+}
+
+class TestTrackedProduct(unittest.TestCase):
+
+    def test_round_trip(self):
+        """辞書形式との相互変換テスト"""
+        record = TrackedProduct.from_dict("B08CDYX378", PRODUCT)
+
+        self.assertIsInstance(record.last_check, int)
+        self.assertIsInstance(record.added_date, int)
+        self.assertEqual(record.to_dict(), PRODUCT)
+
+    def test_no_instance_dict(self):
+        """__slots__ により属性辞書を持たないテスト"""
+        record = TrackedProduct.from_dict("B08CDYX378", PRODUCT)
+
+        self.assertFalse(hasattr(record, '__dict__'))
+        with self.assertRaises(AttributeError):
+            record.color = "red"
+
+    def test_repeated_values_interned(self):
+        """ステータス等の文字列が共有されるテスト"""
+        a = TrackedProduct.from_dict("A1", dict(PRODUCT, status="".join(["act", "ive"])))
+        b = TrackedProduct.from_dict("A2", PRODUCT)
+
+        self.assertIs(a.status, b.status)
+        self.assertIs(a.setup_method, b.setup_method)
+        self.assertIs(a.category, b.category)
+
+    def test_with_fields_copies(self):
+        """項目の差し替えで元のレコードが変わらないテスト"""
+        record = TrackedProduct.from_dict("B08CDYX378", PRODUCT)
+
+        updated = record.with_fields({"status": "paused", "last_check": "2025-08-03 10:00:00", "unknown": 1})
+
+        self.assertEqual(record.status, "active")
+        self.assertEqual(updated.status, "paused")
+        self.assertEqual(updated.to_dict()["last_check"], "2025-08-03 10:00:00")
+        self.assertEqual(updated.name, record.name)
+
+    def test_missing_timestamps(self):
+        """未チェック商品の時刻がNoneのままとなるテスト"""
+        record = TrackedProduct.from_dict("B0TEST0001", {"name": "テスト", "status": "pending"})
+
+        product = record.to_dict()
+        self.assertIsNone(product["last_check"])
+        self.assertIsNone(product["added_date"])
+
+if __name__ == '__main__':
+    unittest.main()
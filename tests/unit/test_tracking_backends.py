@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+import unittest
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# srcディレクトリをパスに追加
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src'))
+
+from tracking_backends import InMemoryTrackingBackend, SQLiteTrackingBackend
+
+def make_product(status="pending", category="食品・飲料", last_check=None):
+    return {
+        "name": "テスト商品",
+        "category": category,
+        "status": status,
+        "threshold": 95,
+        "added_date": "2025-08-02",
+        "last_check": last_check,
+        "setup_method": "api_added",
+        "keepa_last_update": None
+    }
+
+class BackendTestMixin:
+    """保存先共通のテスト"""
+
+    def test_upsert_and_get(self):
+        """登録した商品を取得できるテスト"""
+        self.backend.upsert("B08CDYX378", make_product(last_check="2025-08-02 07:10:00"))
+
+        product = self.backend.get("B08CDYX378")
+
+        self.assertEqual(product["status"], "pending")
+        self.assertEqual(product["last_check"], "2025-08-02 07:10:00")
+        self.assertIsNone(self.backend.get("UNKNOWN"))
+
+    def test_update(self):
+        """項目の部分更新テスト"""
+        self.backend.upsert("B08CDYX378", make_product())
+
+        self.assertTrue(self.backend.update("B08CDYX378", {"status": "active", "keepa_last_update": 10}))
+        self.assertFalse(self.backend.update("UNKNOWN", {"status": "active"}))
+        product = self.backend.get("B08CDYX378")
+        self.assertEqual(product["status"], "active")
+        self.assertEqual(product["keepa_last_update"], 10)
+
+    def test_activate_pending(self):
+        """pending 商品の一括アクティベーションテスト"""
+        self.backend.upsert("B08CDYX378", make_product())
+        self.backend.upsert("B0B5SDFLTB", make_product(status="active"))
+
+        activated = self.backend.activate_pending("2025-08-03 10:00:00", "manual_activation")
+
+        self.assertEqual(activated, ["B08CDYX378"])
+        product = self.backend.get("B08CDYX378")
+        self.assertEqual(product["status"], "active")
+        self.assertEqual(product["last_check"], "2025-08-03 10:00:00")
+
+    def test_counts_and_status_lookup(self):
+        """ステータス別件数・抽出のテスト"""
+        self.backend.upsert("A1", make_product())
+        self.backend.upsert("A2", make_product(status="active"))
+        self.backend.upsert("A3", make_product(status="active"))
+
+        self.assertEqual(self.backend.count(), 3)
+        self.assertEqual(self.backend.count_by_status(), {"pending": 1, "active": 2})
+        self.assertEqual(sorted(self.backend.asins_by_status("active")), ["A2", "A3"])
+        self.assertEqual(set(self.backend.get_many(["A1", "A3", "UNKNOWN"])), {"A1", "A3"})
+
+    def test_update_many(self):
+        """複数商品の一括更新テスト"""
+        self.backend.upsert("A1", make_product())
+        self.backend.upsert("A2", make_product())
+
+        updated = self.backend.update_many([
+            ("A1", {"last_check": "2025-08-03 10:00:00"}),
+            ("A2", {"last_check": "2025-08-03 10:00:00"}),
+            ("UNKNOWN", {"last_check": "2025-08-03 10:00:00"})
+        ])
+
+        self.assertEqual(updated, 2)
+
+    def test_version_advances_on_write(self):
+        """書き込みごとに版数が進み、読み込み・空振りでは進まないテスト"""
+        initial, _ = self.backend.version()
+
+        self.backend.upsert("A1", make_product())
+        after_upsert, updated_at = self.backend.version()
+        self.backend.get_all()
+        self.backend.update("UNKNOWN", {"status": "active"})
+
+        self.assertEqual(after_upsert, initial + 1)
+        self.assertEqual(self.backend.version(), (after_upsert, updated_at))
+
+        self.backend.activate_pending("2025-08-03 10:00:00", "manual_activation")
+        self.assertEqual(self.backend.version()[0], after_upsert + 1)
+
+class TestInMemoryTrackingBackend(BackendTestMixin, unittest.TestCase):
+
+    def setUp(self):
+        self.backend = InMemoryTrackingBackend()
+
+class TestSQLiteTrackingBackend(BackendTestMixin, unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'tracking.sqlite3')
+        self.backend = SQLiteTrackingBackend(self.db_path)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_persists_across_instances(self):
+        """再起動後もデータが保持されるテスト"""
+        self.backend.upsert("B08CDYX378", make_product())
+
+        reopened = SQLiteTrackingBackend(self.db_path)
+
+        self.assertEqual(reopened.get("B08CDYX378")["name"], "テスト商品")
+
+    def test_indexes_exist(self):
+        """status / category / last_check のインデックスが作成されるテスト"""
+        rows = self.backend._conn().execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'tracked_products'"
+        ).fetchall()
+
+        names = {row["name"] for row in rows}
+        self.assertTrue({"idx_tracked_status", "idx_tracked_category", "idx_tracked_last_check"} <= names)
+
+    def test_version_shared_between_instances(self):
+        """別プロセス（別インスタンス）の書き込みも版数に反映されるテスト"""
+        other = SQLiteTrackingBackend(self.db_path)
+
+        other.upsert("A1", make_product())
+
+        self.assertEqual(self.backend.version(), other.version())
+
+    def test_reconnects_after_fork(self):
+        """フォーク後（プロセスID変更後）は接続を開き直すテスト"""
+        parent_conn = self.backend._conn()
+        self.backend._local.pid = -1
+
+        self.assertIsNot(self.backend._conn(), parent_conn)
+        self.assertEqual(self.backend._local.pid, os.getpid())
+
+    def test_activate_pending_reports_rows_added_concurrently(self):
+        """他プロセスの書き込み完了を待ってから抽出し、更新した商品をすべて返すテスト"""
+        self.backend.upsert("B08CDYX378", make_product())
+        other = SQLiteTrackingBackend(self.db_path)
+        conn = other._conn()
+        conn.execute("BEGIN IMMEDIATE")
+
+        result = {}
+        worker = threading.Thread(target=lambda: result.setdefault(
+            "activated", self.backend.activate_pending("2025-08-03 10:00:00", "manual_activation")))
+        worker.start()
+        time.sleep(0.2)
+        conn.execute(
+            "INSERT INTO tracked_products (asin, name, category, status, threshold) VALUES (?, ?, ?, 'pending', 95)",
+            ("B0B5SDFLTB", "テスト商品", "食品・飲料")
+        )
+        conn.commit()
+        worker.join(5)
+
+        self.assertEqual(sorted(result["activated"]), ["B08CDYX378", "B0B5SDFLTB"])
+        self.assertEqual(self.backend.get("B0B5SDFLTB")["status"], "active")
+
+    def test_counts_follow_writes(self):
+        """件数テーブルが追加・置き換え・更新と同じトランザクションで更新されるテスト"""
+        self.backend.upsert("B08CDYX378", make_product())
+        self.backend.upsert_many([("B0B5SDFLTB", make_product(category="Electronics")),
+                                  ("B08CDYX378", make_product(status="active"))])
+        self.backend.update("B0B5SDFLTB", {"status": "paused"})
+
+        status_counts, category_counts = SQLiteTrackingBackend(self.db_path).counts()
+
+        self.assertEqual(status_counts, {"active": 1, "paused": 1})
+        self.assertEqual(category_counts, {"食品・飲料": 1, "Electronics": 1})
+        self.assertEqual((status_counts, category_counts),
+                         (self.backend.count_by_status(), self.backend.count_by_category()))
+
+    def test_counts_built_for_existing_database(self):
+        """件数テーブルがない既存のデータベースは、開いた時点で集計されるテスト"""
+        self.backend.upsert("B08CDYX378", make_product())
+        self.backend.upsert("B0B5SDFLTB", make_product(status="active"))
+        with self.backend._conn() as conn:
+            conn.execute("DROP TABLE tracking_counts")
+
+        reopened = SQLiteTrackingBackend(self.db_path)
+
+        self.assertEqual(reopened.counts(), ({"pending": 1, "active": 1}, {"食品・飲料": 2}))
+
+    def test_wal_mode(self):
+        """WALモードで開かれるテスト"""
+        mode = self.backend._conn().execute("PRAGMA journal_mode").fetchone()[0]
+
+        self.assertEqual(mode, "wal")
+
+if __name__ == '__main__':
+    unittest.main()
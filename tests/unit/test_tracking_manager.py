@@ -0,0 +1,461 @@
+# -*- coding: utf-8 -*-
+import unittest
+import os
+import sys
+import tempfile
+import threading
+import time
+from unittest.mock import Mock, patch
+
+# srcディレクトリをパスに追加
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src'))
+
+from price_alerts import ThresholdAlertEngine
+from price_history_store import PriceHistoryStore
+from tracking_backends import InMemoryTrackingBackend, SQLiteTrackingBackend
+from tracking_manager import TrackingManager
+
+class TestTrackingManagerBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'tracking.sqlite3')
+        self.manager = TrackingManager(backend=SQLiteTrackingBackend(self.db_path))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_seeds_default_products(self):
+        """空の保存先に初期商品が登録されるテスト"""
+        summary = self.manager.get_tracking_summary()
+
+        self.assertEqual(summary["total_products"], 3)
+        self.assertTrue(summary["setup_complete"])
+
+    def test_state_survives_restart(self):
+        """再起動後もトラッキング状況が保持されるテスト"""
+        self.manager.add_product("B0TEST0001", "テスト商品", "食品・飲料")
+
+        restarted = TrackingManager(backend=SQLiteTrackingBackend(self.db_path))
+
+        self.assertEqual(restarted.get_product_status("B0TEST0001")["status"], "pending")
+        self.assertEqual(restarted.get_tracking_summary()["pending_setup"], 1)
+
+    def test_activate_all_pending(self):
+        """pending 商品のアクティベーションテスト"""
+        self.manager.add_product("B0TEST0001", "テスト商品", "食品・飲料")
+
+        self.manager.activate_all_pending()
+
+        product = self.manager.get_product_status("B0TEST0001")
+        self.assertEqual(product["status"], "active")
+        self.assertEqual(product["setup_method"], "manual_activation")
+        self.assertIsNotNone(product["last_check"])
+
+    def test_summary_shared_between_workers(self):
+        """同じ保存先を使う別ワーカーの書き込みもサマリーに反映されるテスト"""
+        other = TrackingManager(backend=SQLiteTrackingBackend(self.db_path))
+
+        other.add_product("B0TEST0001", "テスト商品", "Electronics")
+        other.update_product_status("B08CDYX378", "paused")
+
+        summary = self.manager.get_tracking_summary()
+        self.assertEqual(summary["total_products"], 4)
+        self.assertEqual(summary["pending_setup"], 1)
+        self.assertEqual(summary["active_tracking"], 2)
+        self.assertEqual(summary["categories"]["Electronics"], 2)
+        self.assertTrue(self.manager.verify_counters())
+
+        self.manager.activate_all_pending()
+
+        self.assertEqual(other.get_tracking_summary()["pending_setup"], 0)
+        self.assertTrue(other.verify_counters())
+
+class TestTrackingManagerSummary(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = TrackingManager(backend=InMemoryTrackingBackend())
+
+    def test_counters_follow_mutations(self):
+        """追加・更新・アクティベーションで件数が差分更新されるテスト"""
+        self.manager.add_product("B0TEST0001", "テスト商品1", "食品・飲料")
+        self.manager.add_product("B0TEST0002", "テスト商品2", "Electronics")
+        self.manager.update_product_status("B08CDYX378", "paused")
+
+        summary = self.manager.get_tracking_summary()
+        self.assertEqual(summary["total_products"], 5)
+        self.assertEqual(summary["active_tracking"], 2)
+        self.assertEqual(summary["pending_setup"], 2)
+        self.assertEqual(summary["categories"]["Electronics"], 2)
+        self.assertFalse(summary["setup_complete"])
+        self.assertTrue(self.manager.verify_counters())
+
+        self.manager.activate_all_pending()
+
+        summary = self.manager.get_tracking_summary()
+        self.assertEqual(summary["active_tracking"], 4)
+        self.assertEqual(summary["pending_setup"], 0)
+        self.assertTrue(self.manager.verify_counters())
+
+    def test_re_adding_product_does_not_double_count(self):
+        """同一ASINの再追加で件数が重複しないテスト"""
+        self.manager.add_product("B08CDYX378", "コカ・コーラ", "飲料")
+
+        summary = self.manager.get_tracking_summary()
+        self.assertEqual(summary["total_products"], 3)
+        self.assertEqual(summary["pending_setup"], 1)
+        self.assertNotIn("食品・飲料", summary["categories"])
+        self.assertTrue(self.manager.verify_counters())
+
+    def test_unknown_product_update_is_ignored(self):
+        """存在しない商品の更新で件数が変わらないテスト"""
+        self.manager.update_product_status("UNKNOWN", "active")
+
+        self.assertEqual(self.manager.get_tracking_summary()["total_products"], 3)
+        self.assertTrue(self.manager.verify_counters())
+
+    def test_summary_does_not_query_backend(self):
+        """サマリー取得時に保存先を集計しないテスト"""
+        self.manager.backend = Mock(wraps=self.manager.backend)
+
+        self.manager.get_tracking_summary()
+
+        self.manager.backend.count_by_status.assert_not_called()
+        self.manager.backend.get_all.assert_not_called()
+
+    def test_verify_detects_drift(self):
+        """保存先を直接変更した場合に不整合を検出するテスト"""
+        self.manager.backend.update("B08CDYX378", {"status": "paused"})
+
+        self.assertFalse(self.manager.verify_counters())
+
+class TestTrackingManagerBulk(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.backend = SQLiteTrackingBackend(os.path.join(self.tmpdir.name, 'tracking.sqlite3'))
+        self.manager = TrackingManager(backend=self.backend)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_bulk_upsert(self):
+        """一括登録で追加・置き換え・不正項目を集計するテスト"""
+        products = [{"asin": f"B0TEST{i:04d}", "name": f"商品{i}", "category": "Electronics"} for i in range(2000)]
+        products.append({"asin": "B08CDYX378", "name": "コカ・コーラ", "category": "食品・飲料", "threshold": 90})
+        products.append({"asin": "B0NONAME00"})
+
+        result = self.manager.bulk_upsert(products)
+
+        self.assertEqual(result, {"added": 2000, "replaced": 1, "invalid": [2001]})
+        self.assertEqual(self.backend.count(), 2003)
+        self.assertEqual(self.manager.get_product_status("B08CDYX378")["threshold"], 90)
+        self.assertTrue(self.manager.verify_counters())
+
+    def test_bulk_upsert_rejects_malformed_items(self):
+        """閾値が整数でない項目・ASINが文字列でない項目を不正として扱うテスト"""
+        products = [
+            {"asin": "B0TEST0001", "name": "商品", "category": "Electronics", "threshold": "abc"},
+            {"asin": "B0TEST0002", "name": "商品", "category": "Electronics", "threshold": None},
+            {"asin": 12345, "name": "商品", "category": "Electronics"},
+            {"asin": "B0TEST0003", "name": "商品", "category": ["Electronics"]},
+            {"asin": "B0TEST0004", "name": "商品", "category": "Electronics", "threshold": "90"}
+        ]
+
+        result = self.manager.bulk_upsert(products)
+
+        self.assertEqual(result, {"added": 1, "replaced": 0, "invalid": [0, 1, 2, 3]})
+        self.assertEqual(self.manager.get_product_status("B0TEST0004")["threshold"], 90)
+        self.assertTrue(self.manager.verify_counters())
+
+    def test_bulk_upsert_single_transaction(self):
+        """一括登録が1回の書き込みで行われるテスト"""
+        with patch.object(self.backend, 'upsert', wraps=self.backend.upsert) as upsert:
+            self.manager.bulk_upsert([{"asin": f"B0TEST{i:04d}", "name": "商品", "category": "Electronics"}
+                                      for i in range(10)])
+
+        upsert.assert_not_called()
+
+    def test_bulk_update_status(self):
+        """一括ステータス更新のテスト"""
+        result = self.manager.bulk_update_status(["B08CDYX378", "B0B5SDFLTB", "B08CDYX378", "UNKNOWN"], "paused")
+
+        self.assertEqual(result, {"updated": 2, "not_found": ["UNKNOWN"]})
+        self.assertEqual(self.manager.get_tracking_summary()["active_tracking"], 1)
+        self.assertTrue(self.manager.verify_counters())
+
+class TrackingManagerConcurrencyMixin:
+    """複数スレッドからの同時読み書き"""
+
+    def test_concurrent_reads_and_writes(self):
+        """読み書きが並行しても例外が出ず件数が一致するテスト"""
+        errors = []
+
+        def writer(worker):
+            try:
+                for i in range(100):
+                    asin = f"B0W{worker}{i:05d}"
+                    self.manager.add_product(asin, "商品", "Electronics" if i % 2 else "食品・飲料")
+                    if i % 3 == 0:
+                        self.manager.update_product_status(asin, "active")
+                    if i % 25 == 0:
+                        self.manager.activate_all_pending()
+            except Exception as e:
+                errors.append(e)
+
+        def reader():
+            try:
+                for _ in range(100):
+                    self.manager.get_tracking_summary()
+                    self.manager.get_all_tracked_products()
+                    self.manager.find_products(status="pending", limit=50)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+        threads += [threading.Thread(target=reader) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(self.manager.get_tracking_summary()["total_products"], 403)
+        self.assertTrue(self.manager.verify_counters())
+
+class TestInMemoryTrackingManagerConcurrency(TrackingManagerConcurrencyMixin, unittest.TestCase):
+
+    def setUp(self):
+        self.manager = TrackingManager(backend=InMemoryTrackingBackend())
+
+class TestSQLiteTrackingManagerConcurrency(TrackingManagerConcurrencyMixin, unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.manager = TrackingManager(backend=SQLiteTrackingBackend(os.path.join(self.tmpdir.name, 'tracking.sqlite3')))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+class TestTrackingManagerQuery(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.manager = TrackingManager(backend=SQLiteTrackingBackend(os.path.join(self.tmpdir.name, 'tracking.sqlite3')))
+        for i in range(25):
+            self.manager.add_product(f"B0TEST{i:04d}", f"テスト商品{i}", "Electronics" if i % 2 else "食品・飲料",
+                                     threshold=80 + i)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_cursor_pagination_covers_all(self):
+        """カーソルで全件を重複なく取得するテスト"""
+        seen = []
+        cursor = None
+        while True:
+            page, cursor = self.manager.find_products(cursor, limit=10)
+            seen.extend(page)
+            if cursor is None:
+                break
+
+        self.assertEqual(len(seen), 28)
+        self.assertEqual(seen, sorted(set(seen)))
+
+    def test_filters_pushed_down(self):
+        """絞り込み条件のテスト"""
+        page, cursor = self.manager.find_products(category="Electronics", min_threshold=90, max_threshold=99)
+
+        self.assertIsNone(cursor)
+        self.assertEqual(sorted(page), ["B0B5SDFLTB", "B0TEST0011", "B0TEST0013", "B0TEST0015", "B0TEST0017", "B0TEST0019"])
+
+    def test_iter_products_matches_filter(self):
+        """ジェネレータで条件に合う全件を返すテスト"""
+        asins = [asin for asin, _ in self.manager.iter_products(page_size=4, status="pending")]
+
+        self.assertEqual(len(asins), 25)
+
+    def test_unknown_filter_rejected(self):
+        """未対応の絞り込み条件はエラーとなるテスト"""
+        with self.assertRaises(ValueError):
+            self.manager.find_products(color="red")
+
+class TestTrackingManagerPriceData(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = PriceHistoryStore(os.path.join(self.tmpdir.name, 'history.bin'))
+        self.manager = TrackingManager(price_store=self.store, backend=InMemoryTrackingBackend())
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_get_price_data_from_store(self):
+        """履歴ストアの価格データを返すテスト"""
+        now_min = int(time.time() // 60)
+        self.manager.record_prices('B08CDYX378', [now_min - 60, now_min - 30, now_min], [150, 140, 160])
+
+        price_data = self.manager.get_price_data('B08CDYX378')
+
+        self.assertEqual(price_data['data_quality'], 'price_history')
+        self.assertEqual(price_data['current_price'], 160)
+        self.assertEqual(price_data['min_price_30d'], 140)
+        self.assertEqual(price_data['max_price_30d'], 160)
+        self.assertEqual(price_data['price_change'], 10)
+
+    def test_get_price_data_falls_back_to_simulation(self):
+        """履歴がない場合はシミュレーションとなるテスト"""
+        price_data = self.manager.get_price_data('B08CDYX378')
+
+        self.assertEqual(price_data['data_quality'], 'tracking_active')
+        self.assertIn('min_price_30d', price_data)
+
+class TestTrackingManagerSnapshots(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = PriceHistoryStore(os.path.join(self.tmpdir.name, 'history.bin'))
+        self.manager = TrackingManager(price_store=self.store, backend=InMemoryTrackingBackend())
+        self.now_min = int(time.time() // 60)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_snapshot_updated_when_prices_land(self):
+        """価格追記時にスナップショットが更新されるテスト"""
+        self.manager.record_prices('B08CDYX378', [self.now_min - 60, self.now_min], [200, 150])
+
+        snapshot = self.manager.snapshots.get('B08CDYX378', 'JP')
+
+        self.assertEqual(snapshot['analysis']['current_price'], 150)
+        self.assertEqual(snapshot['analysis']['price_trend'], 'decreasing')
+        self.assertEqual(snapshot['analysis']['recommendation'], 'good_time_to_buy')
+
+        self.manager.record_prices('B08CDYX378', [self.now_min + 1], [260])
+        snapshot = self.manager.snapshots.get('B08CDYX378', 'JP')
+        self.assertEqual(snapshot['analysis']['price_trend'], 'increasing')
+        self.assertEqual(snapshot['analysis']['recommendation'], 'wait')
+
+    def test_snapshot_computed_lazily_from_store(self):
+        """既存の履歴から初回参照時に計算されるテスト"""
+        self.store.append('B08CDYX378', [self.now_min], [150])
+
+        snapshot = self.manager.get_analysis_snapshot('B08CDYX378')
+
+        self.assertEqual(snapshot['price_history']['data_points'], 1)
+        self.assertIsNone(self.manager.get_analysis_snapshot('UNKNOWN'))
+
+    def test_snapshot_follows_other_worker_writes(self):
+        """他のワーカーが追記した履歴で、スナップショットが再計算されるテスト"""
+        other = TrackingManager(price_store=PriceHistoryStore(self.store.path),
+                                backend=InMemoryTrackingBackend())
+        self.manager.record_prices('B08CDYX378', [self.now_min - 60], [200])
+        self.assertEqual(self.manager.get_analysis_snapshot('B08CDYX378')['analysis']['current_price'], 200)
+
+        # 別ワーカーで追記した時点では、こちらのスナップショットはまだ古い
+        other.record_prices('B08CDYX378', [self.now_min], [150])
+        self.assertEqual(other.get_analysis_snapshot('B08CDYX378')['analysis']['current_price'], 150)
+
+        snapshot = self.manager.get_analysis_snapshot('B08CDYX378')
+        self.assertEqual(snapshot['analysis']['current_price'], 150)
+        self.assertEqual(snapshot['source_timestamp'], self.now_min)
+
+    def test_snapshot_sees_history_written_by_other_worker(self):
+        """他のワーカーだけが書いた履歴も、シミュレーションではなく履歴から分析されるテスト"""
+        other = PriceHistoryStore(self.store.path)
+        other.append('B0B5SDFLTB', [self.now_min], [980])
+
+        snapshot = self.manager.get_analysis_snapshot('B0B5SDFLTB')
+
+        self.assertIsNotNone(snapshot)
+        self.assertEqual(snapshot['analysis']['current_price'], 980)
+
+class TestTrackingManagerAlerts(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.sink = Mock()
+        self.manager = TrackingManager(price_store=PriceHistoryStore(os.path.join(self.tmpdir.name, 'history.bin')),
+                                       backend=InMemoryTrackingBackend(),
+                                       alerts=ThresholdAlertEngine([self.sink]))
+        self.now_min = int(time.time() // 60)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_alert_on_new_price_below_threshold(self):
+        """初回データを基準に、以降の価格下落で発火するテスト"""
+        self.manager.record_prices('B08CDYX378', [self.now_min - 120, self.now_min - 60], [2000, 1000])
+        self.sink.send.assert_not_called()
+
+        self.manager.record_prices('B08CDYX378', [self.now_min], [950])
+
+        alert = self.sink.send.call_args[0][0]
+        self.assertEqual(alert['asin'], 'B08CDYX378')
+        self.assertEqual(alert['reference_price'], 1000)
+
+    def test_no_alert_for_pending_product(self):
+        """pending の商品は判定しないテスト"""
+        self.manager.add_product('B0TEST0001', 'テスト商品', '食品・飲料')
+
+        self.manager.record_prices('B0TEST0001', [self.now_min - 60], [1000])
+        self.manager.record_prices('B0TEST0001', [self.now_min], [500])
+
+        self.sink.send.assert_not_called()
+        self.assertFalse(self.manager.alerts.is_watching('B0TEST0001'))
+
+    def test_threshold_change_resets_watch(self):
+        """商品の再登録で監視状態が作り直されるテスト"""
+        self.manager.record_prices('B08CDYX378', [self.now_min - 60], [1000])
+        self.assertTrue(self.manager.alerts.is_watching('B08CDYX378'))
+
+        self.manager.add_product('B08CDYX378', 'コカ・コーラ', '食品・飲料', threshold=80)
+
+        self.assertFalse(self.manager.alerts.is_watching('B08CDYX378'))
+
+class TestTrackingManagerRefresh(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = PriceHistoryStore(os.path.join(self.tmpdir.name, 'history.bin'))
+        self.manager = TrackingManager(price_store=self.store, backend=InMemoryTrackingBackend())
+        self.client = Mock()
+        self.now_min = int(time.time() // 60)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_refresh_passes_high_water_marks(self):
+        """保存済みの最新時刻とlastUpdateを渡して差分を追記するテスト"""
+        self.manager.record_prices('B08CDYX378', [self.now_min - 10], [150])
+        self.manager.backend.update('B08CDYX378', {'keepa_last_update': 123})
+        self.client.get_price_history_deltas.return_value = {
+            'B08CDYX378': {'last_update': 456, 'changed': True,
+                           'timestamps': [self.now_min - 5], 'prices': [140]}
+        }
+
+        summary = self.manager.refresh_price_history(self.client, 'B08CDYX378')
+
+        args = self.client.get_price_history_deltas.call_args[0]
+        self.assertEqual(args[2], {'B08CDYX378': self.now_min - 10})
+        self.assertEqual(args[3], {'B08CDYX378': 123})
+        self.assertEqual(summary['points_added'], 1)
+        self.assertEqual(list(self.store.read('B08CDYX378')[1]), [150, 140])
+        self.assertEqual(self.manager.get_product_status('B08CDYX378')['keepa_last_update'], 456)
+
+    def test_refresh_all_active_skips_unchanged(self):
+        """active な全商品を対象とし、未更新の商品は追記しないテスト"""
+        self.client.get_price_history_deltas.return_value = {
+            asin: {'last_update': 1, 'changed': False, 'timestamps': [], 'prices': []}
+            for asin in self.manager.get_all_tracked_products()
+        }
+
+        summary = self.manager.refresh_all_price_history(self.client)
+
+        self.assertEqual(summary['requested'], 3)
+        self.assertEqual(summary['skipped'], 3)
+        self.assertEqual(summary['points_added'], 0)
+        self.assertEqual(self.store.asins(), [])
+
+if __name__ == '__main__':
+    unittest.main()